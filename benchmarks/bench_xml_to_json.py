@@ -0,0 +1,162 @@
+"""Micro-benchmark of the suite snippet conversion
+
+Compares the recursive implementation of ``utils.xml_to_json`` it replaced
+with the explicit stack one and with ``utils.xml_stream_to_json`` on large
+synthetic suites.
+
+usage::
+
+    python benchmarks/bench_xml_to_json.py --cases 50000 --repeat 3
+
+"""
+import io
+import gzip
+import base64
+import argparse
+import timeit
+import xml.etree.ElementTree as ElementTree
+import testspace_colab.utils as utils_module
+
+logger = utils_module.logger
+
+
+def legacy_xml_to_json(xml_data, path, progress_callback=None):
+    """Recursive implementation of xml_to_json (prior to the explicit stack)"""
+    json_data = dict()
+    element_type = xml_data.tag.replace("test_", "")
+    json_data[element_type] = xml_data.attrib
+
+    children_type = None
+
+    if xml_data.tag == "test_suite":
+        path = (
+            f"{path}/{xml_data.attrib['name']}"
+            if path
+            else f"/{xml_data.attrib['name']}"
+        )
+        children_type = "cases"
+        if progress_callback:
+            progress_callback(object_type="suites", object_count=1)
+    elif xml_data.tag == "test_case":
+        path = (
+            f"{path}/{xml_data.attrib['name']}"
+            if path
+            else f"/{xml_data.attrib['name']}"
+        )
+        children_type = "annotations"
+        if progress_callback:
+            progress_callback(object_type="cases", object_count=1)
+    elif xml_data.tag == "annotation":
+        path = (
+            f"{path}/{xml_data.attrib['name']}"
+            if path
+            else f"/{xml_data.attrib['name']}"
+        )
+        if isinstance(xml_data.text, str):
+            try:
+                json_data[element_type]["text"] = gzip.decompress(
+                    base64.b64decode(xml_data.text)
+                ).decode("utf-8")
+            except Exception as extract_error:
+                logger.error(
+                    f"Failed to decode annotation {path} error -> {extract_error}"
+                )
+        children_type = "comments"
+        if progress_callback:
+            progress_callback(object_type="annotations", object_count=1)
+    elif xml_data.tag == "comment":
+        # The text contains the actual comment
+        json_data[element_type]["text"] = xml_data.text
+        json_data[element_type]["path"] = path
+    else:
+        print("What is this")
+        if progress_callback:
+            progress_callback(object_type=xml_data.tag, object_count=1)
+
+    if children_type:
+        json_data[element_type][children_type] = []
+
+        for children in xml_data:
+            children_data = legacy_xml_to_json(
+                xml_data=children, path=path, progress_callback=progress_callback
+            )
+            for children_datum in children_data.values():
+                children_datum["path"] = path if path else "/"
+                json_data[element_type][children_type].append(children_datum)
+        if not json_data[element_type][children_type]:
+            json_data[element_type].pop(children_type)
+    else:
+        pass
+
+    return json_data
+
+
+def make_suite(case_count, annotation_ratio=0.2):
+    """Builds a suite snippet with ``case_count`` cases, a fraction of which
+    carry an annotation"""
+    annotation = base64.b64encode(gzip.compress(b"a line of log\n" * 20)).decode()
+    annotation_every = int(1 / annotation_ratio) if annotation_ratio else 0
+    parts = ['<test_suite name="benchmark" passed="%d">' % case_count]
+    for index in range(case_count):
+        parts.append(
+            f'<test_case name="test_case_{index}" status="passed" '
+            f'duration="0.001" start_time="2021-02-03T09:51:22.005395">'
+        )
+        if annotation_every and index % annotation_every == 0:
+            parts.append(
+                f'<annotation name="log" level="info" mime_type="text/plain">'
+                f"{annotation}</annotation>"
+            )
+        parts.append("</test_case>")
+    parts.append("</test_suite>")
+    return "".join(parts).encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--cases", type=int, default=50000, help="cases per suite")
+    parser.add_argument("--annotations", type=float, default=0.2, help="ratio")
+    parser.add_argument("--repeat", type=int, default=3, help="number of runs")
+    args = parser.parse_args()
+
+    content = make_suite(args.cases, args.annotations)
+    counts = dict()
+
+    def progress(object_type, object_count):
+        counts[object_type] = counts.get(object_type, 0) + object_count
+
+    assert utils_module.xml_to_json(
+        ElementTree.fromstring(content), None
+    ) == legacy_xml_to_json(ElementTree.fromstring(content), None)
+
+    # The conversions modify the element attributes so each run gets a new tree
+    trees = []
+
+    def setup():
+        trees.append(ElementTree.fromstring(content))
+
+    candidates = {
+        "recursive xml_to_json": lambda: legacy_xml_to_json(
+            trees.pop(), None, progress
+        ),
+        "xml_to_json": lambda: utils_module.xml_to_json(trees.pop(), None, progress),
+        "fromstring + xml_to_json": lambda: utils_module.xml_to_json(
+            ElementTree.fromstring(content), None, progress
+        ),
+        "xml_stream_to_json": lambda: utils_module.xml_stream_to_json(
+            io.BytesIO(content), None, progress
+        ),
+    }
+
+    print(f"{args.cases} cases, {len(content) / 1024 ** 2:.1f} MB")
+    reference = None
+    for name, candidate in candidates.items():
+        best = min(
+            timeit.repeat(candidate, setup=setup, number=1, repeat=args.repeat)
+        )
+        reference = reference or best
+        print(f"{name:25} {best:8.3f}s  x{reference / best:.2f}")
+
+
+if __name__ == "__main__":
+    main()
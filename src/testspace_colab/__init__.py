@@ -4,6 +4,7 @@ __author__ = """Laurent Brack"""
 __email__ = "laurent.brack@gmail.com"
 
 from testspace_colab.lib import API  # noqa: F401
+from testspace_colab.lib import AsyncAPI  # noqa: F401
 from testspace_colab.trove import Trove  # noqa: F401
 from testspace_colab.elk import ELK  # noqa: F401
 from testspace_colab.utils import use_test_config  # noqa: F401
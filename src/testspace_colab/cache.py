@@ -0,0 +1,275 @@
+""" Response Cache
+
+    Published results never change so the raw responses used to build
+    the result details can be kept on disk and reused across sessions.
+
+    Listings (projects, spaces, results) do change, but slowly, so they
+    are kept in memory for a limited time.
+
+"""
+import io
+import os
+import copy
+import time
+import gzip
+import hashlib
+import pathlib
+import tempfile
+import threading
+import testspace_colab.ts_log
+
+DEFAULT_LOCATION = pathlib.Path("~").expanduser() / ".cache" / "testspace-colab"
+
+DEFAULT_MAX_SIZE = 1024 ** 3
+""" Default cache size limit in bytes (compressed)"""
+
+DEFAULT_TTL = 300
+""" Default time to live (in seconds) of the memoized metadata"""
+
+logger = testspace_colab.ts_log.get_logger("cache")
+
+
+class DiskCache:
+    """A size capped, least recently used, on-disk cache of raw responses.
+
+    Entries are stored gzip-compressed, one file per entry, under a name
+    derived from the key. The modification time of a file is updated each
+    time it is read so that the least recently used entries are evicted first
+    once the cache grows over ``max_size``.
+
+    :param path: the cache directory
+    :param max_size: maximum size of the cache in bytes
+    """
+
+    def __init__(self, path=DEFAULT_LOCATION, max_size=DEFAULT_MAX_SIZE):
+        self.path = pathlib.Path(path)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._size = None
+
+    @staticmethod
+    def make_key(*parts):
+        """Builds the key of an entry e.g. org, project, space, result, path"""
+        return hashlib.sha1(
+            "/".join(str(part) for part in parts).encode("utf-8")
+        ).hexdigest()
+
+    def _entry_path(self, key):
+        return self.path / key[:2] / f"{key}.gz"
+
+    def _entries(self):
+        if not self.path.is_dir():
+            return []
+        return [entry for entry in self.path.glob("*/*.gz") if entry.is_file()]
+
+    @property
+    def size(self):
+        """The size of the cache in bytes"""
+        with self._lock:
+            if self._size is None:
+                self._size = sum(entry.stat().st_size for entry in self._entries())
+            return self._size
+
+    def get(self, *parts):
+        """Returns the content stored for the key or None
+
+        :param parts: the key parts
+        :return: the uncompressed content as bytes
+        """
+        file_handle = self.open(*parts)
+        if file_handle is None:
+            return None
+        try:
+            with file_handle:
+                return file_handle.read()
+        except (OSError, EOFError):
+            return None
+
+    def open(self, *parts):
+        """Opens the entry for reading
+
+        :param parts: the key parts
+        :return: a binary file object returning the uncompressed content or None
+        """
+        entry = self._entry_path(self.make_key(*parts))
+        try:
+            file_handle = gzip.open(entry, "rb")
+            os.utime(entry)  # Most recently used
+        except OSError:
+            return None
+        logger.debug(f"cache hit {parts}")
+        return file_handle
+
+    def tee(self, source, *parts):
+        """Wraps a binary file object so that the content read from it
+        is stored in the cache. The entry is only stored once the
+        source has been read entirely.
+
+        :param source: a binary file object e.g. a response stream
+        :param parts: the key parts
+        :return: a binary file object
+        """
+        entry = self._entry_path(self.make_key(*parts))
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        return _CacheWriter(self, source, entry)
+
+    def _commit(self, tmp_name, entry):
+        with self._lock:
+            previous = entry.stat().st_size if entry.is_file() else 0
+            os.replace(tmp_name, entry)
+            self._size += entry.stat().st_size - previous
+        if self._size > self.max_size:
+            self.evict()
+
+    def put(self, content, *parts):
+        """Stores the content for the key
+
+        :param content: the content as bytes
+        :param parts: the key parts
+        """
+        entry = self._entry_path(self.make_key(*parts))
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        self.size  # Makes sure the current size is known
+        # Written to a temporary file first so that readers never see
+        # a partial entry
+        file_descriptor, tmp_name = tempfile.mkstemp(dir=entry.parent, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "wb") as raw_handle:
+                with gzip.GzipFile(fileobj=raw_handle, mode="wb") as file_handle:
+                    file_handle.write(content)
+            self._commit(tmp_name, entry)
+        except OSError as write_error:
+            logger.warning(f"failed to cache {parts} - error {write_error}")
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
+
+    def evict(self, max_size=None):
+        """Removes the least recently used entries until the cache fits
+        in ``max_size`` (defaults to the cache limit)
+
+        :param max_size: the target size in bytes
+        """
+        max_size = self.max_size if max_size is None else max_size
+        with self._lock:
+            entries = []
+            for entry in self._entries():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry))
+            size = sum(entry[1] for entry in entries)
+            for _, entry_size, entry in sorted(entries, key=lambda e: e[0]):
+                if size <= max_size:
+                    break
+                logger.debug(f"evicting {entry}")
+                try:
+                    entry.unlink()
+                except OSError:
+                    continue
+                size -= entry_size
+            self._size = size
+
+    def clear(self):
+        """Removes all the entries"""
+        self.evict(max_size=0)
+
+
+class _CacheWriter(io.RawIOBase):
+    """Readable stream copying the content of ``source`` into a cache entry"""
+
+    def __init__(self, cache, source, entry):
+        super().__init__()
+        self._cache = cache
+        self._source = source
+        self._entry = entry
+        cache.size  # Makes sure the current size is known
+        file_descriptor, self._tmp_name = tempfile.mkstemp(
+            dir=entry.parent, suffix=".tmp"
+        )
+        self._raw_handle = os.fdopen(file_descriptor, "wb")
+        self._file_handle = gzip.GzipFile(fileobj=self._raw_handle, mode="wb")
+        self._eof = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._source.read(len(buffer))
+        if not data:
+            self._eof = True
+            return 0
+        buffer[: len(data)] = data
+        self._file_handle.write(data)
+        return len(data)
+
+    def close(self):
+        if self.closed:
+            return
+        super().close()
+        self._file_handle.close()
+        self._raw_handle.close()
+        if hasattr(self._source, "close"):
+            self._source.close()
+        if self._eof:
+            try:
+                self._cache._commit(self._tmp_name, self._entry)
+                return
+            except OSError as write_error:
+                logger.warning(f"failed to cache {self._entry} - error {write_error}")
+        if os.path.exists(self._tmp_name):
+            os.remove(self._tmp_name)
+
+
+class TTLCache:
+    """An in-memory cache whose entries expire ``ttl`` seconds after being stored.
+
+    Keys are tuples. The number of hits and misses is recorded so the
+    efficiency of the cache can be checked.
+
+    :param ttl: time to live of the entries in seconds
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = dict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns a (found, value) tuple"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self.hits += 1
+                return True, entry[1]
+            self._entries.pop(key, None)
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, *prefix):
+        """Removes the entries whose key starts with ``prefix`` (all the
+        entries if no prefix is given)"""
+        with self._lock:
+            for key in list(self._entries):
+                if key[: len(prefix)] == prefix:
+                    del self._entries[key]
+
+    def memoize(self, name, function):
+        """Wraps ``function`` so that its results are cached under
+        ``(name, args, kwargs)``. The callers get a copy of the cached value
+        so that they can modify it freely."""
+
+        def wrapper(*args, **kwargs):
+            key = (name, args, tuple(sorted(kwargs.items())))
+            found, value = self.get(key)
+            if not found:
+                value = function(*args, **kwargs)
+                self.put(key, value)
+            return copy.deepcopy(value)
+
+        wrapper.__name__ = name
+        wrapper.__doc__ = function.__doc__
+        return wrapper
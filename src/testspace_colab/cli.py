@@ -5,16 +5,22 @@ import platform
 import webbrowser
 import click
 import yaml
-import json
 import pprint
+import re
 import pathlib
 import logging
+import datetime
+import functools
 import urllib.parse
+import concurrent.futures
 import jsonpath_ng
+import rich.progress
 import testspace_colab.ts_log as log_module
 import testspace_colab.client as client_module
 import testspace_colab.lib as lib_module
+import testspace_colab.cache as cache_module
 import testspace_colab.utils as utils_module
+import testspace_colab.trove as trove_module
 import testspace_colab.elk as elk_module
 
 
@@ -46,6 +52,15 @@ IGNORE_COLUMNS = [
     "session_failure_counts",
 ]
 
+FILTERED_ENDPOINTS = (
+    "result_details",
+    "results_details",
+    "result_suites",
+    "result_cases",
+)
+""" The endpoints of the get command taking the --include, --exclude and --max-depth
+options"""
+
 
 @click.group()
 @click.version_option(version=VERSION)
@@ -56,8 +71,23 @@ IGNORE_COLUMNS = [
     type=click.Choice(["none", "samples", "test"], case_sensitive=False),
     help="uses preset configuration for playing around",
 )
-def main(debug, preset):
+@click.option(
+    "--stats",
+    is_flag=True,
+    help="print request and parsing statistics (to stderr) when done",
+)
+@click.option(
+    "--rate-limit",
+    type=float,
+    help="maximum number of requests per second sent to the server",
+)
+@click.pass_context
+def main(ctx, debug, preset, stats, rate_limit):
     """Console script for testspace_colab."""
+    ctx.obj = dict(rate_limit=rate_limit)
+    if stats:
+        ctx.obj["clients"] = []
+        ctx.call_on_close(lambda: print_stats(ctx.obj["clients"]))
     if debug:
         log_module.set_log_level(logging.DEBUG)
     if preset == "test":
@@ -66,6 +96,193 @@ def main(debug, preset):
         utils_module.use_samples_config()
 
 
+def cache_options(function):
+    """Adds the --no-cache and --refresh options to a command"""
+    function = click.option(
+        "--refresh",
+        is_flag=True,
+        help="download the results again and update the cache",
+    )(function)
+    function = click.option(
+        "--no-cache",
+        is_flag=True,
+        help=f"do not use the response cache ({cache_module.DEFAULT_LOCATION})",
+    )(function)
+    return function
+
+
+def annotation_options(function):
+    """Adds the --lazy-annotations and --raw-annotations options to a command"""
+    function = click.option(
+        "--raw-annotations",
+        is_flag=True,
+        help="save the annotation texts as sent by testspace (base64 encoded gzip)",
+    )(function)
+    function = click.option(
+        "--lazy-annotations",
+        is_flag=True,
+        help="only decode the annotation texts when saving them",
+    )(function)
+    return function
+
+
+def make_client(
+    no_cache=False,
+    refresh=False,
+    lazy_annotations=False,
+    raw_annotations=False,
+    parse_workers=0,
+):
+    """Builds the API according to the command options"""
+    ctx = click.get_current_context(silent=True)
+    client = lib_module.API(
+        cache_dir=None if no_cache else cache_module.DEFAULT_LOCATION,
+        refresh_cache=refresh,
+        lazy_annotations=lazy_annotations or raw_annotations,
+        parse_workers=parse_workers,
+        rate_limit=ctx.obj.get("rate_limit") if ctx and ctx.obj else None,
+    )
+    # Registered for --stats
+    if ctx and ctx.obj and "clients" in ctx.obj:
+        ctx.obj["clients"].append(client)
+    return client
+
+
+def print_stats(clients):
+    """Prints the statistics of the clients (see API.stats) to stderr"""
+    for client in clients:
+        rows = client.metrics.summary()
+        if rows:
+            click.secho("Statistics", bold=True, err=True)
+            utils_module.json_to_table(rows, err=True)
+
+
+def print_plan(crawl_tasks, costs):
+    """Prints the estimated cost of the results to crawl (see
+    :func:`testspace_colab.lib.estimate_result_cost`)"""
+    rows = [
+        dict(
+            project=crawl_task[1],
+            space=crawl_task[2],
+            result=crawl_task[3],
+            suites=cost["suites"],
+            cases=cost["cases"],
+            annotations=cost["annotations"],
+            requests=cost["requests"],
+            kbytes=round(cost["bytes"] / 1024),
+        )
+        for crawl_task, cost in zip(crawl_tasks, costs)
+    ]
+    rows.sort(key=lambda row: row["kbytes"], reverse=True)
+    if rows:
+        utils_module.json_to_table(rows)
+    click.secho(
+        f"plan: {len(rows)} results, ~{sum(cost['requests'] for cost in costs)} "
+        f"requests, ~{sum(cost['bytes'] for cost in costs) / 1024 ** 2:.1f} MB",
+        bold=True,
+    )
+
+
+ISO_DATE = re.compile(
+    r"(\d{4})-(\d{2})-(\d{2})"
+    r"(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.(\d{1,6})\d*)?)?)?"
+    r"(Z|([+-])(\d{2}):?(\d{2}))?$"
+)
+""" ISO 8601 date, or date and time (datetime.fromisoformat requires Python 3.7)"""
+
+
+def parse_since(value):
+    """Converts the --since option to a timezone aware datetime (local time
+    if no time zone is given)"""
+    if not value:
+        return None
+    match = ISO_DATE.match(value.strip())
+    try:
+        if not match:
+            raise ValueError(value)
+        year, month, day, hour, minute, second, fraction = match.groups()[:7]
+        since = datetime.datetime(
+            int(year),
+            int(month),
+            int(day),
+            int(hour or 0),
+            int(minute or 0),
+            int(second or 0),
+            int((fraction or "0").ljust(6, "0")),
+        )
+    except ValueError:
+        raise click.BadParameter(f"{value} is not an ISO 8601 date")
+    zone, sign, hours, minutes = match.groups()[7:]
+    if zone == "Z":
+        return since.replace(tzinfo=datetime.timezone.utc)
+    if zone:
+        offset = datetime.timedelta(hours=int(hours), minutes=int(minutes))
+        return since.replace(
+            tzinfo=datetime.timezone(-offset if sign == "-" else offset)
+        )
+    return since.astimezone()
+
+
+def updated_since(result_info, since):
+    """Tells whether a result was updated at or after ``since`` (or its
+    update time is unknown)"""
+    updated_at = result_info.get("updated_at") or result_info.get("created_at")
+    if not updated_at:
+        return True
+    try:
+        return parse_since(updated_at) >= since
+    except click.BadParameter:
+        return True
+
+
+def is_result_details(response):
+    """Tells whether a response holds the details of a result (e.g. as returned by
+    get_result_details), which can be saved in any of the trove.RESULT_FORMATS"""
+    return isinstance(response, dict) and "details" in response
+
+
+def check_records_file(output_file):
+    """Raises a UsageError if records are to be written to a file that would be read
+    as an ndjson result file (see trove.RESULT_FORMATS)"""
+    if output_file and (trove_module.result_format(output_file) or "").startswith(
+        "ndjson"
+    ):
+        raise click.UsageError(
+            f"{pathlib.Path(output_file).name} is the name of an ndjson result file, "
+            "use e.g. the .jsonl extension for records"
+        )
+
+
+def dump_ndjson(records, output_file=None, raw_annotations=False):
+    """Writes records as newline delimited json (one record per line)
+    as they are produced
+
+    :param records: an iterable of records
+    :param output_file: the output file (the standard output if not set)
+    :param raw_annotations: If set, the lazy annotation texts are not decoded
+    """
+    encoder = utils_module.JSONEncoder(decode_annotations=not raw_annotations)
+    file_handle = open(output_file, "w") if output_file else sys.stdout
+    try:
+        for record in records:
+            file_handle.write(encoder.encode(record))
+            file_handle.write("\n")
+            if not output_file:
+                file_handle.flush()
+    except Exception as write_exception:
+        logger.exception(write_exception)
+        raise click.ClickException(f"failed {write_exception}")
+    finally:
+        if output_file:
+            file_handle.close()
+
+
+# Lazy annotation texts are shown decoded
+yaml.add_representer(
+    utils_module.LazyText, lambda dumper, text: dumper.represent_str(str(text))
+)
+
+
 @main.resultcallback()
 def process_result(result, **kwargs):
     """We use this to erase any log file - this is only called if the command is successful"""
@@ -95,7 +312,7 @@ def client(args, version, help):
 @click.option(
     "-f",
     "--format",
-    type=click.Choice(["tabular", "yaml", "json"], case_sensitive=False),
+    type=click.Choice(["tabular", "yaml", "json", "ndjson"], case_sensitive=False),
     help="output format",
 )
 @click.option(
@@ -113,7 +330,40 @@ def client(args, version, help):
     help="json path expression",
 )
 @click.option("-l", "--long", is_flag=True, help="Do not filter any column")
-def get(args, long, output_file, format, json_path):
+@click.option(
+    "--include",
+    multiple=True,
+    help="only load the folders and suites matching this path pattern "
+    "(result_details, result_cases ...)",
+)
+@click.option(
+    "--exclude",
+    multiple=True,
+    help="do not load the folders and suites matching this path pattern "
+    "(result_details, result_cases ...)",
+)
+@click.option(
+    "--max-depth",
+    type=click.IntRange(min=1),
+    help="do not load the folders and suites below this depth "
+    "(result_details, result_cases ...)",
+)
+@cache_options
+@annotation_options
+def get(
+    args,
+    long,
+    output_file,
+    format,
+    json_path,
+    include,
+    exclude,
+    max_depth,
+    no_cache,
+    refresh,
+    lazy_annotations,
+    raw_annotations,
+):
     """Performs a get request to the test space server and presents the
     response in a tabular manner.
 
@@ -148,14 +398,41 @@ def get(args, long, output_file, format, json_path):
         ts-colab get result_details test_data -o dump.json -f json
 
     This will not only fetch the result meta-data but also the complete report
-    consisting of suite and test case details and annotation.
+    consisting of suite and test case details and annotation. The output file is
+    saved compact and compressed if its extension is one of json.gz, json.xz,
+    ndjson or ndjson.gz (see trove.RESULT_FORMATS). The ndjson extensions are
+    only valid for result details, which are then written as the trove does (a
+    line with the result then a line per folder and suite). The same goes for
+    result_details with -f ndjson.
 
     Extract all test cases or suites from the response
     \b
         ts-colab get result_details test_data -f json -j '$..[cases][:]'
         ts-colab get result_details test_data -f json -j '$..[suites][:]'
 
+    The result contents and suite snippets of complete results are cached on
+    disk. Use --refresh to download them again or --no-cache to bypass the cache.
+
+    The annotation texts are sent gzip compressed. Use --lazy-annotations to only
+    decode the ones that are saved (e.g. none when selecting cases with -j) or
+    --raw-annotations to save them as sent.
+
+    Use --include, --exclude (path patterns, may be repeated) and --max-depth to only
+    load part of a result, the other folders and suites are never requested. These
+    options are only valid for result_details, results_details, result_suites and
+    result_cases
+
+    \b
+        ts-colab get result_details test_data --include '/integration/network'
+        ts-colab get result_details test_data --exclude '**/slow*' --max-depth 2
+
+    The test cases or suites can also be streamed, one JSON document per line, as
+    soon as their suite is downloaded. The files of such records are not result
+    files and cannot have an ndjson extension, use e.g. .jsonl
 
+    \b
+        ts-colab get result_cases test_data -f ndjson
+        ts-colab get result_suites test_data -f ndjson -o suites.jsonl
     """
 
     if not format:
@@ -174,19 +451,43 @@ def get(args, long, output_file, format, json_path):
             kwargs[key.strip()] = value.strip()
         else:
             pargs.append(args[index])
+    if (include or exclude or max_depth) and args[0] not in FILTERED_ENDPOINTS:
+        raise click.UsageError(
+            f"--include, --exclude and --max-depth are not supported by {args[0]}"
+        )
+    if include:
+        kwargs["include"] = list(include)
+    if exclude:
+        kwargs["exclude"] = list(exclude)
+    if max_depth:
+        kwargs["max_depth"] = max_depth
 
     # Build the client
-    client = lib_module.API()
-
-    click.secho(f"URL={client.url}", bold=True)
+    client = make_client(
+        no_cache=no_cache,
+        refresh=refresh,
+        lazy_annotations=lazy_annotations,
+        raw_annotations=raw_annotations,
+    )
 
-    logger.debug(f"api->get_{args[0]}({pargs}, {kwargs})")
+    # Keeps the standard output for the records
+    click.secho(f"URL={client.url}", bold=True, err=format == "ndjson")
 
     try:
-        response = client.__getattr__(f"get_{args[0]}")(*pargs, **kwargs)
+        if hasattr(client, f"iter_{args[0]}"):
+            logger.debug(f"api->iter_{args[0]}({pargs}, {kwargs})")
+            response = getattr(client, f"iter_{args[0]}")(*pargs, **kwargs)
+            if format == "ndjson" and not json_path:
+                check_records_file(output_file)
+                dump_ndjson(response, output_file, raw_annotations=raw_annotations)
+                return
+            response = list(response)
+        else:
+            logger.debug(f"api->get_{args[0]}({pargs}, {kwargs})")
+            response = client.__getattr__(f"get_{args[0]}")(*pargs, **kwargs)
     except AttributeError as attribute_error:
         logger.exception(attribute_error)
-        if "'Testspace' object has no attribute" in str(attribute_error):
+        if f"object has no attribute 'get_{args[0]}'" in str(attribute_error):
             raise click.ClickException(f"no method '{args[0]}' to access resource")
         raise click.ClickException(attribute_error)
 
@@ -200,20 +501,52 @@ def get(args, long, output_file, format, json_path):
                 f"Failed to parse {json_path} expression {exception}"
             )
 
+    if output_file and not is_result_details(response):
+        check_records_file(output_file)
+
     if format == "tabular":
         utils_module.json_to_table(
             json_data=response, ignore_columns=None if long else IGNORE_COLUMNS
         )
     elif format == "yaml":
         print(yaml.dump(response))
+    elif format == "ndjson" and is_result_details(response):
+        # Same layout as the ndjson result files
+        if not output_file:
+            dump_ndjson(
+                trove_module.ndjson_records(response),
+                raw_annotations=raw_annotations,
+            )
+            return
+        output_format = trove_module.result_format(output_file) or ""
+        if not output_format.startswith("ndjson"):
+            output_format = "ndjson"
+    elif format == "ndjson":
+        dump_ndjson(
+            response if isinstance(response, list) else [response],
+            output_file,
+            raw_annotations=raw_annotations,
+        )
+        return
     else:
         pprint.pprint(response)
 
     if output_file:
-        click.secho(f"saving response as json to {output_file}", fg="blue", nl=False)
+        if format != "ndjson":
+            # The file extension tells the format e.g. json.gz
+            output_format = trove_module.result_format(output_file) or "json"
+        click.secho(
+            f"saving response as {output_format} to {output_file}",
+            fg="blue",
+            nl=False,
+        )
         try:
-            with open(output_file, "w") as file_handle:
-                json.dump(response, file_handle, indent=4)
+            trove_module.write_result(
+                response,
+                output_file,
+                format=output_format,
+                decode_annotations=not raw_annotations,
+            )
         except Exception as write_exception:
             logger.exception(write_exception)
             raise click.ClickException(f"failed {write_exception}")
@@ -231,7 +564,74 @@ def get(args, long, output_file, format, json_path):
 @click.option("-p", "--project", required=False, help="Project to scan (name or ID)")
 @click.option("-s", "--space", required=False, help="Space to scan (name or ID)")
 @click.option("-r", "--result", required=False, help="result name or ID")
-def crawl(project, space, output_dir, result):
+@click.option(
+    "--parse-workers",
+    default=0,
+    type=click.IntRange(min=0),
+    help="number of processes converting the downloaded suites (0 to convert "
+    "them in the download threads)",
+)
+@click.option(
+    "--failures-only",
+    is_flag=True,
+    help="only download the folders and suites with failed or errored test cases",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    default=1,
+    type=click.IntRange(min=1),
+    help="number of results downloaded in parallel",
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="only download the results that are new or changed since the last crawl "
+    "(requires --output-dir)",
+)
+@click.option(
+    "--since",
+    callback=lambda ctx, param, value: parse_since(value),
+    help="only crawl the results updated since this ISO 8601 date (or date and time)",
+)
+@click.option(
+    "--plan",
+    is_flag=True,
+    help="print the estimated cost of the results then download the largest first",
+)
+@click.option(
+    "-f",
+    "--format",
+    type=click.Choice(trove_module.RESULT_FORMATS),
+    help="format of the result files (json is indented, the others are compact) "
+    "[default: json, ndjson.gz with --stream]",
+)
+@click.option(
+    "--stream",
+    is_flag=True,
+    help="write the folders and suites to the result files as they are downloaded "
+    "(requires --output-dir and an ndjson format)",
+)
+@cache_options
+@annotation_options
+def crawl(
+    project,
+    space,
+    output_dir,
+    result,
+    parse_workers,
+    failures_only,
+    jobs,
+    incremental,
+    since,
+    plan,
+    format,
+    stream,
+    no_cache,
+    refresh,
+    lazy_annotations,
+    raw_annotations,
+):
     """Crawls an organization for specific project and spaces.
 
     If an output-dir is specified, dumps results into files (with result id)
@@ -243,29 +643,74 @@ def crawl(project, space, output_dir, result):
         /home/laurent/testspace-colab
         └── lbrack.testspace.com
             ├── lbrack:testspace-colab
-            │   ├── elk
-            │   │   ├── build.10@PR-3.json
-            │   │   ├── build.11@PR-3.json
-            │   │   └── build.12@PR-3.json
-            │   ├── json-data-access
-            │   │   ├── build.7@PR-2.json
-            │   └── main
-            │       ├── build.13.json
-            │       └── build.9.json
+            │   ├── elk
+            │   │   ├── build.10@PR-3.json
+            │   │   ├── build.11@PR-3.json
+            │   │   └── build.12@PR-3.json
+            │   ├── json-data-access
+            │   │   ├── build.7@PR-2.json
+            │   └── main
+            │       ├── build.13.json
+            │       └── build.9.json
             ├── lbrack:testspace.getting-started
-            │   └── main
-            │       ├── Sequence_4.json
-            │       ├── Sequence_5.json
+            │   └── main
+            │       ├── Sequence_4.json
+            │       ├── Sequence_5.json
             └── samples
                 └── main
                     └── test_data.json
 
+    The saved results are recorded in a manifest (<netloc>/.manifest.json)
+    and in the catalog of the trove (.catalog.sqlite, see ts-colab trove), which
+    is created from the result files already in the trove if needed. The results
+    that are not downloaded again are indexed too. With --incremental, the results
+    recorded there are only downloaded again if they changed since (according to
+    their updated_at and counts). With --since, the results updated before that
+    date are ignored.
+
+    With --format, the results are saved compact and possibly compressed, e.g.
+    <result>.json.gz instead of <result>.json (indented). Each file is written
+    to a temporary file first then renamed so it is never seen partially
+    written.
+
+    With --failures-only, only the folders and suites with failed or errored
+    test cases are downloaded (the saved results have a failures_only entry).
+
+    With --jobs, that many results are downloaded in parallel (the requests
+    of all of them remain subject to the rate limiting, see --rate-limit).
+    The layout and the reported errors do not depend on the number of jobs.
+
+    With --plan, the results to download are listed first with the estimated
+    number of requests and bytes (from their counts) and they are downloaded
+    largest first, which keeps the jobs busy until the end of the crawl.
+
+    With --stream, the folders and suites are written to the result files as
+    they are downloaded instead of once the whole result is loaded, so that
+    the memory used does not depend on the size of the results. The result
+    files are in the ndjson.gz format unless another ndjson format is given.
     """
+    if incremental and not output_dir:
+        raise click.UsageError("--incremental requires --output-dir")
+    if stream and not output_dir:
+        raise click.UsageError("--stream requires --output-dir")
+    format = format or ("ndjson.gz" if stream else "json")
+    if stream and not format.startswith("ndjson"):
+        raise click.UsageError("--stream requires an ndjson --format")
     parse_error_spec = []
     parse_ok_count = 0
-
-    client = lib_module.API()
-
+    up_to_date_count = 0
+
+    client = make_client(
+        no_cache=no_cache,
+        refresh=refresh,
+        lazy_annotations=lazy_annotations,
+        raw_annotations=raw_annotations,
+        parse_workers=parse_workers,
+    )
+
+    manifest = trove = None
+    catalog_entries = []
+    skipped_files = []  # The result files already in the trove
     if output_dir:
         output_dir = pathlib.Path(output_dir)
         if not output_dir.is_dir():
@@ -275,80 +720,215 @@ def crawl(project, space, output_dir, result):
         if not org_dir.is_dir():
             click.secho(f"creating org dir {org_dir}", fg="blue")
             org_dir.mkdir()
-
-    projects = [project] if project else [s["name"] for s in client.get_projects()]
-
-    for current_project in projects:
-        if output_dir:
-            project_dir = org_dir / current_project
-            if not project_dir.is_dir():
-                click.secho(f"creating project dir {project_dir}", fg="blue")
-                project_dir.mkdir()
-        spaces = (
-            [space]
-            if space
-            else [s["name"] for s in client.get_spaces(project=current_project)]
-        )
-        for current_space in spaces:
-            if output_dir:
-                space_dir = project_dir / current_space
-                if not space_dir.is_dir():
-                    click.secho(f"creating space dir {space_dir}", fg="blue")
-                    space_dir.mkdir(parents=True)
-
-            results = (
-                [result]
-                if result
-                else [
-                    s["name"]
-                    for s in client.get_results(
-                        project=current_project, space=current_space
+        manifest = trove_module.Manifest(org_dir)
+        trove = trove_module.Trove(output_dir)
+        if not trove.catalog.exists():
+            # The results already in the trove are only found through the catalog
+            trove.reindex()
+
+    def list_results(current_project, current_space):
+        """Returns the results of a space to crawl"""
+        if not result:
+            return client.get_results(project=current_project, space=current_space)
+        result_info = dict(name=result)
+        if incremental or since or plan:  # Their metadata is needed
+            try:
+                result_info.update(
+                    client.get_result(
+                        result, project=current_project, space=current_space
                     )
-                ]
+                )
+                result_info["name"] = result
+            except Exception:
+                logger.exception(f"failed to get result {result}")
+        return [result_info]
+
+    def crawl_result(
+        load_spec, current_project, current_space, current_result, result_file
+    ):
+        """Loads (and saves) a result
+
+        :return: None if it could not be loaded, or a (result without details,
+                 checksum of the saved file) tuple
+        """
+        logger.debug(load_spec)
+        if stream:
+            try:
+                with trove_module.ResultWriter(
+                    result_file, format=format, decode_annotations=not raw_annotations
+                ) as writer:
+                    response = client.get_result_details(
+                        current_result,
+                        project=current_project,
+                        space=current_space,
+                        failures_only=failures_only,
+                        progress=False,
+                        sink=writer,
+                    )
+            except Exception:
+                logger.exception(f"failed to parse {load_spec}")
+                return None
+            click.secho(f"saved response as {format} to {result_file}", fg="green")
+            response.pop("details", None)
+            return response, trove_module.file_checksum(result_file)
+        try:
+            response = client.get_result_details(
+                current_result,
+                project=current_project,
+                space=current_space,
+                failures_only=failures_only,
+                progress=False,
+            )
+        except Exception:
+            logger.exception(f"failed to parse {load_spec}")
+            return None
+        checksum = None
+        if result_file:
+            try:
+                trove_module.write_result(
+                    response,
+                    result_file,
+                    format=format,
+                    decode_annotations=not raw_annotations,
+                )
+                checksum = trove_module.file_checksum(result_file)
+            except Exception as write_exception:
+                logger.exception(write_exception)
+                raise click.ClickException(f"failed {write_exception}")
+            click.secho(f"saved response as json to {result_file}", fg="green")
+        response.pop("details", None)
+        return response, checksum
+
+    crawl_tasks = []  # (load spec, project, space, result, file, info) in crawl order
+    futures = dict()  # index of the crawl task -> future
+    progress = rich.progress.Progress()
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=jobs)
+    lister = concurrent.futures.ThreadPoolExecutor(max_workers=jobs)
+    try:
+        with progress, executor, lister:
+            progress_task = progress.add_task("[blue] Results", total=0)
+
+            def submit(index):
+                load_spec, *key, result_file, _ = crawl_tasks[index]
+                future = executor.submit(crawl_result, load_spec, *key, result_file)
+                future.add_done_callback(lambda _: progress.advance(progress_task))
+                futures[index] = future
+
+            projects = (
+                [project] if project else [s["name"] for s in client.get_projects()]
             )
 
-            for current_result in results:
-                result_file = None
+            for current_project in projects:
                 if output_dir:
-                    result_file = space_dir / f"{current_result}.json"  # By result ID
-                    if result_file.is_file():
-                        click.secho(
-                            f"result file {result_file} already exists - skipping",
-                            fg="yellow",
-                            bold=True,
-                        )
-                        continue
-                load_spec = (
-                    f"crawl=>org={client.url}, project={current_project}, space={current_space}, "
-                    f"result={current_result}"
+                    project_dir = org_dir / current_project
+                    if not project_dir.is_dir():
+                        click.secho(f"creating project dir {project_dir}", fg="blue")
+                        project_dir.mkdir()
+                spaces = (
+                    [space]
+                    if space
+                    else [s["name"] for s in client.get_spaces(project=current_project)]
                 )
-                click.secho(load_spec, fg="blue")
-                logger.debug(load_spec)
-                try:
-                    response = client.get_result_details(
-                        current_result, project=current_project, space=current_space
-                    )
-                    parse_ok_count += 1
-                except Exception:
+                # The spaces are listed concurrently
+                listings = lister.map(
+                    functools.partial(list_results, current_project), spaces
+                )
+                for current_space, results in zip(spaces, listings):
+                    if output_dir:
+                        space_dir = project_dir / current_space
+                        if not space_dir.is_dir():
+                            click.secho(f"creating space dir {space_dir}", fg="blue")
+                            space_dir.mkdir(parents=True)
+
+                    for result_info in results:
+                        current_result = result_info["name"]
+                        if since and not updated_since(result_info, since):
+                            continue
+                        result_file = None
+                        if output_dir:
+                            result_file = space_dir / f"{current_result}.{format}"
+                            if incremental:
+                                if manifest.is_current(
+                                    current_project,
+                                    current_space,
+                                    current_result,
+                                    result_info,
+                                    failures_only=failures_only,
+                                    result_file=result_file,
+                                ):
+                                    up_to_date_count += 1
+                                    skipped_files.append(result_file)
+                                    continue
+                            elif result_file.is_file():
+                                click.secho(
+                                    f"result file {result_file} already exists "
+                                    "- skipping",
+                                    fg="yellow",
+                                    bold=True,
+                                )
+                                skipped_files.append(result_file)
+                                continue
+                        load_spec = (
+                            f"crawl=>org={client.url}, project={current_project}, "
+                            f"space={current_space}, result={current_result}"
+                        )
+                        click.secho(load_spec, fg="blue")
+                        crawl_tasks.append(
+                            (
+                                load_spec,
+                                current_project,
+                                current_space,
+                                current_result,
+                                result_file,
+                                result_info,
+                            )
+                        )
+                        progress.update(progress_task, total=len(crawl_tasks))
+                        if not plan:
+                            submit(len(crawl_tasks) - 1)
+
+            if plan:
+                costs = [
+                    lib_module.estimate_result_cost(crawl_task[-1])
+                    for crawl_task in crawl_tasks
+                ]
+                print_plan(crawl_tasks, costs)
+                # Largest first so that the last results to complete are small
+                for index in sorted(
+                    range(len(crawl_tasks)),
+                    key=lambda index: costs[index]["bytes"],
+                    reverse=True,
+                ):
+                    submit(index)
+
+            for index, (load_spec, *key, result_file, _) in enumerate(crawl_tasks):
+                crawled = futures[index].result()
+                if crawled is None:
                     parse_error_spec.append(load_spec)
-                    logger.exception(f"failed to parse {load_spec}")
-                else:
-                    if result_file:
-                        click.secho(
-                            f"saving response as json to {result_file}",
-                            fg="blue",
-                            nl=False,
+                    continue
+                parse_ok_count += 1
+                if result_file:
+                    manifest.record(*key, crawled[0], result_file, checksum=crawled[1])
+                    catalog_entries.append(
+                        trove.catalog.entry(
+                            org_dir.name, *key[:2], result_file, crawled[0]
                         )
-                        try:
-                            with open(result_file, "w") as file_handle:
-                                json.dump(response, file_handle, indent=4)
-                        except Exception as write_exception:
-                            logger.exception(write_exception)
-                            raise click.ClickException(f"failed {write_exception}")
-                        click.secho(" Done!", fg="green")
+                    )
+    finally:
+        if manifest:
+            manifest.save()
+            trove.catalog.update(catalog_entries)
+            # Indexes the skipped files missing from the catalog (or changed since)
+            trove.reindex(
+                (org_dir.name, file.parent.parent.name, file.parent.name, file)
+                for file in skipped_files
+            )
 
+    client.close()
     num_failures = len(parse_error_spec)
 
+    if incremental:
+        click.secho(f"{up_to_date_count} results up to date")
     click.secho(f"Parsed {parse_ok_count} resuls with {num_failures} errors")
     if num_failures:
         raise click.ClickException(
@@ -384,6 +964,61 @@ def jupyter(no_elk):
         raise click.ClickException(f"Jupyter lab existed with an error {exit_code}")
 
 
+@main.group()
+@click.option(
+    "-t",
+    "--trove-dir",
+    default=str(trove_module.DEFAULT_LOCATION),
+    show_default=True,
+    type=click.Path(file_okay=False),
+    help="the trove directory (e.g. the output dir of crawl)",
+)
+@click.pass_context
+def trove(ctx, trove_dir):
+    """Command group to manage the results saved by crawl"""
+    ctx.ensure_object(dict)
+    ctx.obj["trove"] = trove_module.Trove(trove_dir)
+
+
+@trove.command()
+@click.pass_context
+def reindex(ctx):
+    """Updates the catalog of the trove from the result files.
+
+    The catalog (.catalog.sqlite in the trove directory) holds a row per result
+    so that they can be found without reading every file. It is updated by
+    crawl; reindex it after adding, changing or removing result files by other
+    means.
+    """
+    trove_object = ctx.obj["trove"]
+    if not trove_object.path.is_dir():
+        raise click.ClickException(f"{trove_object.path} is not a directory")
+    count = trove_object.reindex()
+    click.secho(f"{count} results indexed in {trove_object.catalog.path}", fg="green")
+
+
+@trove.command()
+@click.argument("dest", type=click.Path(file_okay=False))
+@click.option("--full", is_flag=True, help="export all the results again")
+@click.pass_context
+def export(ctx, dest, full):
+    """Exports the test cases and suites of the trove as a Parquet dataset.
+
+    The dataset (in DEST) has a cases and a suites table, partitioned by
+    organization, project and space. Only the results that are new or changed
+    since the last export are written, unless --full is set. Requires pyarrow
+    (pip install testspace-colab[parquet]).
+    """
+    trove_object = ctx.obj["trove"]
+    if not trove_object.path.is_dir():
+        raise click.ClickException(f"{trove_object.path} is not a directory")
+    try:
+        count = trove_object.export_dataset(dest, full=full)
+    except ImportError as error:
+        raise click.ClickException(str(error))
+    click.secho(f"{count} results exported to {dest}", fg="green")
+
+
 @main.group()
 def elk():
     """Command group to control the Elastic Stack docker image"""
@@ -3,80 +3,713 @@
     All the API we are going to come up with=
 
 """
+import io
 import os
+import sys
 import json
+import math
+import time
+import random
+import asyncio
+import threading
+import functools
+import collections
+import multiprocessing
 import pkg_resources
 import pathlib
 import configparser
+import contextlib
 import urllib.parse
+import concurrent.futures
 import xml.etree.ElementTree as ElementTree
 import click
+import requests
+import requests.adapters
 import rich.progress
 import testspace.testspace as testspace
 import testspace_colab.utils as utils_module
+import testspace_colab.cache as cache_module
+import testspace_colab.metrics as metrics_module
+import testspace_colab.ratelimit as ratelimit_module
 import testspace_colab.ts_log
 
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - optional, see the "async" extra
+    aiohttp = None
+
 logger = testspace_colab.ts_log.get_logger("api")
 
+DEFAULT_MAX_WORKERS = 8
+
+SNIPPET_BUFFER_SIZE = 64 * 1024
+""" Size of the chunks read from the suite snippet streams"""
+
+STREAM_SNIPPET_SIZE = 16 * 1024 * 1024
+""" Suite snippets larger than this (in bytes) are converted as they are read, the
+smaller ones are read first then converted in one go, which is faster (see
+:func:`parse_snippet`)"""
+
+DEFAULT_RETRIES = 3
+""" Number of times an idempotent request is retried"""
+
+DEFAULT_BACKOFF_FACTOR = 0.5
+""" Base delay (in seconds) of the exponential backoff between retries"""
+
+MAX_BACKOFF = 30.0
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+""" Status codes for which GET requests are retried"""
+
+THROTTLE_STATUS_CODES = (429, 503)
+""" Status codes by which the server asks to slow down (see
+:class:`testspace_colab.ratelimit.AdaptiveLimiter`)"""
+
+METADATA_ENDPOINTS = (
+    "get_projects",
+    "get_project",
+    "get_spaces",
+    "get_space",
+    "get_results",
+)
+""" Client methods whose responses are memoized by the API"""
+
+FAILURE_CASE_COUNTS = (1, 3)
+""" Indexes of the failed and errored cases in the ``case_counts``
+(passed, failed, not applicable, errored)"""
+
+SNIPPET_ENDPOINT = "get_snippet"
+""" Endpoint under which the suite snippet downloads are recorded (see :meth:`API.stats`)"""
+
+CONTAINER_STAMPS = ("id", "case_counts", "updated_at")
+""" Container attributes compared to detect the changes of a result
+(see :meth:`API.refresh_result_details`)"""
+
+ESTIMATED_BYTES = dict(suites=600, cases=300, annotations=1200)
+""" Rough size in bytes of a suite, a test case and an annotation in the suite
+snippets (see :func:`estimate_result_cost`)"""
+
+ESTIMATED_SUITES_PER_FOLDER = 8
+""" Rough number of suites per folder listing (see :func:`estimate_result_cost`)"""
+
+
+class ResponseStream(io.RawIOBase):
+    """Readable binary stream over the content of a streamed response
+    (``get_request(..., stream=True)``).
+
+    Closing the stream releases the connection back to the pool.
+
+    :param response: the streamed response
+    :param metrics: If set, the bytes read and the time spent reading are
+                    recorded for ``endpoint``
+    :param endpoint: the endpoint of the request
+    """
+
+    def __init__(self, response, metrics=None, endpoint=None):
+        super().__init__()
+        self._response = response
+        self._response.raw.decode_content = True  # The content may be compressed
+        self._metrics = metrics
+        self._endpoint = endpoint
+        self._bytes = 0
+        self._seconds = 0.0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        start = time.perf_counter()
+        data = self._response.raw.read(len(buffer))
+        if self._metrics:
+            seconds = time.perf_counter() - start
+            self._seconds += seconds
+            self._bytes += len(data)
+            self._metrics.add_io_time(seconds)
+        buffer[: len(data)] = data
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            super().close()
+            self._response.close()
+            if self._metrics:
+                self._metrics.transfer(self._endpoint, self._bytes, self._seconds)
+
+
+class _PrefixedStream(io.RawIOBase):
+    """Readable binary stream returning ``prefix`` then the rest of ``source``"""
+
+    def __init__(self, prefix, source):
+        super().__init__()
+        self._prefix = memoryview(prefix)
+        self._source = source
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._prefix:
+            size = min(len(buffer), len(self._prefix))
+            buffer[:size] = self._prefix[:size]
+            self._prefix = self._prefix[size:]
+            return size
+        data = self._source.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+class ConnectionPool:
+    """Process wide HTTP session shared by all the :class:`API` instances.
+
+    The session keeps the connections alive so the thousands of small GET
+    requests issued while loading results reuse the same TCP/TLS connections.
+    Use :meth:`configure` to tune the pool before (or between) requests.
+    """
+
+    settings = dict(
+        pool_connections=10,  # number of hosts for which a pool is kept
+        pool_maxsize=DEFAULT_MAX_WORKERS * 4,  # connections kept per host
+        pool_block=True,  # never open more than pool_maxsize connections per host
+        keep_alive=True,
+    )
+    _session = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, **settings):
+        """Updates the pool settings. The current session is closed and
+        a new one is created on the next request.
+
+        :param pool_connections: number of hosts for which connections are kept
+        :param pool_maxsize: maximum number of connections per host
+        :param pool_block: block when all the connections to a host are in use
+        :param keep_alive: keep the connections open between requests
+        """
+        unknown = set(settings) - set(cls.settings)
+        if unknown:
+            raise ValueError(f"unknown connection pool settings {unknown}")
+        with cls._lock:
+            cls.settings = dict(cls.settings, **settings)
+            if cls._session:
+                cls._session.close()
+                cls._session = None
+
+    @classmethod
+    def session(cls):
+        """Returns the shared session, creating it if needed"""
+        with cls._lock:
+            if cls._session is None:
+                logger.debug(f"creating HTTP session {cls.settings}")
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=cls.settings["pool_connections"],
+                    pool_maxsize=cls.settings["pool_maxsize"],
+                    pool_block=cls.settings["pool_block"],
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                if not cls.settings["keep_alive"]:
+                    session.headers["Connection"] = "close"
+                cls._session = session
+            return cls._session
+
+
+def _normalize_url(url):
+    """Returns the url of a testspace organization with a scheme (https if it is a
+    bare host e.g. ``org.testspace.com``) and without trailing slash"""
+    url = (url or "").strip().rstrip("/")
+    if url and "://" not in url:
+        url = f"https://{url}"
+    return url
+
+
+class PooledTestspace(testspace.Testspace):
+    """A testspace.Testspace client issuing its GET requests on the
+    :class:`ConnectionPool` session.
+
+    Idempotent GET requests are retried on connection errors and on
+    :data:`RETRY_STATUS_CODES` with a jittered exponential backoff.
+
+    :param retries: number of retries before giving up
+    :param backoff_factor: base delay of the backoff in seconds
+    :param metrics: If set, the requests are recorded in this
+                    :class:`testspace_colab.metrics.Metrics` under the current
+                    endpoint (see :func:`testspace_colab.metrics.endpoint`)
+    :param limiter: If set, the requests are sent within the limits of this
+                    :class:`testspace_colab.ratelimit.AdaptiveLimiter`
+    """
+
+    def __init__(
+        self,
+        token,
+        url,
+        project=None,
+        space=None,
+        retries=DEFAULT_RETRIES,
+        backoff_factor=DEFAULT_BACKOFF_FACTOR,
+        metrics=None,
+        limiter=None,
+    ):
+        super().__init__(token=token, url=url, project=project, space=space)
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.metrics = metrics
+        self.limiter = limiter
+        self._api_url = _normalize_url(url) + "/api/"
+        self._headers = {"Authorization": f"Token {token}"} if token else {}
+
+    def _backoff(self, attempt):
+        # Full jitter so that concurrent requests do not retry in lock step
+        return random.uniform(0, min(MAX_BACKOFF, self.backoff_factor * 2 ** attempt))
+
+    def get_request(self, path, params=None, stream=False):
+        """Performs a GET request on the shared session
+
+        :param path: the absolute url or a path relative to the api url
+        :param params: the query parameters
+        :param stream: if set, the content is not downloaded immediately
+        :return: a requests.Response
+        """
+        if urllib.parse.urlparse(path).scheme:
+            url = path
+        else:
+            url = urllib.parse.urljoin(self._api_url, path)
+        endpoint = metrics_module.current_endpoint()
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            throttled, retry_after = False, None
+            try:
+                # An empty ExitStack stands for contextlib.nullcontext (Python 3.7)
+                with self.limiter.slot() if self.limiter else contextlib.ExitStack():
+                    sent = time.perf_counter()
+                    response = ConnectionPool.session().get(
+                        url, headers=self._headers, params=params, stream=stream
+                    )
+            except (requests.ConnectionError, requests.Timeout) as request_error:
+                if attempt >= self.retries:
+                    if self.metrics:
+                        self.metrics.record(
+                            endpoint, time.perf_counter() - start, error=True
+                        )
+                    raise
+                logger.warning(f"GET {url} failed ({request_error}) - retrying")
+            else:
+                if response.status_code in THROTTLE_STATUS_CODES:
+                    throttled = True
+                    retry_after = ratelimit_module.parse_retry_after(
+                        response.headers.get("Retry-After")
+                    )
+                    if self.limiter:
+                        self.limiter.on_throttle(retry_after)
+                elif self.limiter and response.status_code < 500:
+                    self.limiter.on_success(time.perf_counter() - sent)
+                if (
+                    response.status_code not in RETRY_STATUS_CODES
+                    or attempt >= self.retries
+                ):
+                    if self.metrics:
+                        self.metrics.record(
+                            endpoint,
+                            time.perf_counter() - start,
+                            # A streamed content is counted as it is read
+                            size=0 if stream else len(response.content),
+                            error=response.status_code >= 400,
+                        )
+                    return response
+                logger.warning(f"GET {url} returned {response.status_code} - retrying")
+                response.close()
+            if self.metrics:
+                self.metrics.retry(endpoint, throttled=throttled)
+            if self.limiter and retry_after:
+                # The limiter holds all the requests to the server meanwhile
+                time.sleep(self._backoff(attempt))
+            else:
+                time.sleep(max(self._backoff(attempt), retry_after or 0))
+            attempt += 1
+
+
+def load_config(token=None, url=None, project=None, space=None):
+    """Loads the testspace configuration and applies the overrides.
+
+    The configuration is read from ``~/.config/testspace/config`` unless the
+    TS_COLAB_CONFIG_DIR environment variable is set.
+
+    :param token: Overrides the configuration token
+    :param url: Overrides the configuration url
+    :param project: Overrides the configuration project
+    :param space: Overrides the configuration space
+    :return: a (token, url, project, space) tuple
+    """
+    config_token = None
+    config_url = None
+    config_project = None
+    config_space = None
+
+    config_dir = pathlib.Path(os.path.expanduser("~")) / ".config" / "testspace"
+    if "TS_COLAB_CONFIG_DIR" in os.environ:
+        config_dir = pathlib.Path(os.environ["TS_COLAB_CONFIG_DIR"])
+        assert config_dir.is_dir(), f"{config_dir} dir not found"
+        click.secho(f"using TS_COLAB_CONFIG_DIR={config_dir}")
+
+    config_path = config_dir / "config"
+
+    logger.debug(f"testspace config file {config_path}")
+    if config_path.is_file():
+        (
+            config_token,
+            config_url,
+            config_project,
+            config_space,
+        ) = _read_config_file(str(config_path), config_path.stat().st_mtime)
+
+    if token:
+        logger.debug("overrideing token with argument")
+        config_token = token
+    if url:
+        logger.debug(f"overrideing url {config_url} with arg {url}")
+        config_url = url
+    if project:
+        logger.debug(f"overrideing project {config_project} with arg {project}")
+        config_project = project
+    if space:
+        logger.debug(f"overrideing space {config_space} with arg {space}")
+        config_space = space
+
+    logger.debug(
+        f"token={config_token} url={config_url}, project={config_project}, space={config_space}"
+    )
+    return config_token, config_url, config_project, config_space
+
+
+@functools.lru_cache(maxsize=8)
+def _read_config_file(config_path, mtime):
+    """Parses the testspace config file. The modification time is part of the
+    cache key so that the file is only parsed again once modified."""
+    logger.debug(f"loading testspace config file {config_path} ")
+    config_token = None
+    config_url = None
+    with open(config_path) as file_handle:
+        # Config parser expects a section so we trick it by injecting
+        # one and ignoring it
+        file_content = "[dummy_section]\n" + file_handle.read()
+    config = configparser.RawConfigParser()
+    config.read_string(file_content)
+    domain = config["dummy_section"].get("remote.domain")
+    if domain:
+        parts = urllib.parse.urlparse(domain)
+        if ":@" in parts.netloc:
+            config_token, config_url = parts.netloc.split(":@")
+        else:
+            config_url = parts.netloc
+        config_url = parts.scheme + "://" + config_url
+
+    return (
+        config_token,
+        config_url,
+        config["dummy_section"].get("remote.project"),
+        config["dummy_section"].get("remote.space"),
+    )
+
+
+def estimate_result_cost(result):
+    """Estimates the cost of loading the details of a result from the counts
+    returned by get_result or get_results (``session_suite_counts``,
+    ``session_case_counts`` and ``annotation_counts``)
+
+    :param result: the result
+    :return: a dict holding the ``suites``, ``cases`` and ``annotations`` counts
+             and the estimated number of ``requests`` and ``bytes``
+    """
+
+    def total(counts):
+        if isinstance(counts, (list, tuple)):
+            return sum(count or 0 for count in counts)
+        return counts or 0
+
+    cost = dict(
+        suites=total(result.get("session_suite_counts")),
+        cases=total(result.get("session_case_counts")),
+        annotations=total(result.get("annotation_counts")),
+    )
+    # get_result, the listings and a snippet per suite
+    cost["requests"] = (
+        2 + cost["suites"] + math.ceil(cost["suites"] / ESTIMATED_SUITES_PER_FOLDER)
+    )
+    cost["bytes"] = sum(
+        ESTIMATED_BYTES[object_type] * cost[object_type]
+        for object_type in ESTIMATED_BYTES
+    )
+    return cost
+
+
+def parse_snippet(content, path, progress_callback=None, lazy_annotations=False):
+    """Converts the content of a suite snippet (as downloaded from
+    the suite ``download_url``) to JSON.
+
+    A stream (e.g. a response) can be passed instead of the whole content. Streams
+    larger than :data:`STREAM_SNIPPET_SIZE` are converted as they are read (see
+    :func:`testspace_colab.utils.xml_stream_to_json`) so that the XML tree is never
+    entirely in memory, the others are read then converted in one go.
+
+    :param content: the snippet as bytes or as a binary file object
+    :param path: Path of the folder holding the suite
+    :param progress_callback: a progress callback function
+    :param lazy_annotations: If set, annotations texts are decoded on access
+                             (see :class:`testspace_colab.utils.LazyText`)
+    :return: a dict with a ``suite`` or ``case`` entry
+    """
+    if isinstance(content, bytes):
+        # Already in memory: building the tree first is the fastest
+        if content.lstrip()[:1] in (b"{", b"["):
+            return json.loads(content.decode("utf-8"))
+        return utils_module.xml_to_json(
+            ElementTree.fromstring(content),
+            path=path,
+            progress_callback=progress_callback,
+            lazy_annotations=lazy_annotations,
+        )
+    stream = io.BufferedReader(content, buffer_size=SNIPPET_BUFFER_SIZE)
+    if stream.peek(64).lstrip()[:1] in (b"{", b"["):
+        # For manual testing the content is in JSON format
+        return json.load(stream)
+    head = stream.read(STREAM_SNIPPET_SIZE)
+    if len(head) < STREAM_SNIPPET_SIZE:  # The whole snippet
+        return parse_snippet(
+            head,
+            path=path,
+            progress_callback=progress_callback,
+            lazy_annotations=lazy_annotations,
+        )
+    return utils_module.xml_stream_to_json(
+        io.BufferedReader(
+            _PrefixedStream(head, stream), buffer_size=SNIPPET_BUFFER_SIZE
+        ),
+        path=path,
+        progress_callback=progress_callback,
+        lazy_annotations=lazy_annotations,
+    )
+
+
+def parse_snippet_cases(content, path):
+    """Extracts the test cases of a suite snippet as columns (see
+    :func:`testspace_colab.utils.xml_stream_to_case_columns`)
+
+    :param content: the snippet as bytes or as a binary file object
+    :param path: Path of the folder holding the suite
+    :return: a :class:`testspace_colab.utils.CaseColumns`
+    """
+    if isinstance(content, bytes):
+        content = io.BytesIO(content)
+    stream = io.BufferedReader(content, buffer_size=SNIPPET_BUFFER_SIZE)
+    if stream.peek(64).lstrip()[:1] in (b"{", b"["):
+        json_data = json.load(stream)
+        if isinstance(json_data, dict):
+            json_data = list(json_data.values())
+        return utils_module.details_to_case_columns(json_data)
+    return utils_module.xml_stream_to_case_columns(stream, path=path)
+
+
+def _has_failures(container):
+    """Tells whether a result or a container of its contents listing has failed
+    (or errored) test cases according to its counts. Containers without counts
+    are deemed to have failures."""
+    counts = container.get("case_counts")
+    if counts is not None:
+        return any(
+            counts[index] for index in FAILURE_CASE_COUNTS if index < len(counts)
+        )
+    counts = container.get("session_failure_counts")
+    if counts is not None:
+        return any(counts)
+    return True
+
+
+def _is_unchanged(container, previous_container):
+    """Tells whether a container of a result contents listing is the same as
+    the one previously loaded, in which case its content can be reused.
+
+    The containers are compared using their :data:`CONTAINER_STAMPS`. Containers
+    without ``case_counts`` nor ``updated_at`` are never deemed unchanged, nor are
+    those whose previous content could not be fully loaded.
+    """
+    if not previous_container or container["type"] != previous_container.get("type"):
+        return False
+    if "case_counts" not in container and "updated_at" not in container:
+        return False
+    for stamp in CONTAINER_STAMPS:
+        if container.get(stamp) != previous_container.get(stamp):
+            return False
+    if container["type"].startswith("suite"):
+        return "suites" in previous_container or "case_columns" in previous_container
+    if "folders" not in previous_container:
+        return False
+    stack = [previous_container["folders"]]
+    while stack:
+        for child in stack.pop():
+            if "load_error" in child:
+                return False
+            if "folders" in child:
+                stack.append(child["folders"])
+            elif child.get("type", "").startswith("folder"):
+                return False  # Not loaded
+    return True
+
+
+def _store_snippet(container, json_data):
+    """Adds a converted snippet to its suite container"""
+    if "suite" in json_data:
+        container["suites"].append(json_data["suite"])
+    if "case" in json_data:
+        container["cases"].append(json_data["case"])
+
+
+def parse_snippet_task(content, path, lazy_annotations=False):
+    """Converts a suite snippet in a worker process (see
+    :meth:`API.get_result_details` ``parse_workers``)
+
+    :return: a (json_data, progress) tuple where progress holds the
+             number of objects converted per object type.
+    """
+    progress = dict()
+
+    def count(object_type, object_count):
+        progress[object_type] = progress.get(object_type, 0) + object_count
+
+    json_data = parse_snippet(
+        content, path=path, progress_callback=count, lazy_annotations=lazy_annotations
+    )
+    return json_data, progress
+
+
+def timed_task(function, *args):
+    """Runs ``function`` in a worker process
+
+    :return: a (result, duration in seconds) tuple
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+class _ResultWalk:
+    """The loading of the content of a result by :meth:`API._walk`, see
+    :meth:`API._load_results` for the parameters. The loaded listing is
+    ``details``.
+
+    If ``container_callback`` is set, it is called with the position (the indexes
+    of the container and of its parent folders) and the container of each folder
+    and suite as soon as it is loaded, after which the container is emptied: the
+    memory held by the walk does not grow with the size of the result.
+    """
+
+    def __init__(
+        self,
+        result_id,
+        project,
+        space,
+        path=None,
+        progress_callback=None,
+        cache_key=None,
+        lazy_annotations=False,
+        cases_only=False,
+        previous=None,
+        path_filter=None,
+        failures_only=False,
+        container_callback=None,
+    ):
+        self.result_id = result_id
+        self.project = project
+        self.space = space
+        self.path = path
+        self.progress_callback = progress_callback
+        self.cache_key = cache_key
+        self.lazy_annotations = lazy_annotations
+        self.cases_only = cases_only
+        self.previous = previous
+        self.path_filter = path_filter
+        self.failures_only = failures_only
+        self.container_callback = container_callback
+        self.details = None
+        self.pending = 0  # Listings, snippets and conversions not done yet
+
 
 class API:
-    """Programming Interface for this package."""
+    """Programming Interface for this package.
 
-    def __init__(self, token=None, url=None, project=None, space=None):
-        # Try to attempt to load the configuration information
-        self._token = None
-        self._url = None
-        self._project = None
-        self._space = None
-
-        config_dir = pathlib.Path(os.path.expanduser("~")) / ".config" / "testspace"
-        if "TS_COLAB_CONFIG_DIR" in os.environ:
-            config_dir = pathlib.Path(os.environ["TS_COLAB_CONFIG_DIR"])
-            assert config_dir.is_dir(), f"{config_dir} dir not found"
-            click.secho(f"using TS_COLAB_CONFIG_DIR={config_dir}")
-
-        config_path = config_dir / "config"
-
-        logger.debug(f"testspace config file {config_path}")
-        if config_path.is_file():
-            logger.debug(f"loading testspace config file {config_path} ")
-            with open(config_path) as file_handle:
-                # Config parser expects a section so we trick it by injecting
-                # one and ignoring it
-                file_content = "[dummy_section]\n" + file_handle.read()
-            config = configparser.RawConfigParser()
-            config.read_string(file_content)
-            domain = config["dummy_section"].get("remote.domain")
-            if domain:
-                parts = urllib.parse.urlparse(domain)
-                if ":@" in parts.netloc:
-                    self._token, self._url = parts.netloc.split(":@")
-                else:
-                    self._url = parts.netloc
-                self._url = parts.scheme + "://" + self._url
-
-            self._project = config["dummy_section"].get("remote.project")
-            self._space = config["dummy_section"].get("remote.space")
-
-        if token:
-            logger.debug("overrideing token with argument")
-            self._token = token
-        if url:
-            logger.debug(f"overrideing url {self._url} with arg {url}")
-            self._url = url
-        if project:
-            logger.debug(f"overrideing project {self._project} with arg {project}")
-            self._project = project
-        if space:
-            logger.debug(f"overrideing space {self._space} with arg {space}")
-            self._space = space
+    :param token: Overrides the configuration token
+    :param url: Overrides the configuration url
+    :param project: Overrides the configuration project
+    :param space: Overrides the configuration space
+    :param max_workers: Number of concurrent requests when loading results
+    :param retries: Number of retries of failed GET requests
+    :param backoff_factor: Base delay in seconds between retries
+    :param cache_dir: If set, the result contents and suite snippets of complete
+                      results are cached in this directory
+    :param cache_size: Maximum size of the cache in bytes
+    :param refresh_cache: If set, the cache is updated but never read
+    :param metadata_ttl: Time (in seconds) the responses of the
+                         :data:`METADATA_ENDPOINTS` are kept in memory (0 to disable)
+    :param lazy_annotations: If set, the annotation texts of the result details are
+                             only decoded on access
+                             (see :class:`testspace_colab.utils.LazyText`)
+    :param parse_workers: If set, the suite snippets are converted by a pool of
+                          ``parse_workers`` processes (see :meth:`close`)
+    :param rate_limit: If set, maximum number of requests per second sent to the
+                       server. The clients of a same server share the limit as
+                       well as the concurrency window adapted to its throttling
+                       (see :class:`testspace_colab.ratelimit.AdaptiveLimiter`)
+    """
 
-        logger.debug(
-            f"token={self._token} url={self._url}, project={self._project}, space={self._space}"
+    def __init__(
+        self,
+        token=None,
+        url=None,
+        project=None,
+        space=None,
+        max_workers=DEFAULT_MAX_WORKERS,
+        retries=DEFAULT_RETRIES,
+        backoff_factor=DEFAULT_BACKOFF_FACTOR,
+        cache_dir=None,
+        cache_size=cache_module.DEFAULT_MAX_SIZE,
+        refresh_cache=False,
+        metadata_ttl=cache_module.DEFAULT_TTL,
+        lazy_annotations=False,
+        parse_workers=0,
+        rate_limit=None,
+    ):
+        self.max_workers = max_workers
+        self.lazy_annotations = lazy_annotations
+        self.parse_workers = parse_workers
+        self._parse_executor = None
+        self._parse_executor_lock = threading.Lock()
+        self.metadata_cache = cache_module.TTLCache(ttl=metadata_ttl)
+        self.cache = (
+            cache_module.DiskCache(cache_dir, max_size=cache_size)
+            if cache_dir
+            else None
+        )
+        self.refresh_cache = refresh_cache
+        self.metrics = metrics_module.Metrics()
+        # Try to attempt to load the configuration information
+        self._token, self._url, self._project, self._space = load_config(
+            token=token, url=url, project=project, space=space
         )
+        self.limiter = ratelimit_module.AdaptiveLimiter.for_host(
+            urllib.parse.urlparse(self._url or "").netloc
+        )
+        if rate_limit:
+            self.limiter.bucket.configure(rate_limit)
 
-        self.client = testspace.Testspace(
-            token=self._token, url=self._url, project=self._project, space=self._space
+        self.client = PooledTestspace(
+            token=self._token,
+            url=self._url,
+            project=self._project,
+            space=self._space,
+            retries=retries,
+            backoff_factor=backoff_factor,
+            metrics=self.metrics,
+            limiter=self.limiter,
         )
 
     @property
@@ -103,19 +736,145 @@ class API:
         except AttributeError:
             pass
         # Otherwise we query the client api
-        return self.client.__getattribute__(item)
+        attribute = self.client.__getattribute__(item)
+        if item.startswith("get_") and callable(attribute):
+            attribute = self._label(item, attribute)
+        if item in METADATA_ENDPOINTS and self.metadata_cache.ttl:
+            return self.metadata_cache.memoize(item, attribute)
+        return attribute
 
-    def get_result_details(self, result, project=None, space=None):
+    @staticmethod
+    def _label(endpoint, function):
+        """Wraps a client method so its requests are recorded under ``endpoint``"""
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with metrics_module.endpoint(endpoint):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    def stats(self, reset=False):
+        """Returns what was recorded about the requests issued so far, per endpoint,
+        and about the conversion of the suite snippets (``parse`` entry).
+
+        For each endpoint: the number of ``requests``, ``errors`` and ``retries``,
+        the ``bytes`` received, the ``transfer_time`` spent reading the streamed
+        contents and the ``latency`` histogram (in seconds). The latency of
+        ``parse`` excludes the time spent reading the snippets.
+
+        :param reset: If set, the statistics are reset once returned
+        :return: a dict endpoint -> statistics
+        """
+        stats = self.metrics.stats()
+        if reset:
+            self.metrics.reset()
+        return stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Shuts down the parse worker processes (if any)"""
+        if self._parse_executor:
+            self._parse_executor.shutdown()
+            self._parse_executor = None
+
+    def _get_parse_executor(self, parse_workers):
+        """Returns the process pool used to convert the snippets. The pool
+        is kept between calls as starting processes is expensive.
+
+        The worker processes are spawned rather than forked where possible (or else
+        forked right away) as forking a process running threads (e.g. the download
+        threads) may leave the children with locks that are never released.
+        """
+        with self._parse_executor_lock:
+            if (
+                self._parse_executor
+                and self._parse_executor._max_workers != parse_workers
+            ):
+                self.close()
+            if self._parse_executor is None:
+                logger.debug(f"starting {parse_workers} parse workers")
+                kwargs = dict()
+                if sys.version_info >= (3, 7):  # No mp_context on Python 3.6
+                    kwargs["mp_context"] = multiprocessing.get_context("spawn")
+                self._parse_executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=parse_workers, **kwargs
+                )
+                # Forked pools start all their workers with the first task
+                self._parse_executor.submit(int).result()
+            return self._parse_executor
+
+    def invalidate(self, endpoint=None):
+        """Drops the memoized metadata
+
+        :param endpoint: one of :data:`METADATA_ENDPOINTS` (all if not set)
+        """
+        if endpoint:
+            self.metadata_cache.invalidate(endpoint)
+        else:
+            self.metadata_cache.invalidate()
+
+    def get_result_details(
+        self,
+        result,
+        project=None,
+        space=None,
+        max_workers=None,
+        lazy_annotations=None,
+        parse_workers=None,
+        include=None,
+        exclude=None,
+        max_depth=None,
+        failures_only=False,
+        progress=True,
+        sink=None,
+    ):
         """This method recursively walk the results structure and extracts information
         from the "xml snipped" associated to suites (containing testcases).
 
         It basically calls the testspace::get_result() method and then recurlively
-        loads the information.
+        loads the information. Sibling folders and suite snippets are fetched
+        concurrently by a pool of ``max_workers`` threads.
 
         :param result: the result ID or name
         :param project: The project ID or name (optional - to override ctor argument)
         :param space: The project ID or name (optional - to override ctor argument)
-        :return: a JSON structure (from testspace)
+        :param max_workers: Number of concurrent requests (optional - to override ctor argument)
+        :param lazy_annotations: Decode the annotation texts on access
+                                 (optional - to override ctor argument)
+        :param parse_workers: Number of processes converting the snippets while the
+                              threads download them, 0 to convert them in the
+                              download threads (optional - to override ctor argument)
+        :param include: If set, only the folders and suites whose path matches one
+                        of these patterns are loaded (see
+                        :class:`testspace_colab.utils.PathFilter`)
+        :param exclude: The folders and suites whose path matches one of these
+                        patterns are not loaded
+        :param max_depth: If set, the folders and suites deeper than ``max_depth``
+                          are not loaded (1 for the top level ones)
+        :param failures_only: If set, only the folders and suites with failed or
+                              errored test cases are loaded, according to their
+                              ``case_counts``. The response has a ``failures_only``
+                              entry.
+        :param progress: If not set, the loading progress is not displayed (e.g.
+                         when loading results from several threads)
+        :param sink: If set, the details are not kept in memory but handed to
+                     ``sink`` as they are loaded: the result (with empty ``details``)
+                     is passed to ``sink.write_result(result)`` then each folder and
+                     suite to ``sink.write_container(position, container)`` (see
+                     :class:`testspace_colab.trove.ResultWriter`)
+        :return: a JSON structure (from testspace), with empty ``details`` if
+                 ``sink`` is set
+
+        The folders and suites filtered out by ``include``, ``exclude``, ``max_depth``
+        or ``failures_only``
+        are neither listed nor downloaded, and are removed from the details. The
+        response then has a ``path_filter`` entry holding the first three options.
 
         **Note**: Test suites that do not contain test cases are not loaded at this time.
                   For example, annotations related to code coverage and static analysis
@@ -124,8 +883,200 @@ class API:
         logger.debug(
             f"get_result_details result={result} project={project} space={space}"
         )
-        response = self.client.get_result(result=result, project=project, space=space)
+        return self._get_result_details(
+            result,
+            project,
+            space,
+            max_workers,
+            lazy_annotations,
+            parse_workers,
+            path_filter=self._path_filter(include, exclude, max_depth),
+            failures_only=failures_only,
+            progress=progress,
+            sink=sink,
+        )
+
+    def get_results_details(
+        self,
+        results,
+        project=None,
+        space=None,
+        max_workers=None,
+        lazy_annotations=None,
+        parse_workers=None,
+        include=None,
+        exclude=None,
+        max_depth=None,
+        failures_only=False,
+        as_completed=False,
+    ):
+        """Loads the details of several results (see :meth:`get_result_details`).
+
+        The results are not loaded one after the other: the folder listings and
+        suite snippets of all of them are scheduled on a same pool of ``max_workers``
+        threads, so that a large result does not hold up the others. A result
+        requested several times (e.g. by name and by ID) is only loaded once.
+
+        :param results: the result IDs, names or results (e.g. as returned by
+                        get_results)
+        :param project: The project ID or name (optional - to override ctor argument)
+        :param space: The project ID or name (optional - to override ctor argument)
+        :param max_workers: Number of concurrent requests (optional - to override ctor argument)
+        :param lazy_annotations: Decode the annotation texts on access
+                                 (optional - to override ctor argument)
+        :param parse_workers: Number of processes converting the snippets
+                              (optional - to override ctor argument)
+        :param include: see :meth:`get_result_details`
+        :param exclude: see :meth:`get_result_details`
+        :param max_depth: see :meth:`get_result_details`
+        :param failures_only: see :meth:`get_result_details`
+        :param as_completed: If set, a generator of the result details, in the order
+                             they complete, is returned (each result once)
+        :return: the list of the result details, in the order of ``results``
+        """
+        results = list(results)
+        logger.debug(
+            f"get_results_details results={len(results)} project={project} "
+            f"space={space}"
+        )
+        loaded = self._load_results_details(
+            results,
+            project,
+            space,
+            max_workers,
+            lazy_annotations,
+            parse_workers,
+            path_filter=self._path_filter(include, exclude, max_depth),
+            failures_only=failures_only,
+        )
+        if as_completed:
+            return (response for _, response in loaded)
+        responses = [None] * len(results)
         with rich.progress.Progress(transient=True) as progress:
+            task = progress.add_task("[red] Results", total=len(results))
+            for indexes, response in loaded:
+                for index in indexes:
+                    responses[index] = response
+                progress.update(task, advance=len(indexes))
+        return responses
+
+    @staticmethod
+    def _path_filter(include, exclude, max_depth):
+        """Returns the PathFilter of the options of :meth:`get_result_details` (None
+        if not filtering)"""
+        if not include and not exclude and max_depth is None:
+            return None
+        if isinstance(include, str):
+            include = include.split(",")
+        if isinstance(exclude, str):
+            exclude = exclude.split(",")
+        return utils_module.PathFilter(
+            include=include,
+            exclude=exclude,
+            max_depth=None if max_depth is None else int(max_depth),
+        )
+
+    def _get_result(self, result, project, space):
+        with metrics_module.endpoint("get_result"):
+            return self.client.get_result(result=result, project=project, space=space)
+
+    def refresh_result_details(
+        self,
+        previous_details,
+        project=None,
+        space=None,
+        max_workers=None,
+        lazy_annotations=None,
+        parse_workers=None,
+        include=None,
+        exclude=None,
+        max_depth=None,
+        failures_only=None,
+    ):
+        """Updates result details previously returned by :meth:`get_result_details`
+        e.g. when sessions were added to the result since.
+
+        The contents listings are fetched again but only the folders and suites that
+        are new or whose :data:`CONTAINER_STAMPS` changed are downloaded. The content
+        of the others is taken from ``previous_details``.
+
+        The details are filtered as ``previous_details`` were (according to their
+        ``path_filter`` and ``failures_only`` entries) unless other filter options
+        are passed.
+
+        :param previous_details: the result details to refresh (not modified)
+        :param project: The project ID or name (optional - to override ctor argument)
+        :param space: The project ID or name (optional - to override ctor argument)
+        :param max_workers: Number of concurrent requests (optional - to override ctor argument)
+        :param lazy_annotations: Decode the annotation texts on access
+                                 (optional - to override ctor argument)
+        :param parse_workers: Number of processes converting the snippets
+                              (optional - to override ctor argument)
+        :param include: see :meth:`get_result_details`
+        :param exclude: see :meth:`get_result_details`
+        :param max_depth: see :meth:`get_result_details`
+        :param failures_only: see :meth:`get_result_details`
+        :return: the refreshed result details (sharing the unchanged content with
+                 ``previous_details``)
+        """
+        logger.debug(
+            f"refresh_result_details result={previous_details['id']} "
+            f"project={project} space={space}"
+        )
+        path_filter = self._path_filter(include, exclude, max_depth)
+        if path_filter is None and previous_details.get("path_filter"):
+            path_filter = utils_module.PathFilter(**previous_details["path_filter"])
+        if failures_only is None:
+            failures_only = previous_details.get("failures_only", False)
+        return self._get_result_details(
+            previous_details["id"],
+            project,
+            space,
+            max_workers,
+            lazy_annotations,
+            parse_workers,
+            previous=previous_details.get("details"),
+            path_filter=path_filter,
+            failures_only=failures_only,
+        )
+
+    def _get_result_details(
+        self,
+        result,
+        project,
+        space,
+        max_workers,
+        lazy_annotations,
+        parse_workers,
+        previous=None,
+        path_filter=None,
+        failures_only=False,
+        progress=True,
+        sink=None,
+    ):
+        max_workers = int(max_workers) if max_workers else self.max_workers
+        if lazy_annotations is None:
+            lazy_annotations = self.lazy_annotations
+        parse_workers = int(
+            self.parse_workers if parse_workers is None else parse_workers
+        )
+        parse_executor = (
+            self._get_parse_executor(parse_workers) if parse_workers else None
+        )
+        response = self._get_result(result, project, space)
+        if path_filter:
+            response["path_filter"] = path_filter.options
+        if failures_only:
+            response["failures_only"] = True
+            if not _has_failures(response):
+                response["details"] = []
+                if sink:
+                    sink.write_result(response)
+                return response
+        if sink:
+            response["details"] = []
+            sink.write_result(response)
+        with rich.progress.Progress(transient=True, disable=not progress) as progress:
 
             tasks = {
                 "suites": {
@@ -151,20 +1102,838 @@ class API:
                         advance=tasks[object_type]["increment"] * object_count,
                     )
 
-            response["details"] = self._load_results(
+            with concurrent.futures.ThreadPoolExecutor(
+                max_workers=max_workers
+            ) as executor:
+                details = self._load_results(
+                    result_id=response["id"],
+                    project=project,
+                    space=space,
+                    progress_callback=download_progress,
+                    executor=executor,
+                    cache_key=self._cache_key(response, project, space),
+                    lazy_annotations=lazy_annotations,
+                    parse_executor=parse_executor,
+                    previous=previous,
+                    path_filter=path_filter,
+                    failures_only=failures_only,
+                    container_callback=sink.write_container if sink else None,
+                )
+        if not sink:
+            response["details"] = details
+        return response
+
+    def _load_results_details(
+        self,
+        results,
+        project,
+        space,
+        max_workers,
+        lazy_annotations,
+        parse_workers,
+        path_filter=None,
+        failures_only=False,
+    ):
+        """Loads several results sharing a thread pool (see :meth:`_walk`), yielding
+        a (indexes in ``results``, result details) tuple per result loaded"""
+        max_workers = int(max_workers) if max_workers else self.max_workers
+        if lazy_annotations is None:
+            lazy_annotations = self.lazy_annotations
+        parse_workers = int(
+            self.parse_workers if parse_workers is None else parse_workers
+        )
+        parse_executor = (
+            self._get_parse_executor(parse_workers) if parse_workers else None
+        )
+        requested = dict()  # result ID or name -> indexes in results
+        for index, result in enumerate(results):
+            if isinstance(result, dict):
+                result = result["id"]
+            requested.setdefault(result, []).append(index)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self._get_result, result, project, space): indexes
+                for result, indexes in requested.items()
+            }
+            responses = dict()  # result ID -> (response, indexes in results)
+            for future, indexes in futures.items():
+                response = future.result()
+                responses.setdefault(response["id"], (response, []))[1].extend(indexes)
+
+            walks = []
+            for response, indexes in responses.values():
+                if path_filter:
+                    response["path_filter"] = path_filter.options
+                if failures_only:
+                    response["failures_only"] = True
+                    if not _has_failures(response):
+                        response["details"] = []
+                        yield indexes, response
+                        continue
+                walks.append(
+                    _ResultWalk(
+                        response["id"],
+                        project,
+                        space,
+                        cache_key=self._cache_key(response, project, space),
+                        lazy_annotations=lazy_annotations,
+                        path_filter=path_filter,
+                        failures_only=failures_only,
+                    )
+                )
+            for walk in self._walk(walks, executor, parse_executor):
+                response, indexes = responses[walk.result_id]
+                response["details"] = walk.details
+                yield indexes, response
+
+    def get_result_cases_frame(
+        self, result, project=None, space=None, max_workers=None, parse_workers=None
+    ):
+        """Loads the test cases of a result into a pandas DataFrame.
+
+        This is equivalent to building a DataFrame from the ``$..[cases][:]``
+        matches of :meth:`get_result_details` but the case attributes are
+        extracted straight from the suite snippets into columns: the details
+        are never built and the annotations are counted but not decoded.
+
+        The frame has a row per case with the case attributes, the ``path``
+        of the suite and the ``annotation_count``. See
+        :data:`testspace_colab.utils.CASE_DTYPES` for the column types.
+
+        :param result: the result ID or name
+        :param project: The project ID or name (optional - to override ctor argument)
+        :param space: The project ID or name (optional - to override ctor argument)
+        :param max_workers: Number of concurrent requests (optional - to override ctor argument)
+        :param parse_workers: Number of processes extracting the cases
+                              (optional - to override ctor argument)
+        :return: a pandas DataFrame
+        """
+        logger.debug(
+            f"get_result_cases_frame result={result} project={project} space={space}"
+        )
+        max_workers = int(max_workers) if max_workers else self.max_workers
+        parse_workers = int(
+            self.parse_workers if parse_workers is None else parse_workers
+        )
+        parse_executor = (
+            self._get_parse_executor(parse_workers) if parse_workers else None
+        )
+        response = self._get_result(result, project, space)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            details = self._load_results(
                 result_id=response["id"],
                 project=project,
                 space=space,
-                progress_callback=download_progress,
+                executor=executor,
+                cache_key=self._cache_key(response, project, space),
+                parse_executor=parse_executor,
+                cases_only=True,
             )
-        return response
+        case_columns = utils_module.CaseColumns()
+        # Concatenated in listing order
+        stack = list(reversed(details))
+        while stack:
+            container = stack.pop()
+            if "case_columns" in container:
+                case_columns.extend(container["case_columns"])
+            stack.extend(reversed(container.get("folders", [])))
+        return case_columns.to_frame()
+
+    def iter_result_suites(
+        self,
+        result,
+        project=None,
+        space=None,
+        max_workers=None,
+        lazy_annotations=None,
+        parse_workers=None,
+        include=None,
+        exclude=None,
+        max_depth=None,
+        failures_only=False,
+    ):
+        """Yields the suites of a result as soon as they are converted.
+
+        Unlike :meth:`get_result_details`, the suites are yielded in the order
+        they are downloaded and are not kept once yielded, so the memory use is
+        bounded by the number of suites in flight (twice ``max_workers``).
+
+        :param result: the result ID or name
+        :param project: The project ID or name (optional - to override ctor argument)
+        :param space: The project ID or name (optional - to override ctor argument)
+        :param max_workers: Number of concurrent requests (optional - to override ctor argument)
+        :param lazy_annotations: Decode the annotation texts on access
+                                 (optional - to override ctor argument)
+        :param parse_workers: Number of processes converting the snippets
+                              (optional - to override ctor argument)
+        :param include: see :meth:`get_result_details`
+        :param exclude: see :meth:`get_result_details`
+        :param max_depth: see :meth:`get_result_details`
+        :param failures_only: see :meth:`get_result_details`
+        :return: a generator of suites (with their cases). The ``path`` of a suite
+                 is the path of the folder holding it.
+        """
+        for path, suites, _ in self._iter_snippets(
+            result,
+            project,
+            space,
+            max_workers,
+            lazy_annotations,
+            parse_workers,
+            path_filter=self._path_filter(include, exclude, max_depth),
+            failures_only=failures_only,
+        ):
+            for suite in suites:
+                suite.setdefault("path", path)
+                yield suite
+
+    def iter_result_cases(
+        self,
+        result,
+        project=None,
+        space=None,
+        max_workers=None,
+        lazy_annotations=None,
+        parse_workers=None,
+        include=None,
+        exclude=None,
+        max_depth=None,
+        failures_only=False,
+    ):
+        """Yields the test cases of a result as soon as their suite is converted
+        (see :meth:`iter_result_suites` for the parameters)
+
+        :return: a generator of test cases (with their ``path``)
+        """
+        for path, suites, cases in self._iter_snippets(
+            result,
+            project,
+            space,
+            max_workers,
+            lazy_annotations,
+            parse_workers,
+            path_filter=self._path_filter(include, exclude, max_depth),
+            failures_only=failures_only,
+        ):
+            for case in cases:
+                case.setdefault("path", path)
+                yield case
+            stack = list(reversed(suites))
+            while stack:
+                suite = stack.pop()
+                for case in suite.get("cases", ()):
+                    if "name" in case:  # Not a comment of the suite
+                        yield case
+                stack.extend(reversed(suite.get("suites", ())))
+
+    def _iter_snippets(
+        self,
+        result,
+        project,
+        space,
+        max_workers,
+        lazy_annotations,
+        parse_workers,
+        path_filter=None,
+        failures_only=False,
+    ):
+        """Loads a result (see :meth:`_walk`), yielding a (folder path, suites,
+        cases) tuple per suite container as soon as it is converted.
+
+        The containers are handed over by the walk and not kept, at most twice
+        ``max_workers`` suites are in flight so that the converted suites do not
+        pile up when the consumer is slower than the downloads.
+        """
+        logger.debug(f"iter result={result} project={project} space={space}")
+        max_workers = int(max_workers) if max_workers else self.max_workers
+        if lazy_annotations is None:
+            lazy_annotations = self.lazy_annotations
+        parse_workers = int(
+            self.parse_workers if parse_workers is None else parse_workers
+        )
+        parse_executor = (
+            self._get_parse_executor(parse_workers) if parse_workers else None
+        )
+        response = self._get_result(result, project, space)
+        if failures_only and not _has_failures(response):
+            return
+        loaded = collections.deque()  # suite containers handed over by the walk
+
+        def hand_over(at, container):
+            # The walk empties the container once handed over
+            if "suites" in container:
+                loaded.append(dict(container))
+
+        walk = _ResultWalk(
+            response["id"],
+            project,
+            space,
+            cache_key=self._cache_key(response, project, space),
+            lazy_annotations=lazy_annotations,
+            path_filter=path_filter,
+            failures_only=failures_only,
+            container_callback=hand_over,
+        )
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            with contextlib.closing(
+                self._walk([walk], executor, parse_executor, partial=True)
+            ) as walker:
+                for _ in walker:
+                    while loaded:
+                        container = loaded.popleft()
+                        yield (
+                            container["path"].rsplit("/", 1)[0] or "/",
+                            container["suites"],
+                            container["cases"],
+                        )
+
+    def _cache_key(self, result, project, space):
+        """Returns the cache key prefix of a result or None if the
+        result shall not be cached (no cache or result still in progress)"""
+        if self.cache is None or not result.get("complete", True):
+            return None
+        return (
+            urllib.parse.urlparse(self._url).netloc,
+            project or self._project,
+            space or self._space,
+            result["id"],
+        )
 
     def _load_results(
+        self,
+        result_id,
+        project,
+        space,
+        path=None,
+        progress_callback=None,
+        executor=None,
+        cache_key=None,
+        lazy_annotations=False,
+        parse_executor=None,
+        cases_only=False,
+        previous=None,
+        path_filter=None,
+        failures_only=False,
+        container_callback=None,
+    ):
+        """Loads the content of a result starting at ``path``.
+
+        Folder listings and suite snippets are submitted to ``executor`` as soon
+        as their parent listing is available, while this thread only dispatches
+        completed listings. The containers are filled in place so the returned
+        structure keeps the order of the listings regardless of completion order.
+
+        If ``cache_key`` is set, the raw responses are read from and stored to
+        the cache under that key prefix.
+
+        If ``parse_executor`` is set, the downloaded snippets are converted
+        by that (process) executor and the progress is reported once converted.
+
+        If ``cases_only`` is set, the suite containers get a ``case_columns``
+        entry (see :func:`parse_snippet_cases`) instead of their suites and cases.
+
+        If ``previous`` is set (the details previously loaded from ``path``), the
+        unchanged containers (see :func:`_is_unchanged`) are taken from it instead
+        of being downloaded again.
+
+        If ``path_filter`` is set (a :class:`testspace_colab.utils.PathFilter`), the
+        containers it does not select are removed from the listings before
+        being loaded, as are the ones without failures if ``failures_only`` is set.
+
+        If ``container_callback`` is set, the containers are handed to it and
+        emptied once loaded (see :class:`_ResultWalk`).
+        """
+        if executor is None:
+            with concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_workers
+            ) as executor:
+                return self._load_results(
+                    result_id=result_id,
+                    project=project,
+                    space=space,
+                    path=path,
+                    progress_callback=progress_callback,
+                    executor=executor,
+                    cache_key=cache_key,
+                    lazy_annotations=lazy_annotations,
+                    parse_executor=parse_executor,
+                    cases_only=cases_only,
+                    previous=previous,
+                    path_filter=path_filter,
+                    failures_only=failures_only,
+                    container_callback=container_callback,
+                )
+
+        walk = _ResultWalk(
+            result_id,
+            project,
+            space,
+            path=path,
+            progress_callback=progress_callback,
+            cache_key=cache_key,
+            lazy_annotations=lazy_annotations,
+            cases_only=cases_only,
+            previous=previous,
+            path_filter=path_filter,
+            failures_only=failures_only,
+            container_callback=container_callback,
+        )
+        for _ in self._walk([walk], executor, parse_executor):
+            pass
+        return walk.details
+
+    def _walk(self, walks, executor, parse_executor=None, partial=False):
+        """Loads the content of results (see :class:`_ResultWalk`), yielding each
+        walk as soon as its details are complete. If ``partial`` is set, the walks
+        are also yielded (with ``pending`` set) each time one of their containers
+        is loaded e.g. to consume the containers handed to their
+        ``container_callback`` as they come.
+
+        The folder listings and suite snippets of all the walks are submitted to
+        the shared ``executor`` as soon as their parent listing is available, while
+        this thread only dispatches the completed ones. Listings are submitted right
+        away but at most twice the number of workers snippets are in flight
+        (downloaded or converted by ``parse_executor``): the listings, which the
+        rest of a result waits for, do not queue behind the snippets of the other
+        results, and the downloaded snippets do not pile up when the conversion is
+        slower than the downloads.
+        """
+        # future -> (future type, walk, container, previous container, position)
+        pending = dict()
+        suites = collections.deque()  # (walk, container, folder path, position)
+        max_suites = 2 * executor._max_workers
+        suites_in_flight = 0
+
+        def submit_contents(walk, container, previous_container, at):
+            future = executor.submit(
+                self._load_contents,
+                walk.result_id,
+                walk.project,
+                walk.space,
+                container["path"] if container else walk.path,
+                walk.cache_key,
+            )
+            pending[future] = ("folder", walk, container, previous_container, at)
+            walk.pending += 1
+
+        def complete(walk, container, at, shallow=False):
+            # Hands the container over (without its sub-folders, which are handed
+            # over on their own, if shallow) and releases its content
+            if walk.container_callback:
+                walk.container_callback(
+                    at, dict(container, folders=[]) if shallow else container
+                )
+                container.clear()
+
+        def schedule(walk, listing, listing_path, previous_listing, listing_at):
+            if walk.path_filter:
+                listing[:] = [
+                    container
+                    for container in listing
+                    if "load_error" in container
+                    or walk.path_filter.select(
+                        container["path"], container["type"].startswith("folder")
+                    )
+                ]
+            if walk.failures_only:
+                listing[:] = [
+                    container
+                    for container in listing
+                    if "load_error" in container or _has_failures(container)
+                ]
+            previous_containers = {
+                container["path"]: container
+                for container in previous_listing or ()
+                if "path" in container
+            }
+            for index, container in enumerate(listing):
+                at = listing_at + (index,)
+                if "load_error" in container:
+                    complete(walk, container, at)
+                    continue
+                previous_container = previous_containers.get(container["path"])
+                if _is_unchanged(container, previous_container):
+                    for children_type in ("folders", "suites", "cases", "case_columns"):
+                        if children_type in previous_container:
+                            container[children_type] = previous_container[children_type]
+                    if walk.progress_callback and container["type"].startswith("suite"):
+                        walk.progress_callback(object_type="suites", object_count=1)
+                    complete(walk, container, at)
+                elif container["type"].startswith("suite"):
+                    container["suites"] = []
+                    container["cases"] = []
+                    suites.append((walk, container, listing_path, at))
+                    walk.pending += 1
+                elif container["type"].startswith("folder"):
+                    submit_contents(walk, container, previous_container, at)
+                else:
+                    logger.debug(f"unknown container type {container['type']}")
+                    complete(walk, container, at)
+
+        for walk in walks:
+            submit_contents(walk, None, None, ())
+        try:
+            while pending or suites:
+                while suites and suites_in_flight < max_suites:
+                    walk, container, path, at = suites.popleft()
+                    future = executor.submit(
+                        self._load_suite,
+                        container,
+                        path,
+                        walk.progress_callback,
+                        walk.cache_key,
+                        walk.lazy_annotations,
+                        parse_executor,
+                        walk.cases_only,
+                    )
+                    pending[future] = ("suite", walk, container, None, at)
+                    suites_in_flight += 1
+                done, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    future_type, walk, container, previous_container, at = pending.pop(
+                        future
+                    )
+                    walk.pending -= 1
+                    if future_type == "folder" and container is None:
+                        walk.details = future.result()
+                        schedule(walk, walk.details, walk.path, walk.previous, at)
+                    elif future_type == "folder":
+                        container["folders"] = future.result()
+                        schedule(
+                            walk,
+                            container["folders"],
+                            container["path"],
+                            previous_container.get("folders")
+                            if previous_container
+                            else None,
+                            at,
+                        )
+                        complete(walk, container, at, shallow=True)
+                    elif future_type == "suite":
+                        # propagates snippet errors
+                        parse_future = future.result()
+                        if parse_future:
+                            # The snippet is in flight until converted
+                            pending[parse_future] = ("parse", walk, container, None, at)
+                            walk.pending += 1
+                        else:
+                            suites_in_flight -= 1
+                            complete(walk, container, at)
+                    else:
+                        suites_in_flight -= 1
+                        parsed, seconds = future.result()
+                        self.metrics.record(metrics_module.PARSE, seconds)
+                        if walk.cases_only:
+                            container["case_columns"] = parsed
+                        else:
+                            json_data, progress = parsed
+                            _store_snippet(container, json_data)
+                            if walk.progress_callback:
+                                for object_type, object_count in progress.items():
+                                    walk.progress_callback(
+                                        object_type=object_type,
+                                        object_count=object_count,
+                                    )
+                        complete(walk, container, at)
+                    if not walk.pending or partial:
+                        yield walk
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _load_contents(self, result_id, project, space, path, cache_key=None):
+        """Returns the list of containers found at ``path`` or a list holding
+        a single ``load_error`` entry if the listing could not be retrieved."""
+        content = self._cache_get(cache_key, path, "contents")
+        if content is not None:
+            response = json.loads(content.decode("utf-8"))
+        else:
+            logger.debug(f"getting result content {path}")
+            try:
+                with metrics_module.endpoint("get_result_contents"):
+                    response = self.client.get_result_contents(
+                        result_id, project=project, space=space, contents_path=path
+                    )
+            except Exception as load_error:
+                msg = f"failed to load {path}"
+                logger.exception(msg)
+                return [dict(load_error=str(load_error))]
+            if cache_key:
+                self.cache.put(
+                    json.dumps(response).encode("utf-8"), *cache_key, path, "contents"
+                )
+
+        if isinstance(response, dict):  # If we do not receive a list
+            response = [response]
+        return response
+
+    def _cache_get(self, cache_key, *parts):
+        if not cache_key or self.refresh_cache:
+            return None
+        return self.cache.get(*cache_key, *parts)
+
+    def _open_snippet(self, container, cache_key=None):
+        """Returns a binary stream of the suite snippet (None if not available).
+
+        The snippet is streamed from the cache or from the response (and
+        stored into the cache as it is read).
+        """
+        if cache_key and not self.refresh_cache:
+            source = self.cache.open(*cache_key, container["path"], "snippet")
+            if source is not None:
+                return source
+        with metrics_module.endpoint(SNIPPET_ENDPOINT):
+            xml_snippet = self.client.get_request(
+                container["download_url"], stream=True
+            )
+        if xml_snippet.status_code != 200:
+            xml_snippet.close()
+            return None
+        source = ResponseStream(
+            xml_snippet, metrics=self.metrics, endpoint=SNIPPET_ENDPOINT
+        )
+        if cache_key:
+            source = self.cache.tee(source, *cache_key, container["path"], "snippet")
+        return source
+
+    def _load_suite(
+        self,
+        container,
+        path,
+        progress_callback=None,
+        cache_key=None,
+        lazy_annotations=False,
+        parse_executor=None,
+        cases_only=False,
+    ):
+        """Downloads and converts the xml snippet of a suite container in place.
+
+        :param container: a suite container as returned by get_result_contents
+        :param path: the path of the folder holding the suite
+        :param progress_callback: a progress callback function
+        :param cache_key: the cache key prefix of the result (if cached)
+        :param lazy_annotations: If set, annotation texts are decoded on access
+        :param parse_executor: If set, the snippet is downloaded but converted by
+                               this executor
+        :param cases_only: If set, only the test cases are extracted, as columns
+        :return: the conversion future if a parse_executor is set
+        """
+        parse_future = None
+        # We have a suite. This maybe container test cases
+        # or simply annotation
+        case_count = sum(container["case_counts"])
+        if case_count and "download_url" in container:
+            source = self._open_snippet(container, cache_key)
+            if source is not None:
+                with contextlib.closing(source):
+                    if cases_only and parse_executor:
+                        parse_future = parse_executor.submit(
+                            timed_task, parse_snippet_cases, source.read(), path
+                        )
+                    elif parse_executor:
+                        parse_future = parse_executor.submit(
+                            timed_task,
+                            parse_snippet_task,
+                            source.read(),
+                            path,
+                            lazy_annotations,
+                        )
+                    elif cases_only:
+                        with self.metrics.timer(metrics_module.PARSE):
+                            container["case_columns"] = parse_snippet_cases(
+                                source, path
+                            )
+                    else:
+                        with self.metrics.timer(metrics_module.PARSE):
+                            json_data = parse_snippet(
+                                source,
+                                path=path,
+                                progress_callback=progress_callback,
+                                lazy_annotations=lazy_annotations,
+                            )
+                        _store_snippet(container, json_data)
+        else:
+            logger.debug(
+                f"skipping suite {path}/{container['name']} as it contains not test cases"
+            )
+        if progress_callback:
+            progress_callback(object_type="suites", object_count=1)
+        return parse_future
+
+    @staticmethod
+    def get_version():
+        """Return the distribution version"""
+        return pkg_resources.get_distribution("testspace-colab").version
+
+
+def _running_loop():
+    """Returns the event loop of the current coroutine"""
+    if hasattr(asyncio, "get_running_loop"):
+        return asyncio.get_running_loop()
+    return asyncio.get_event_loop()  # pragma: no cover - Python 3.6
+
+
+class AsyncAPI:
+    """asyncio counterpart of :class:`API`.
+
+    All the getters are coroutines and at most ``max_requests`` requests are in
+    flight at any time. The folder tree of a result is walked as a tree of tasks
+    so all the suite snippets of a listing are downloaded concurrently.
+
+    usage::
+
+        async with AsyncAPI() as client:
+            details = await client.get_result_details("test_data")
+
+    Requires `aiohttp <https://docs.aiohttp.org>`_ (``pip install testspace-colab[async]``)
+    """
+
+    def __init__(
+        self,
+        token=None,
+        url=None,
+        project=None,
+        space=None,
+        max_requests=DEFAULT_MAX_WORKERS,
+    ):
+        if aiohttp is None:
+            raise ImportError(
+                "AsyncAPI requires aiohttp - pip install testspace-colab[async]"
+            )
+        self.max_requests = max_requests
+        self._token, self._url, self._project, self._space = load_config(
+            token=token, url=url, project=project, space=space
+        )
+        # Both are bound to the running loop so they are created on first use
+        self._session = None
+        self._semaphore = None
+
+    @property
+    def token(self):
+        return self._token
+
+    @property
+    def url(self):
+        return self._url
+
+    @property
+    def project(self):
+        return self._project
+
+    @property
+    def space(self):
+        return self._space
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """Closes the underlying HTTP session"""
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    def _api_url(self, *parts):
+        quoted = [urllib.parse.quote(str(part), safe="") for part in parts]
+        return "/".join([self._url.rstrip("/"), "api"] + quoted)
+
+    async def get_request(self, url, params=None):
+        """Performs a GET request
+
+        :param url: the absolute url of the resource
+        :param params: the query parameters
+        :return: a (status_code, content) tuple
+        """
+        if self._session is None:
+            headers = {"Authorization": f"Token {self._token}"} if self._token else {}
+            self._session = aiohttp.ClientSession(headers=headers)
+            self._semaphore = asyncio.Semaphore(self.max_requests)
+        async with self._semaphore:
+            logger.debug(f"async GET {url} {params}")
+            async with self._session.get(url, params=params) as response:
+                return response.status, await response.read()
+
+    async def _get_json(self, *parts, params=None):
+        url = self._api_url(*parts)
+        status_code, content = await self.get_request(url, params=params)
+        if status_code != 200:
+            raise IOError(f"GET {url} failed with status {status_code}")
+        return json.loads(content.decode("utf-8"))
+
+    async def get_projects(self):
+        return await self._get_json("projects")
+
+    async def get_spaces(self, project=None):
+        return await self._get_json("projects", project or self._project, "spaces")
+
+    async def get_results(self, project=None, space=None):
+        return await self._get_json(
+            "projects",
+            project or self._project,
+            "spaces",
+            space or self._space,
+            "results",
+        )
+
+    async def get_result(self, result, project=None, space=None):
+        return await self._get_json(
+            "projects",
+            project or self._project,
+            "spaces",
+            space or self._space,
+            "results",
+            result,
+        )
+
+    async def get_result_contents(
+        self, result, project=None, space=None, contents_path=None
+    ):
+        return await self._get_json(
+            "projects",
+            project or self._project,
+            "spaces",
+            space or self._space,
+            "results",
+            result,
+            "contents",
+            params=dict(path=contents_path) if contents_path else None,
+        )
+
+    async def get_result_details(
+        self, result, project=None, space=None, progress_callback=None
+    ):
+        """Coroutine version of :meth:`API.get_result_details`
+
+        :param result: the result ID or name
+        :param project: The project ID or name (optional - to override ctor argument)
+        :param space: The project ID or name (optional - to override ctor argument)
+        :param progress_callback: a progress callback function
+        :return: a JSON structure (from testspace)
+        """
+        logger.debug(
+            f"async get_result_details result={result} project={project} space={space}"
+        )
+        response = await self.get_result(result=result, project=project, space=space)
+        response["details"] = await self._load_results(
+            result_id=response["id"],
+            project=project,
+            space=space,
+            progress_callback=progress_callback,
+        )
+        return response
+
+    async def _load_results(
         self, result_id, project, space, path=None, progress_callback=None
     ):
         logger.debug(f"getting result content {path}")
         try:
-            response = self.client.get_result_contents(
+            response = await self.get_result_contents(
                 result_id, project=project, space=space, contents_path=path
             )
         except Exception as load_error:
@@ -175,50 +1944,47 @@ class API:
         if isinstance(response, dict):  # If we do not receive a list
             response = [response]
 
+        tasks = []
         for container in response:
             if container["type"].startswith("suite"):
-                # We have a suite. This maybe container test cases
-                # or simply annotation
                 container["suites"] = []
                 container["cases"] = []
-                case_count = sum(container["case_counts"])
-                if case_count and "download_url" in container:
-                    xml_snippet = self.client.get_request(container["download_url"])
-                    if xml_snippet.status_code == 200:
-                        # print(response.content.decode('utf-8'))
-                        content = xml_snippet.content.decode("utf-8")
-                        try:
-                            xml_tree = ElementTree.fromstring(content)
-                            json_data = utils_module.xml_to_json(
-                                xml_tree, path=path, progress_callback=progress_callback
-                            )
-                        except ElementTree.ParseError:
-                            # For manual testing the content is in JSON format
-                            json_data = json.loads(content)
-                        if "suite" in json_data:
-                            container["suites"].append(json_data["suite"])
-                        if "case" in json_data:
-                            container["cases"].append(json_data["case"])
-                else:
-                    logger.debug(
-                        f"skipping suite {path}/{container['name']} as it contains not test cases"
-                    )
-                if progress_callback:
-                    progress_callback(object_type="suites", object_count=1)
+                tasks.append(self._load_suite(container, path, progress_callback))
             elif container["type"].startswith("folder"):
-                # FIXME: this is wrong - we should handle the return value
-                container["folders"] = self._load_results(
-                    result_id=result_id,
-                    path=container["path"],
-                    project=project,
-                    space=space,
-                    progress_callback=progress_callback,
+                tasks.append(
+                    self._load_folder(
+                        container, result_id, project, space, progress_callback
+                    )
                 )
             else:
                 logger.debug(f"unknown container type {container['type']}")
+        await asyncio.gather(*tasks)
         return response
 
-    @staticmethod
-    def get_version():
-        """Return the distribution version"""
-        return pkg_resources.get_distribution("testspace-colab").version
+    async def _load_folder(
+        self, container, result_id, project, space, progress_callback=None
+    ):
+        container["folders"] = await self._load_results(
+            result_id=result_id,
+            path=container["path"],
+            project=project,
+            space=space,
+            progress_callback=progress_callback,
+        )
+
+    async def _load_suite(self, container, path, progress_callback=None):
+        case_count = sum(container["case_counts"])
+        if case_count and "download_url" in container:
+            status_code, content = await self.get_request(container["download_url"])
+            if status_code == 200:
+                # The conversion is CPU bound so we keep it off the loop
+                json_data = await _running_loop().run_in_executor(
+                    None, parse_snippet, content, path, progress_callback
+                )
+                _store_snippet(container, json_data)
+        else:
+            logger.debug(
+                f"skipping suite {path}/{container['name']} as it contains not test cases"
+            )
+        if progress_callback:
+            progress_callback(object_type="suites", object_count=1)
@@ -0,0 +1,254 @@
+""" Request Metrics
+
+    Counts and latencies of the requests issued to testspace, per endpoint,
+    and of the conversion of the suite snippets. They tell whether loading
+    results is bound by the network, the server or the parsing.
+
+"""
+import time
+import bisect
+import threading
+import contextlib
+
+try:
+    import contextvars
+except ImportError:  # pragma: no cover - Python 3.6
+    contextvars = None
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+""" Upper bounds (in seconds) of the latency histogram buckets"""
+
+PARSE = "parse"
+""" Name under which the conversions of the suite snippets are recorded"""
+
+DEFAULT_ENDPOINT = "get_request"
+
+
+class _ThreadEndpoint(threading.local):
+    """Per thread stand-in for the endpoint context variable (Python 3.6)"""
+
+    value = DEFAULT_ENDPOINT
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        token, self.value = self.value, value
+        return token
+
+    def reset(self, token):
+        self.value = token
+
+
+if contextvars:
+    _endpoint = contextvars.ContextVar("endpoint", default=DEFAULT_ENDPOINT)
+else:  # pragma: no cover - Python 3.6
+    _endpoint = _ThreadEndpoint()
+
+
+@contextlib.contextmanager
+def endpoint(name):
+    """Labels the requests issued within the block (by the current thread)
+    with the endpoint ``name``"""
+    token = _endpoint.set(name)
+    try:
+        yield
+    finally:
+        _endpoint.reset(token)
+
+
+def current_endpoint():
+    """Returns the label of the requests issued by the current thread"""
+    return _endpoint.get()
+
+
+class Histogram:
+    """Latency histogram with fixed buckets
+
+    :param buckets: the bucket upper bounds in seconds
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, fraction):
+        """Returns the upper bound of the bucket holding the ``fraction``
+        percentile (the maximum for the last bucket)"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        cumulated = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulated += count
+            if cumulated >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return dict(
+            count=self.count,
+            total=self.total,
+            mean=self.total / self.count if self.count else 0.0,
+            max=self.max,
+            p50=self.percentile(0.5),
+            p90=self.percentile(0.9),
+            p99=self.percentile(0.99),
+            buckets={
+                str(bound): count
+                for bound, count in zip(self.buckets + ("inf",), self.counts)
+            },
+        )
+
+
+class EndpointStats:
+    """What was recorded for an endpoint"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.throttled = 0
+        self.bytes = 0
+        self.transfer_time = 0.0  # Reading streamed contents
+        self.latency = Histogram()
+
+    def to_dict(self):
+        return dict(
+            requests=self.requests,
+            errors=self.errors,
+            retries=self.retries,
+            throttled=self.throttled,
+            bytes=self.bytes,
+            transfer_time=self.transfer_time,
+            latency=self.latency.to_dict(),
+        )
+
+
+class Metrics:
+    """Thread safe collection of the per endpoint statistics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = dict()
+        self._local = threading.local()
+
+    def _get(self, name):
+        stats = self._endpoints.get(name)
+        if stats is None:
+            stats = self._endpoints[name] = EndpointStats()
+        return stats
+
+    def record(self, name, latency, size=0, error=False):
+        """Records a request (or a conversion)
+
+        :param name: the endpoint
+        :param latency: the duration in seconds
+        :param size: the number of bytes received
+        :param error: If set, the request failed
+        """
+        with self._lock:
+            stats = self._get(name)
+            stats.requests += 1
+            stats.errors += bool(error)
+            stats.bytes += size
+            stats.latency.add(latency)
+
+    def retry(self, name, throttled=False):
+        """Records the retry of a request
+
+        :param throttled: If set, the request was rejected by the server
+                          because of the request rate
+        """
+        with self._lock:
+            stats = self._get(name)
+            stats.retries += 1
+            stats.throttled += bool(throttled)
+
+    def transfer(self, name, size, seconds):
+        """Records the bytes read from a streamed response once it is closed
+
+        See also :meth:`add_io_time`
+        """
+        with self._lock:
+            stats = self._get(name)
+            stats.bytes += size
+            stats.transfer_time += seconds
+
+    def add_io_time(self, seconds):
+        """Accounts time spent by the current thread reading a stream so that it is
+        not counted by the :meth:`timer` in progress"""
+        self._local.io_time = getattr(self._local, "io_time", 0.0) + seconds
+
+    @contextlib.contextmanager
+    def timer(self, name=PARSE):
+        """Records the duration of the block, minus the time spent reading
+        streams (see :meth:`add_io_time`)"""
+        io_time = getattr(self._local, "io_time", 0.0)
+        start = time.perf_counter()
+        error = True
+        try:
+            yield
+            error = False
+        finally:
+            elapsed = time.perf_counter() - start
+            elapsed -= getattr(self._local, "io_time", 0.0) - io_time
+            self.record(name, max(elapsed, 0.0), error=error)
+
+    def stats(self):
+        """Returns the statistics per endpoint as a dict"""
+        with self._lock:
+            return {name: stats.to_dict() for name, stats in self._endpoints.items()}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def summary(self):
+        """Returns a row per endpoint, suitable for
+        :func:`testspace_colab.utils.json_to_table`"""
+        rows = []
+        for name, stats in sorted(self.stats().items()):
+            latency = stats["latency"]
+            rows.append(
+                dict(
+                    endpoint=name,
+                    requests=stats["requests"],
+                    errors=stats["errors"],
+                    retries=stats["retries"],
+                    throttled=stats["throttled"],
+                    kbytes=round(stats["bytes"] / 1024, 1),
+                    total_s=round(latency["total"], 3),
+                    transfer_s=round(stats["transfer_time"], 3),
+                    mean_ms=round(latency["mean"] * 1000, 1),
+                    p50_ms=round(latency["p50"] * 1000, 1),
+                    p90_ms=round(latency["p90"] * 1000, 1),
+                    max_ms=round(latency["max"] * 1000, 1),
+                )
+            )
+        return rows
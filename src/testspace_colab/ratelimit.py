@@ -0,0 +1,194 @@
+""" Request Rate Limiting
+
+    Keeps the requests sent to a testspace server within what it accepts.
+    A token bucket caps the request rate (if configured) and the number of
+    requests in flight follows an AIMD (additive increase, multiplicative
+    decrease) window: it grows while the server responds and is halved when
+    the server throttles (HTTP 429/503) or, if enabled, slows down.
+
+"""
+import time
+import email.utils
+import threading
+import contextlib
+import testspace_colab.ts_log
+
+DEFAULT_MAX_CONCURRENCY = 32
+""" Upper bound of the concurrency window (requests in flight per server)"""
+
+DEFAULT_LATENCY_FACTOR = 4.0
+""" Suggested ``latency_factor`` of :class:`AdaptiveLimiter`: a response slower than
+this factor times the fastest ones counts as congestion"""
+
+MAX_RETRY_AFTER = 300.0
+""" Longest pause (in seconds) honoured from a Retry-After header"""
+
+logger = testspace_colab.ts_log.get_logger("ratelimit")
+
+
+def parse_retry_after(value):
+    """Returns the delay in seconds of a Retry-After header value (seconds or
+    HTTP date) or None if it cannot be parsed"""
+    if not value:
+        return None
+    try:
+        return min(max(float(value), 0.0), MAX_RETRY_AFTER)
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return min(max(date.timestamp() - time.time(), 0.0), MAX_RETRY_AFTER)
+
+
+class TokenBucket:
+    """Caps the request rate to ``rate`` requests per second with bursts of
+    up to ``burst`` requests.
+
+    :param rate: requests per second (None for no limit)
+    :param burst: bucket capacity (defaults to ``rate``, at least 1)
+    """
+
+    def __init__(self, rate=None, burst=None):
+        self._lock = threading.Lock()
+        self.configure(rate, burst)
+
+    def configure(self, rate=None, burst=None):
+        with self._lock:
+            self.rate = rate
+            self.burst = burst or max(rate or 1, 1)
+            self._tokens = self.burst
+            self._updated = time.monotonic()
+
+    def acquire(self):
+        """Takes a token, waiting for one if the bucket is empty"""
+        while True:
+            with self._lock:
+                if not self.rate:
+                    return
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+
+class AdaptiveLimiter:
+    """Rate and concurrency limiter of the requests sent to a server.
+
+    Wrap each request in :meth:`slot` and report how it went with
+    :meth:`on_success` or :meth:`on_throttle`. Use :meth:`for_host` to share a
+    limiter between the clients of a same server.
+
+    :param rate: maximum number of requests per second (None for no limit)
+    :param max_concurrency: upper bound of the concurrency window
+    :param min_concurrency: lower bound of the concurrency window
+    :param latency_factor: If set, a response slower than ``latency_factor`` times
+                           the fastest ones decreases the window, e.g.
+                           :data:`DEFAULT_LATENCY_FACTOR`. Not set by default: the
+                           window is only decreased when the server throttles, as
+                           the latency of the responses varies with their size.
+    """
+
+    _hosts = dict()
+    _hosts_lock = threading.Lock()
+
+    def __init__(
+        self,
+        rate=None,
+        max_concurrency=DEFAULT_MAX_CONCURRENCY,
+        min_concurrency=1,
+        latency_factor=None,
+    ):
+        self.bucket = TokenBucket(rate)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.latency_factor = latency_factor
+        self.window = float(max_concurrency)
+        self.throttled = 0
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._min_latency = None
+        self._since_decrease = max_concurrency  # Requests since the last decrease
+        self._condition = threading.Condition()
+
+    @classmethod
+    def for_host(cls, host):
+        """Returns the limiter shared by the clients of ``host``"""
+        with cls._hosts_lock:
+            limiter = cls._hosts.get(host)
+            if limiter is None:
+                limiter = cls._hosts[host] = cls()
+            return limiter
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    @contextlib.contextmanager
+    def slot(self):
+        """Waits until a request may be sent (pause, window and rate) and
+        holds a slot of the window while it is in flight"""
+        with self._condition:
+            while True:
+                delay = self._paused_until - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                elif self._in_flight >= int(self.window):
+                    self._condition.wait()
+                else:
+                    break
+            self._in_flight += 1
+        try:
+            self.bucket.acquire()
+            yield
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify()
+
+    def on_success(self, latency):
+        """Reports a response received after ``latency`` seconds"""
+        with self._condition:
+            self._since_decrease += 1
+            if self._min_latency is None or latency < self._min_latency:
+                self._min_latency = latency
+            if (
+                self.latency_factor
+                and latency > self._min_latency * self.latency_factor
+                and latency > 0.1  # Ignores the jitter of fast responses
+            ):
+                self._decrease("latency")
+            elif self.window < self.max_concurrency:
+                # +1 per window of successful requests
+                self.window = min(self.max_concurrency, self.window + 1 / self.window)
+                self._condition.notify_all()
+
+    def on_throttle(self, retry_after=None):
+        """Reports a throttling response (e.g. 429 or 503)
+
+        :param retry_after: If set, no request is sent for that many seconds
+        """
+        with self._condition:
+            self.throttled += 1
+            self._since_decrease += 1
+            self._decrease("throttling")
+            if retry_after:
+                self._paused_until = max(
+                    self._paused_until, time.monotonic() + retry_after
+                )
+
+    def _decrease(self, reason):
+        # At most once per window of requests so that the responses to the
+        # requests already in flight do not collapse the window
+        if self._since_decrease < self.window:
+            return
+        self._since_decrease = 0
+        self.window = max(self.min_concurrency, self.window / 2)
+        logger.debug(f"{reason} - concurrency window down to {self.window:.1f}")
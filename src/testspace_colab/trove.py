@@ -4,15 +4,722 @@
     it is the file system or ELK (maybe?)
 
 """
+import os
 import json
+import gzip
+import lzma
+import hashlib
+import collections.abc
+import sqlite3
 import pathlib
+import tempfile
+import contextlib
+import threading
+import urllib.parse
 import testspace_colab.ts_log
+import testspace_colab.utils as utils_module
+
+try:
+    import pyarrow
+    import pyarrow.dataset
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - optional, see the "parquet" extra
+    pyarrow = None
 
 DEFAULT_LOCATION = pathlib.Path("~").expanduser() / "testspace-colab"
 
+MANIFEST_NAME = ".manifest.json"
+""" Name of the manifest file of an organization directory (see :class:`Manifest`)"""
+
+RESULT_STAMPS = (
+    "id",
+    "updated_at",
+    "complete",
+    "session_suite_counts",
+    "session_case_counts",
+    "annotation_counts",
+)
+""" Attributes of a result that tell whether it changed since it was saved"""
+
+CATALOG_NAME = ".catalog.sqlite"
+""" Name of the catalog file of a trove (see :class:`Catalog`)"""
+
+RESULT_FORMATS = ("json", "json.gz", "json.xz", "ndjson", "ndjson.gz")
+""" Formats of the result files, which are also their extensions. ``json`` files are
+indented, the others are compact. ``ndjson`` files hold a line per folder or suite
+(see :func:`write_result`)"""
+
+DATASET_TABLES = dict(
+    cases=(
+        ("result_id", "int64"),
+        ("result", "string"),
+        ("result_updated_at", "string"),
+        ("suite_path", "string"),
+        ("name", "string"),
+        ("status", "string"),
+        ("duration", "double"),
+        ("annotation_count", "int64"),
+    ),
+    suites=(
+        ("result_id", "int64"),
+        ("result", "string"),
+        ("result_updated_at", "string"),
+        ("path", "string"),
+        ("name", "string"),
+        ("passed", "int64"),
+        ("failed", "int64"),
+        ("not_applicable", "int64"),
+        ("errored", "int64"),
+        ("case_count", "int64"),
+    ),
+)
+""" Columns (name, arrow type) of the tables of the dataset exported from the trove
+(see :meth:`Trove.export_dataset`)"""
+
+DATASET_PARTITIONS = (("org", "string"), ("project", "string"), ("space", "string"))
+""" Partition columns of the tables of the dataset (``<column>=<value>`` directories)"""
+
+DATASET_STATE_NAME = "_export.json"
+""" Name of the file recording the results exported to a dataset directory"""
+
 logger = testspace_colab.ts_log.get_logger("trove")
 
 
+def result_format(path):
+    """Returns the format of a result file according to its extension (None if it is
+    not a result file)"""
+    name = pathlib.Path(path).name
+    for format in sorted(RESULT_FORMATS, key=len, reverse=True):
+        if name.endswith(f".{format}"):
+            return format
+    return None
+
+
+def result_name(path):
+    """Returns the name of a result file without its format extension"""
+    name = pathlib.Path(path).name
+    format = result_format(path)
+    return name[: -len(format) - 1] if format else name
+
+
+def _open_result(path, mode, format):
+    if format.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if format.endswith(".xz"):
+        return lzma.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _container_records(at, container):
+    """Yields the ndjson records of a container and of its sub-folders, in depth
+    first order. The folders are written without their content."""
+    stack = [(tuple(at), container)]
+    while stack:
+        at, container = stack.pop()
+        if "folders" in container:
+            stack.extend(
+                ((*at, index), folder)
+                for index, folder in reversed(list(enumerate(container["folders"])))
+            )
+            container = dict(container, folders=[])
+        yield dict(at=list(at), container=container)
+
+
+def ndjson_records(response):
+    """Yields the records of a result in the ndjson format: the result without its
+    details then a record per container, in depth first order, with its position
+    ``at`` (the indexes of the container and of its parent folders)."""
+    header = {key: value for key, value in response.items() if key != "details"}
+    if "details" in response:
+        header["details"] = []
+    yield dict(result=header)
+    for index, container in enumerate(response.get("details", [])):
+        yield from _container_records((index,), container)
+
+
+def _read_ndjson(file_handle):
+    """Reassembles a result written by :func:`ndjson_records`"""
+    result = None
+    records = []
+    for line in file_handle:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if "result" in record:
+            result = record["result"]
+        else:
+            records.append(record)
+    if result is None:
+        raise ValueError("no result record")
+    if "details" in result:
+        records.sort(key=lambda record: record["at"])
+        for record in records:
+            listing = result["details"]
+            for index in record["at"][:-1]:
+                listing = listing[index]["folders"]
+            listing.append(record["container"])
+    return result
+
+
+class ResultWriter:
+    """Writes a result file (see :func:`write_result`) as a context manager.
+
+    With the ``ndjson`` formats, the folders and suites can be written one by one
+    with :meth:`write_container` as they are loaded, in any order, so that the
+    whole result never has to be in memory (see the ``sink`` parameter of
+    :meth:`testspace_colab.lib.API.get_result_details`).
+
+    The result is written to a temporary file, which is renamed when the block
+    exits without error and removed otherwise.
+
+    :param path: the file path
+    :param format: one of :data:`RESULT_FORMATS` (according to the extension of
+                   ``path`` if not set, json by default)
+    :param decode_annotations: If set, the lazy annotation texts are decoded
+                               (see :class:`testspace_colab.utils.JSONEncoder`)
+    """
+
+    def __init__(self, path, format=None, decode_annotations=True):
+        self.path = pathlib.Path(path)
+        self.format = format or result_format(self.path) or "json"
+        if self.format == "json":
+            self._encoder = utils_module.JSONEncoder(
+                decode_annotations=decode_annotations, indent=4
+            )
+        else:
+            self._encoder = utils_module.JSONEncoder(
+                decode_annotations=decode_annotations, separators=(",", ":")
+            )
+        self._lock = threading.Lock()
+        self._tmp_name = None
+        self._file_handle = None
+
+    @property
+    def streaming(self):
+        """Whether the containers can be written one by one"""
+        return self.format.startswith("ndjson")
+
+    def __enter__(self):
+        file_descriptor, self._tmp_name = tempfile.mkstemp(
+            dir=self.path.parent, prefix=f".{self.path.name}.", suffix=".tmp"
+        )
+        os.close(file_descriptor)
+        self._file_handle = _open_result(self._tmp_name, "w", self.format)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self._file_handle.close()
+            if exc_type is None:
+                os.replace(self._tmp_name, self.path)
+        finally:
+            if os.path.exists(self._tmp_name):
+                os.remove(self._tmp_name)
+
+    def _write_record(self, record):
+        line = self._encoder.encode(record) + "\n"
+        with self._lock:
+            self._file_handle.write(line)
+
+    def write_result(self, response):
+        """Writes the result. With the ``ndjson`` formats, its ``details`` may be
+        empty and the containers written by :meth:`write_container`."""
+        if self.streaming:
+            for record in ndjson_records(response):
+                self._write_record(record)
+        else:
+            for chunk in self._encoder.iterencode(response):
+                self._file_handle.write(chunk)
+
+    def write_container(self, at, container):
+        """Writes a container of the result and its sub-folders (thread safe)
+
+        :param at: the position of the container (its index and the indexes of
+                   its parent folders)
+        :param container: the folder or suite
+        """
+        if not self.streaming:
+            raise ValueError(f"containers cannot be streamed to {self.format} files")
+        for record in _container_records(at, container):
+            self._write_record(record)
+
+
+def write_result(response, path, format=None, decode_annotations=True):
+    """Saves a result (e.g. as returned by get_result_details) to a file.
+
+    The result is encoded and written chunk by chunk to a temporary file, which is
+    then renamed, so that the file is either complete or not there.
+
+    :param response: the result
+    :param path: the file path
+    :param format: one of :data:`RESULT_FORMATS` (according to the extension of
+                   ``path`` if not set, json by default)
+    :param decode_annotations: If set, the lazy annotation texts are decoded
+                               (see :class:`testspace_colab.utils.JSONEncoder`)
+    """
+    with ResultWriter(path, format, decode_annotations) as writer:
+        writer.write_result(response)
+
+
+def read_result(path):
+    """Loads a result file of any of the :data:`RESULT_FORMATS`"""
+    format = result_format(path) or "json"
+    with _open_result(path, "r", format) as file_handle:
+        if format.startswith("ndjson"):
+            return _read_ndjson(file_handle)
+        return json.load(file_handle)
+
+
+def iter_result(path):
+    """Streams an ``ndjson`` result file: yields the result (with empty ``details``)
+    then a (position, container) tuple per folder and suite, in the order they were
+    written. The folders are yielded without their content (see
+    :meth:`ResultWriter.write_container`)."""
+    format = result_format(path) or "json"
+    if not format.startswith("ndjson"):
+        raise ValueError(f"{path} cannot be streamed")
+    with _open_result(path, "r", format) as file_handle:
+        for line in file_handle:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "result" in record:
+                yield record["result"]
+            else:
+                yield tuple(record["at"]), record["container"]
+
+
+def read_result_header(path):
+    """Returns a result file without its ``details`` (which are only parsed with the
+    ``json`` formats)"""
+    format = result_format(path) or "json"
+    with _open_result(path, "r", format) as file_handle:
+        if format.startswith("ndjson"):
+            for line in file_handle:
+                if line.strip():
+                    record = json.loads(line)
+                    if "result" not in record:
+                        break
+                    record["result"].pop("details", None)
+                    return record["result"]
+            raise ValueError("no result record")
+        result = json.load(file_handle)
+    result.pop("details", None)
+    return result
+
+
+def file_checksum(path):
+    """Returns the SHA-256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file_handle:
+        for chunk in iter(lambda: file_handle.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultHandle(collections.abc.Mapping):
+    """A result of the trove (see :meth:`Trove.load`) whose ``details`` are only
+    read from its file when accessed.
+
+    The other entries of the result come from the :class:`Catalog` of the trove
+    if it has one, or from the file (see :func:`read_result_header`, which reads
+    a single line of the ``ndjson`` formats) the first time one is accessed. The
+    details are kept once read until :meth:`release` is called, e.g.::
+
+        for result in trove.load(lazy=True):
+            if result["name"].startswith("build"):
+                with result:  # releases the details on exit
+                    frame = details_to_case_columns(result["details"]).to_frame()
+
+    :param path: the result file
+    :param org: the organization of the result
+    :param project: the project of the result
+    :param space: the space of the result
+    :param header: the result without its ``details`` (read from the file if not
+                   set)
+    """
+
+    def __init__(self, path, org=None, project=None, space=None, header=None):
+        self.path = pathlib.Path(path)
+        self.org = org
+        self.project = project
+        self.space = space
+        self._header = header
+        self._details = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<ResultHandle {self.path}>"
+
+    @property
+    def name(self):
+        """The name of the result file without its format extension"""
+        return result_name(self.path)
+
+    @property
+    def header(self):
+        """The result without its ``details``"""
+        if self._header is None:
+            self._header = read_result_header(self.path)
+        return self._header
+
+    @property
+    def details(self):
+        """The details of the result, read from its file on first access"""
+        with self._lock:
+            if self._details is None:
+                result = read_result(self.path)
+                self._details = result.get("details", [])
+            return self._details
+
+    @property
+    def loaded(self):
+        """Whether the details are in memory"""
+        return self._details is not None
+
+    def release(self):
+        """Releases the details (read again on the next access)"""
+        with self._lock:
+            self._details = None
+
+    def load(self):
+        """Returns the whole result as a dict (as :meth:`Trove.load` without
+        ``lazy``), without keeping its details"""
+        return read_result(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def __getitem__(self, key):
+        if key == "details":
+            return self.details
+        return self.header[key]
+
+    def __iter__(self):
+        yield from self.header
+        yield "details"
+
+    def __len__(self):
+        return len(self.header) + 1
+
+
+class Manifest:
+    """Record of the results saved in an organization directory of the trove
+    (by ``ts-colab crawl``), stored in the :data:`MANIFEST_NAME` file of that
+    directory.
+
+    Each result saved is recorded under ``<project>/<space>/<result>`` with its
+    :data:`RESULT_STAMPS`, its file (relative to the organization directory),
+    the file size and checksum. A result is up to date (see :meth:`is_current`)
+    while its stamps do not change and its file is there.
+
+    :param org_dir: the organization directory
+    """
+
+    VERSION = 1
+
+    def __init__(self, org_dir):
+        self.org_dir = pathlib.Path(org_dir)
+        self.path = self.org_dir / MANIFEST_NAME
+        self.results = dict()
+        if self.path.is_file():
+            try:
+                with open(self.path, "r") as file_handle:
+                    self.results = json.load(file_handle)["results"]
+            except (OSError, ValueError, KeyError) as load_error:
+                logger.warning(f"ignoring manifest {self.path} - error {load_error}")
+
+    @staticmethod
+    def key(project, space, result):
+        return f"{project}/{space}/{result}"
+
+    def get(self, project, space, result):
+        """Returns the entry of a result or None"""
+        return self.results.get(self.key(project, space, result))
+
+    def is_current(
+        self,
+        project,
+        space,
+        result,
+        result_info,
+        failures_only=False,
+        result_file=None,
+    ):
+        """Tells whether a result was saved and did not change since
+
+        :param result_info: the result as listed by testspace (e.g. get_results)
+        :param failures_only: whether the result is to be saved with failures only
+        :param result_file: If set, the file the result is to be saved to (e.g. in
+                            another format than the recorded one)
+        """
+        entry = self.get(project, space, result)
+        if entry is None or entry.get("failures_only", False) != failures_only:
+            return False
+        if result_file and entry["file"] != self._relative(result_file):
+            return False
+        stamps = [stamp for stamp in RESULT_STAMPS if stamp in result_info]
+        if not stamps:
+            return False
+        if any(entry.get(stamp) != result_info[stamp] for stamp in stamps):
+            return False
+        result_file = self.org_dir / entry["file"]
+        return result_file.is_file() and result_file.stat().st_size == entry["size"]
+
+    def record(self, project, space, result, result_info, result_file, checksum=None):
+        """Records a saved result. The file previously recorded for the result,
+        if another one (e.g. in another format), is removed.
+
+        :param result_info: the result (its :data:`RESULT_STAMPS` are recorded)
+        :param result_file: the file the result was saved to
+        :param checksum: the file checksum (computed if not set)
+        """
+        result_file = pathlib.Path(result_file)
+        previous = self.get(project, space, result)
+        if previous and previous["file"] != self._relative(result_file):
+            try:
+                (self.org_dir / previous["file"]).unlink()
+            except OSError:
+                pass
+        entry = {
+            stamp: result_info[stamp] for stamp in RESULT_STAMPS if stamp in result_info
+        }
+        if result_info.get("failures_only"):
+            entry["failures_only"] = True
+        entry["file"] = self._relative(result_file)
+        entry["size"] = result_file.stat().st_size
+        entry["sha256"] = checksum or file_checksum(result_file)
+        self.results[self.key(project, space, result)] = entry
+
+    def _relative(self, result_file):
+        return pathlib.Path(result_file).relative_to(self.org_dir).as_posix()
+
+    def save(self):
+        """Writes the manifest (atomically)"""
+        self.org_dir.mkdir(parents=True, exist_ok=True)
+        file_descriptor, tmp_name = tempfile.mkstemp(dir=self.org_dir, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "w") as file_handle:
+                json.dump(
+                    dict(version=self.VERSION, results=self.results),
+                    file_handle,
+                    indent=1,
+                    sort_keys=True,
+                )
+            os.replace(tmp_name, self.path)
+        finally:
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
+
+
+class Catalog:
+    """SQLite index of the results of a trove, stored in the :data:`CATALOG_NAME`
+    file of the trove directory.
+
+    The catalog holds a row per result file with the organization, project, space
+    and name of the result (the name of the file without its extension), its
+    ``id``, ``name``, dates and counts, the file (relative to the trove directory),
+    its format, size and modification time and the whole result without its
+    ``details`` (``header``). It is maintained by ``ts-colab crawl`` and
+    :meth:`Trove.reindex`, and lets :meth:`Trove.load` find results without
+    reading every file.
+
+    :param trove_path: the trove directory
+    """
+
+    VERSION = 1
+
+    COLUMNS = (
+        "file",
+        "org",
+        "project",
+        "space",
+        "name",
+        "id",
+        "result_name",
+        "created_at",
+        "updated_at",
+        "complete",
+        "failures_only",
+        "suite_count",
+        "case_count",
+        "session_suite_counts",
+        "session_case_counts",
+        "annotation_counts",
+        "format",
+        "size",
+        "mtime",
+        "header",
+    )
+
+    JSON_COLUMNS = (
+        "session_suite_counts",
+        "session_case_counts",
+        "annotation_counts",
+        "header",
+    )
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS results (
+            file TEXT PRIMARY KEY,
+            org TEXT NOT NULL,
+            project TEXT NOT NULL,
+            space TEXT NOT NULL,
+            name TEXT NOT NULL,
+            id INTEGER,
+            result_name TEXT,
+            created_at TEXT,
+            updated_at TEXT,
+            complete INTEGER,
+            failures_only INTEGER,
+            suite_count INTEGER,
+            case_count INTEGER,
+            session_suite_counts TEXT,
+            session_case_counts TEXT,
+            annotation_counts TEXT,
+            format TEXT,
+            size INTEGER,
+            mtime REAL,
+            header TEXT
+        );
+        CREATE INDEX IF NOT EXISTS results_location
+            ON results (org, project, space, name);
+        CREATE INDEX IF NOT EXISTS results_id ON results (id);
+        CREATE INDEX IF NOT EXISTS results_updated_at ON results (updated_at);
+    """
+
+    def __init__(self, trove_path):
+        self.trove_path = pathlib.Path(trove_path)
+        self.path = self.trove_path / CATALOG_NAME
+        self._lock = threading.Lock()
+
+    def exists(self):
+        return self.path.is_file()
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Yields a connection to the catalog (created if needed), committing the
+        changes when the block exits without error"""
+        with self._lock:
+            self.trove_path.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(str(self.path))
+            try:
+                connection.row_factory = sqlite3.Row
+                if connection.execute("PRAGMA user_version").fetchone()[0] != (
+                    self.VERSION
+                ):
+                    connection.execute("DROP TABLE IF EXISTS results")
+                    connection.executescript(self.SCHEMA)
+                    connection.execute(f"PRAGMA user_version = {self.VERSION}")
+                with connection:
+                    yield connection
+            finally:
+                connection.close()
+
+    def entry(self, org, project, space, result_file, result=None):
+        """Returns the row of a result file
+
+        :param result_file: the file of the result (in the trove directory)
+        :param result: the result, with or without its ``details`` (read from the
+                       file if not set, see :func:`read_result_header`)
+        """
+        result_file = pathlib.Path(result_file)
+        if result is None:
+            result = read_result_header(result_file)
+        header = {key: value for key, value in result.items() if key != "details"}
+        format = result_format(result_file) or "json"
+        stat = result_file.stat()
+        return dict(
+            file=result_file.relative_to(self.trove_path).as_posix(),
+            org=org,
+            project=project,
+            space=space,
+            name=result_name(result_file),
+            id=header.get("id"),
+            result_name=header.get("name"),
+            created_at=header.get("created_at"),
+            updated_at=header.get("updated_at"),
+            complete=header.get("complete"),
+            failures_only=bool(header.get("failures_only")),
+            suite_count=sum(header.get("session_suite_counts") or [0]),
+            case_count=sum(header.get("session_case_counts") or [0]),
+            session_suite_counts=header.get("session_suite_counts"),
+            session_case_counts=header.get("session_case_counts"),
+            annotation_counts=header.get("annotation_counts"),
+            format=format,
+            size=stat.st_size,
+            mtime=stat.st_mtime,
+            header=header,
+        )
+
+    def update(self, entries):
+        """Adds or replaces rows (see :meth:`entry`). The rows of the other files
+        of a same result (e.g. in another format) are removed."""
+        entries = list(entries)
+        locations = ("org", "project", "space", "name", "file")
+        rows = [
+            tuple(
+                json.dumps(entry[column], cls=utils_module.JSONEncoder)
+                if column in self.JSON_COLUMNS
+                else entry[column]
+                for column in self.COLUMNS
+            )
+            for entry in entries
+        ]
+        with self._connect() as connection:
+            connection.executemany(
+                "DELETE FROM results WHERE org = ? AND project = ? AND space = ? "
+                "AND name = ? AND file != ?",
+                [tuple(entry[column] for column in locations) for entry in entries],
+            )
+            connection.executemany(
+                f"INSERT OR REPLACE INTO results ({', '.join(self.COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(self.COLUMNS))})",
+                rows,
+            )
+
+    def remove(self, files):
+        """Removes the rows of result files (relative to the trove directory)"""
+        with self._connect() as connection:
+            connection.executemany(
+                "DELETE FROM results WHERE file = ?", [(file,) for file in files]
+            )
+
+    def query(self, org=None, project=None, space=None, result=None):
+        """Returns the rows (as dicts) matching the filters, ordered by file
+
+        :param result: the name (see :class:`Catalog`) or ID of the result
+        """
+        conditions = []
+        parameters = []
+        for column, value in (("org", org), ("project", project), ("space", space)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                parameters.append(value)
+        if result is not None:
+            if str(result).isdigit():
+                conditions.append("(name = ? OR id = ?)")
+                parameters.extend((str(result), int(result)))
+            else:
+                conditions.append("name = ?")
+                parameters.append(result)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._connect() as connection:
+            cursor = connection.execute(
+                f"SELECT * FROM results{where} ORDER BY file", parameters
+            )
+            rows = [dict(row) for row in cursor]
+        for row in rows:
+            row["failures_only"] = bool(row["failures_only"])
+            for column in self.JSON_COLUMNS:
+                if row[column] is not None:
+                    row[column] = json.loads(row[column])
+        return rows
+
+
 class Trove:
     """A utility to iterate over the results found
     in the trove
@@ -21,6 +728,7 @@ class Trove:
 
     def __init__(self, trove_path=DEFAULT_LOCATION):
         self.path = pathlib.Path(trove_path)
+        self.catalog = Catalog(self.path)
         self._org = None
 
     @property
@@ -42,35 +750,333 @@ class Trove:
             logger.warning(f"trove dir {self.path} does not exist")
             return None
         for dir in self.path.iterdir():
-            yield dir.name
+            if not dir.name.startswith("."):
+                yield dir.name
 
-    def load(self, org=None, project=None, space=None, result=None):
-        if not self.path.is_dir():
-            logger.warning(f"trove dir {self.path} does not exist")
-            return None
+    def _result_files(self, org=None, project=None, space=None):
+        """Walks the trove directories, yielding a (org, project, space, file) tuple
+        per result file"""
         orgs = [org] if org else self.organizations()
         for org_name in orgs:
-            load_path = self.path / org_name
-            if not load_path.is_dir():
-                raise OSError(f"{load_path} is not a directory")
-            projects = [project] if project else load_path.iterdir()
+            org_path = self.path / org_name
+            if not org_path.is_dir():
+                raise OSError(f"{org_path} is not a directory")
+            projects = (
+                [project]
+                if project
+                else [path.name for path in org_path.iterdir() if path.is_dir()]
+            )
             for project_name in projects:
-                load_path = load_path / project_name
-                if not load_path.is_dir():
-                    raise OSError(f"{load_path} is not a directory")
-                spaces = [space] if space else load_path.iterdir()
+                project_path = org_path / project_name
+                if not project_path.is_dir():
+                    raise OSError(f"{project_path} is not a directory")
+                spaces = (
+                    [space]
+                    if space
+                    else [path.name for path in project_path.iterdir() if path.is_dir()]
+                )
                 for space_name in spaces:
-                    load_path = load_path / space_name
-                    if not load_path.is_dir():
-                        raise OSError(f"{load_path} is not a directory")
-                    for result in load_path.iterdir():
+                    space_path = project_path / space_name
+                    if not space_path.is_dir():
+                        raise OSError(f"{space_path} is not a directory")
+                    for result in space_path.iterdir():
                         if not result.is_file():
                             logger.warning(f"{result} result is not a file")
+                        elif result_format(result) is None:
+                            logger.debug(f"{result} is not a result file")
                         else:
-                            try:
-                                with open(result, "r") as file_hanfle:
-                                    yield json.load(file_hanfle)
-                            except json.JSONDecodeError as json_error:
-                                logger.warning(
-                                    f"Failed to load {result} - error {json_error}"
-                                )
+                            yield org_name, project_name, space_name, result
+
+    def reindex(self, result_files=None):
+        """Updates the :class:`Catalog` of the trove from the result files: the
+        new files and the ones whose size or modification time changed are read
+        (without their ``details`` if possible) and the rows of the files that are
+        gone are removed.
+
+        :param result_files: If set, only these (org, project, space, file) result
+                             files are indexed (e.g. the ones a crawl skipped) and
+                             no row is removed
+        :return: the number of rows added or updated
+        """
+        if not self.path.is_dir():
+            logger.warning(f"trove dir {self.path} does not exist")
+            return 0
+        indexed = {
+            row["file"]: (row["size"], row["mtime"]) for row in self.catalog.query()
+        }
+        if result_files is None:
+            result_files = self._result_files()
+            gone = set(indexed)
+        else:
+            gone = set()
+        entries = []
+        for org, project, space, result_file in result_files:
+            file = result_file.relative_to(self.path).as_posix()
+            stat = result_file.stat()
+            gone.discard(file)
+            if indexed.get(file) == (stat.st_size, stat.st_mtime):
+                continue
+            try:
+                entries.append(self.catalog.entry(org, project, space, result_file))
+            except (OSError, EOFError, ValueError, lzma.LZMAError) as load_error:
+                logger.warning(f"Failed to index {result_file} - error {load_error}")
+        self.catalog.update(entries)
+        self.catalog.remove(gone)
+        logger.debug(f"reindex - {len(entries)} updated, {len(gone)} removed")
+        return len(entries)
+
+    def load(self, org=None, project=None, space=None, result=None, lazy=False):
+        """Return a generator of the results found in the trove, whatever the
+        format of their file (see :data:`RESULT_FORMATS`)
+
+        If the trove has a :class:`Catalog` (see :meth:`reindex`), the results are
+        looked up in it and only their files are read. The directories are walked
+        otherwise.
+
+        :param result: the name (of the file) or ID of a result
+        :param lazy: If set, :class:`ResultHandle` objects are returned instead
+                     of the results: their files are only read when their details
+                     are accessed (their other entries are read from the catalog
+                     if any)
+        """
+        if not self.path.is_dir():
+            logger.warning(f"trove dir {self.path} does not exist")
+            return None
+        if self.catalog.exists():
+            handles = [
+                ResultHandle(
+                    self.path / row["file"],
+                    row["org"],
+                    row["project"],
+                    row["space"],
+                    header=row["header"],
+                )
+                for row in self.catalog.query(org, project, space, result)
+            ]
+        else:
+            handles = (
+                ResultHandle(result_file, *location)
+                for *location, result_file in self._result_files(org, project, space)
+            )
+        for handle in handles:
+            try:
+                if (
+                    result is not None
+                    and str(result) != handle.name
+                    and str(result) != str(handle.header.get("id"))
+                ):
+                    continue
+                if lazy:
+                    yield handle
+                else:
+                    yield handle.load()
+            except (OSError, EOFError, ValueError, lzma.LZMAError) as load_error:
+                logger.warning(f"Failed to load {handle.path} - error {load_error}")
+
+    def export_dataset(self, dest, full=False):
+        """Exports the test cases and suites of the results of the trove as a
+        Parquet dataset (see :data:`DATASET_TABLES`) partitioned by organization,
+        project and space, e.g. ``<dest>/cases/org=<org>/project=<project>/
+        space=<space>/<result>.parquet``. See :func:`open_dataset` to read it.
+
+        The results exported are recorded in the :data:`DATASET_STATE_NAME` file
+        of ``dest``, so that the next exports only write the results that are new
+        or changed since (and remove the files of the results that are gone).
+
+        Requires `pyarrow <https://arrow.apache.org/docs/python>`_
+        (``pip install testspace-colab[parquet]``)
+
+        :param dest: the dataset directory
+        :param full: If set, all the results are exported again
+        :return: the number of results exported
+        """
+        if pyarrow is None:
+            raise ImportError(
+                "export_dataset requires pyarrow - pip install testspace-colab[parquet]"
+            )
+        dest = pathlib.Path(dest).expanduser()
+        state_path = dest / DATASET_STATE_NAME
+        exported = dict()
+        if state_path.is_file() and not full:
+            try:
+                with open(state_path, "r") as file_handle:
+                    exported = json.load(file_handle)["results"]
+            except (OSError, ValueError, KeyError) as load_error:
+                logger.warning(f"ignoring {state_path} - error {load_error}")
+        previous = dict(exported)
+        count = 0
+        try:
+            for org, project, space, result_file in self._result_files():
+                file = result_file.relative_to(self.path).as_posix()
+                stat = result_file.stat()
+                entry = previous.pop(file, None)
+                if entry and (entry["size"], entry["mtime"]) == (
+                    stat.st_size,
+                    stat.st_mtime,
+                ):
+                    continue
+                try:
+                    result = read_result(result_file)
+                except (OSError, EOFError, ValueError, lzma.LZMAError) as load_error:
+                    logger.warning(f"Failed to load {result_file} - error {load_error}")
+                    continue
+                name = result_name(result_file)
+                for table, columns in _dataset_columns(result, name).items():
+                    _write_dataset_file(
+                        _dataset_file(dest, table, org, project, space, name),
+                        table,
+                        columns,
+                    )
+                exported[file] = dict(
+                    partition=[org, project, space],
+                    name=name,
+                    size=stat.st_size,
+                    mtime=stat.st_mtime,
+                )
+                count += 1
+            for file, entry in previous.items():
+                del exported[file]
+                if any(
+                    other["partition"] == entry["partition"]
+                    and other["name"] == entry["name"]
+                    for other in exported.values()
+                ):
+                    continue  # Exported from another file (e.g. another format)
+                for table in DATASET_TABLES:
+                    dataset_file = _dataset_file(
+                        dest, table, *entry["partition"], entry["name"]
+                    )
+                    if dataset_file.is_file():
+                        dataset_file.unlink()
+        finally:
+            dest.mkdir(parents=True, exist_ok=True)
+            file_descriptor, tmp_name = tempfile.mkstemp(dir=dest, suffix=".tmp")
+            try:
+                with os.fdopen(file_descriptor, "w") as file_handle:
+                    json.dump(dict(version=1, results=exported), file_handle, indent=1)
+                os.replace(tmp_name, state_path)
+            finally:
+                if os.path.exists(tmp_name):
+                    os.remove(tmp_name)
+        logger.debug(f"export_dataset - {count} exported, {len(previous)} removed")
+        return count
+
+    def load_cases_frames(self, org=None, project=None, space=None):
+        """Same as :meth:`load` but the test cases of each result are returned
+        as a pandas DataFrame (see :meth:`testspace_colab.lib.API.get_result_cases_frame`)
+
+        :return: a generator of (result, frame) tuples where result is the
+                 result without its ``details``
+        """
+        for result in self.load(org=org, project=project, space=space):
+            details = result.pop("details", [])
+            yield result, utils_module.details_to_case_columns(details).to_frame()
+
+
+def _dataset_file(dest, table, org, project, space, name):
+    partition = [
+        f"{key}={urllib.parse.quote(value, safe='')}"
+        for (key, _), value in zip(DATASET_PARTITIONS, (org, project, space))
+    ]
+    return pathlib.Path(dest, table, *partition, f"{name}.parquet")
+
+
+def _as_number(value, number_type=float):
+    """Converts an attribute to a number (None if it is not one)"""
+    try:
+        return None if value is None else number_type(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _dataset_columns(result, name):
+    """Returns the columns of the :data:`DATASET_TABLES` for a result"""
+    tables = {
+        table: {column: [] for column, _ in columns}
+        for table, columns in DATASET_TABLES.items()
+    }
+    cases, suites = tables["cases"], tables["suites"]
+    result_columns = dict(
+        result_id=_as_number(result.get("id"), int),
+        result=name,
+        result_updated_at=result.get("updated_at"),
+    )
+    stack = list(reversed(result.get("details") or []))
+    while stack:
+        container = stack.pop()
+        stack.extend(reversed(container.get("folders") or []))
+        if not container.get("type", "").startswith("suite"):
+            continue
+        case_columns = utils_module.details_to_case_columns(container)
+        counts = list(container.get("case_counts") or [])[:4]
+        counts += [None] * (4 - len(counts))
+        for column, value in result_columns.items():
+            suites[column].append(value)
+            cases[column].extend([value] * case_columns.size)
+        suites["path"].append(container.get("path"))
+        suites["name"].append(container.get("name"))
+        for column, value in zip(
+            ("passed", "failed", "not_applicable", "errored"), counts
+        ):
+            suites[column].append(value)
+        suites["case_count"].append(case_columns.size)
+        for column, values in (
+            ("suite_path", case_columns.columns.get("path")),
+            ("name", case_columns.columns.get("name")),
+            ("status", case_columns.columns.get("status")),
+            ("annotation_count", case_columns.columns.get("annotation_count")),
+        ):
+            cases[column].extend(values or [None] * case_columns.size)
+        cases["duration"].extend(
+            _as_number(value)
+            for value in case_columns.columns.get("duration")
+            or [None] * case_columns.size
+        )
+    return tables
+
+
+def _write_dataset_file(path, table, columns):
+    """Writes the columns of a table of the dataset to a Parquet file (atomically)"""
+    arrow_table = pyarrow.Table.from_pydict(
+        columns, schema=_dataset_schema(DATASET_TABLES[table])
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    file_descriptor, tmp_name = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    os.close(file_descriptor)
+    try:
+        pyarrow.parquet.write_table(arrow_table, tmp_name)
+        os.replace(tmp_name, path)
+    finally:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+
+
+def _dataset_schema(columns):
+    return pyarrow.schema(
+        [(column, pyarrow.type_for_alias(type)) for column, type in columns]
+    )
+
+
+def open_dataset(path, table="cases"):
+    """Opens a table of a dataset exported by :meth:`Trove.export_dataset`
+
+    :param path: the dataset directory
+    :param table: one of :data:`DATASET_TABLES`
+    :return: a :class:`pyarrow.dataset.Dataset` with the ``org``, ``project`` and
+             ``space`` partition columns e.g. ``open_dataset(path).to_table(
+             filter=pyarrow.dataset.field("status") == "failed").to_pandas()``
+    """
+    if pyarrow is None:
+        raise ImportError(
+            "open_dataset requires pyarrow - pip install testspace-colab[parquet]"
+        )
+    return pyarrow.dataset.dataset(
+        pathlib.Path(path, table).expanduser(),
+        schema=_dataset_schema(DATASET_TABLES[table] + DATASET_PARTITIONS),
+        format="parquet",
+        partitioning=pyarrow.dataset.partitioning(
+            _dataset_schema(DATASET_PARTITIONS), flavor="hive"
+        ),
+    )
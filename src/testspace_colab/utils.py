@@ -2,9 +2,12 @@
 
 """
 import os
+import json
 import gzip
+import fnmatch
 import base64
 import pathlib
+import xml.etree.ElementTree as ElementTree
 import click
 import testspace_colab.ts_log
 
@@ -41,7 +44,7 @@ def get_notebook_dir():
     return PROJECT_ROOT / "notebooks"
 
 
-def json_to_table(json_data, ignore_columns=None):
+def json_to_table(json_data, ignore_columns=None, err=False):
     columns = dict()
 
     if isinstance(json_data, dict):
@@ -64,87 +67,498 @@ def json_to_table(json_data, ignore_columns=None):
                     columns[name] = value
 
     for name, lenght in columns.items():
-        click.secho(f"{name.upper():{lenght}} | ", fg="green", nl=False)
-    click.secho(nl=True)
+        click.secho(f"{name.upper():{lenght}} | ", fg="green", nl=False, err=err)
+    click.secho(nl=True, err=err)
     for row in json_data:
         for name, value in row.items():
             if name not in columns:
                 continue
-            click.secho(f"{str(value):{columns[name]}} | ", bold=True, nl=False)
-        click.secho(nl=True)
+            click.secho(
+                f"{str(value):{columns[name]}} | ", bold=True, nl=False, err=err
+            )
+        click.secho(nl=True, err=err)
+
+
+class LazyText:
+    """Text of an annotation kept as sent by testspace (base64 encoded gzip)
+    until it is accessed.
+
+    ``str()`` (or :meth:`decode`) returns the decoded text and :attr:`payload`
+    the encoded one. Use :class:`JSONEncoder` to serialize structures holding
+    lazy texts.
+
+    :param payload: the base64 encoded gzip content
+    :param path: Path of the annotation (for error reporting)
+    """
+
+    __slots__ = ("payload", "path")
+
+    def __init__(self, payload, path=None):
+        self.payload = payload
+        self.path = path
+
+    def decode(self):
+        """Returns the decoded text or None if it cannot be decoded"""
+        try:
+            return gzip.decompress(base64.b64decode(self.payload)).decode("utf-8")
+        except Exception as extract_error:
+            logger.error(
+                f"Failed to decode annotation {self.path} error -> {extract_error}"
+            )
+            return None
+
+    def __str__(self):
+        return self.decode() or ""
+
+    def __repr__(self):
+        return f"LazyText({len(self.payload)} bytes)"
+
+    def __eq__(self, other):
+        if isinstance(other, LazyText):
+            return self.payload == other.payload
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.payload)
+
+    def __getstate__(self):
+        return self.payload, self.path
+
+    def __setstate__(self, state):
+        self.payload, self.path = state
+
+
+class JSONEncoder(json.JSONEncoder):
+    """JSON encoder for the result details holding :class:`LazyText`
+
+    :param decode_annotations: If set (default), the lazy texts are decoded
+                               otherwise the encoded payload is written
+    """
+
+    def __init__(self, *args, decode_annotations=True, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.decode_annotations = decode_annotations
+
+    def default(self, o):
+        if isinstance(o, LazyText):
+            return o.decode() if self.decode_annotations else o.payload
+        return super().default(o)
+
+
+ELEMENT_TYPES = {
+    "test_suite": ("cases", "suites"),
+    "test_case": ("annotations", "cases"),
+    "annotation": ("comments", "annotations"),
+}
+""" Element tag -> (children type, progress object type)"""
 
+PROGRESS_BATCH_SIZE = 500
+""" Number of converted elements between two progress callbacks"""
 
-def xml_to_json(xml_data, path, progress_callback=None):
+
+class _JsonBuilder:
+    """Builds the JSON structure of a suite snippet from start/end
+    element events.
+
+    Both :func:`xml_to_json` and :func:`xml_stream_to_json` drive this builder
+    so that they produce the exact same output. The progress is reported in
+    batches of :data:`PROGRESS_BATCH_SIZE` elements.
+
+    :param path: Path leading to the XML content
+    :param progress_callback: a progress callback function
+    :param lazy_annotations: If set, the annotation texts are :class:`LazyText`
+    """
+
+    def __init__(self, path, progress_callback=None, lazy_annotations=False):
+        self._path = path
+        self._lazy_annotations = lazy_annotations
+        self._progress_callback = progress_callback
+        self._progress = dict()
+        self._progress_count = 0
+        # One [tag, json object, children type, children, path] per open element
+        self._stack = []
+        self._root = None
+
+    def _count(self, object_type):
+        if self._progress_callback:
+            self._progress[object_type] = self._progress.get(object_type, 0) + 1
+            self._progress_count += 1
+            if self._progress_count >= PROGRESS_BATCH_SIZE:
+                self._flush()
+
+    def _flush(self):
+        for object_type, object_count in self._progress.items():
+            self._progress_callback(object_type=object_type, object_count=object_count)
+        self._progress.clear()
+        self._progress_count = 0
+
+    def start(self, tag, json_object):
+        """Opens an element
+
+        :param tag: the element tag
+        :param json_object: the dict holding the element attributes (it becomes
+                            the JSON object of the element)
+        :return: True if the children of the element shall be converted
+        """
+        stack = self._stack
+        parent_path = stack[-1][4] if stack else self._path
+        element_types = ELEMENT_TYPES.get(tag)
+        if element_types:
+            name = json_object["name"]
+            path = parent_path + "/" + name if parent_path else "/" + name
+            children_type, object_type = element_types
+            stack.append((tag, json_object, children_type, [], path))
+            if self._progress_callback:
+                self._count(object_type)
+            return True
+        if tag != "comment":
+            logger.debug(f"unexpected element {tag} in {parent_path}")
+            self._count(tag)
+        stack.append((tag, json_object, None, None, parent_path))
+        return False
+
+    def end(self, text):
+        """Closes the current element
+
+        :param text: the text of the element
+        """
+        stack = self._stack
+        tag, json_object, children_type, children, path = stack.pop()
+        if tag == "annotation":
+            if isinstance(text, str) and self._lazy_annotations:
+                json_object["text"] = LazyText(text, path)
+            elif isinstance(text, str):
+                try:
+                    json_object["text"] = gzip.decompress(
+                        base64.b64decode(text)
+                    ).decode("utf-8")
+                except Exception as extract_error:
+                    logger.error(
+                        f"Failed to decode annotation {path} error -> {extract_error}"
+                    )
+        elif tag == "comment":
+            # The text contains the actual comment
+            json_object["text"] = text
+            json_object["path"] = path
+        if children:
+            json_object[children_type] = children
+        if stack:
+            parent = stack[-1]
+            json_object["path"] = parent[4] or "/"
+            parent[3].append(json_object)
+        else:
+            self._root = {tag.replace("test_", ""): json_object}
+
+    def finish(self):
+        """Reports the remaining progress and returns the JSON structure"""
+        if self._progress_count:
+            self._flush()
+        return self._root
+
+
+def xml_to_json(xml_data, path, progress_callback=None, lazy_annotations=False):
     """converts an object of type element
+
+    The tree is walked with an explicit stack so the depth of the XML is
+    not limited by the recursion limit.
+
     :param xml_data:
     :param path: Path leading to the XML content
     :param progress_callback: a progress callback function
+    :param lazy_annotations: If set, the annotation texts are not decoded but
+                             stored as :class:`LazyText`
     :return:
     """
-    json_data = dict()
-    element_type = xml_data.tag.replace("test_", "")
-    json_data[element_type] = xml_data.attrib
+    builder = _JsonBuilder(
+        path, progress_callback=progress_callback, lazy_annotations=lazy_annotations
+    )
+    # One (element, children iterator) per open element with children to convert
+    stack = []
+    element = xml_data
+    while element is not None:
+        if builder.start(element.tag, element.attrib) and len(element):
+            stack.append((element, iter(element)))
+        else:
+            builder.end(element.text)
+        # Moves to the next element, closing the exhausted ones
+        element = None
+        while stack:
+            element = next(stack[-1][1], None)
+            if element is not None:
+                break
+            builder.end(stack.pop()[0].text)
+    return builder.finish()
 
-    children_type = None
 
-    if xml_data.tag == "test_suite":
-        path = (
-            f"{path}/{xml_data.attrib['name']}"
-            if path
-            else f"/{xml_data.attrib['name']}"
-        )
-        children_type = "cases"
-        if progress_callback:
-            progress_callback(object_type="suites", object_count=1)
-    elif xml_data.tag == "test_case":
-        path = (
-            f"{path}/{xml_data.attrib['name']}"
-            if path
-            else f"/{xml_data.attrib['name']}"
+def xml_stream_to_json(source, path, progress_callback=None, lazy_annotations=False):
+    """Streaming flavor of :func:`xml_to_json`.
+
+    The XML is read incrementally from ``source`` with ElementTree.iterparse
+    and each element is cleared and removed from its parent as soon as it has been
+    converted so that only the JSON structure is held in memory. The output is identical to
+    ``xml_to_json(ElementTree.parse(source).getroot(), path)``
+
+    :param source: a file name or a binary file object
+    :param path: Path leading to the XML content
+    :param progress_callback: a progress callback function
+    :param lazy_annotations: If set, the annotation texts are not decoded but
+                             stored as :class:`LazyText`
+    :return:
+    """
+    builder = _JsonBuilder(
+        path, progress_callback=progress_callback, lazy_annotations=lazy_annotations
+    )
+    skip_depth = 0  # Depth within an element whose content is ignored
+    elements = []  # The open elements
+    for event, element in ElementTree.iterparse(source, events=("start", "end")):
+        if event == "start":
+            elements.append(element)
+            if skip_depth:
+                skip_depth += 1
+            # The attributes are copied as the element is cleared once converted
+            elif not builder.start(element.tag, dict(element.attrib)):
+                skip_depth = 1
+        else:
+            elements.pop()
+            if skip_depth > 1:
+                skip_depth -= 1
+                continue  # Released with the ignored element
+            skip_depth = 0
+            builder.end(element.text)
+            element.clear()
+            if elements:
+                # The converted siblings are removed in order so the element is
+                # the first child of its parent
+                del elements[-1][0]
+    return builder.finish()
+
+
+CASE_DTYPES = {
+    "duration": "float64",
+    "status": "category",
+    "annotation_count": "int64",
+}
+""" Column name -> pandas dtype of the case frames (the other columns are strings)"""
+
+
+class CaseColumns:
+    """Test case attributes stored column by column, ready to be turned
+    into a DataFrame in one go (see :meth:`to_frame`).
+
+    Each case contributes its attributes, its ``path`` and its
+    ``annotation_count``. A column missing from a case is set to None.
+    """
+
+    def __init__(self):
+        self.columns = dict()
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, case):
+        """Adds a case
+
+        :param case: a dict of attributes
+        """
+        columns = self.columns
+        for name, value in case.items():
+            column = columns.get(name)
+            if column is None:
+                column = columns[name] = [None] * self.size
+            column.append(value)
+        self.size += 1
+        if len(case) != len(columns):
+            for column in columns.values():
+                if len(column) < self.size:
+                    column.append(None)
+
+    def extend(self, other):
+        """Appends the cases of another :class:`CaseColumns`"""
+        if not other.size:
+            return
+        for name, column in other.columns.items():
+            if name not in self.columns:
+                self.columns[name] = [None] * self.size
+            self.columns[name].extend(column)
+        self.size += other.size
+        for column in self.columns.values():
+            if len(column) < self.size:
+                column.extend([None] * (self.size - len(column)))
+
+    def to_frame(self):
+        """Builds a pandas DataFrame with the :data:`CASE_DTYPES` dtypes"""
+        import pandas
+
+        data = dict()
+        for name, column in self.columns.items():
+            dtype = CASE_DTYPES.get(name)
+            if dtype == "float64":
+                try:
+                    data[name] = pandas.Series(column, dtype="float64")
+                except (TypeError, ValueError):  # Not a number (e.g. empty)
+                    data[name] = pandas.to_numeric(
+                        pandas.Series(column, dtype="object"), errors="coerce"
+                    )
+            elif dtype:
+                data[name] = pandas.Series(column, dtype=dtype)
+            else:
+                data[name] = pandas.Series(column, dtype="object")
+        return pandas.DataFrame(data)
+
+
+def xml_stream_to_case_columns(source, path, case_columns=None):
+    """Extracts the test cases of a suite snippet as columns.
+
+    Unlike :func:`xml_stream_to_json`, no JSON structure is built and the
+    annotations are only counted (never decoded). The ``path`` of a case is
+    the same as the one given by :func:`xml_to_json`.
+
+    :param source: a file name or a binary file object
+    :param path: Path leading to the XML content
+    :param case_columns: the :class:`CaseColumns` to fill (a new one if not set)
+    :return: the :class:`CaseColumns`
+    """
+    case_columns = CaseColumns() if case_columns is None else case_columns
+    paths = [path]  # Path of the open suites
+    case = None
+    annotation_count = 0
+    depth = 0  # Depth within the current case
+    for event, element in ElementTree.iterparse(source, events=("start", "end")):
+        tag = element.tag
+        if event == "start":
+            if case is not None:
+                depth += 1
+            elif tag == "test_case":
+                case = dict(element.attrib)
+                annotation_count = 0
+            elif tag == "test_suite":
+                name = element.attrib["name"]
+                paths.append(paths[-1] + "/" + name if paths[-1] else "/" + name)
+            continue
+        if case is not None and depth:
+            if depth == 1 and tag == "annotation":
+                annotation_count += 1
+            depth -= 1
+        elif tag == "test_case":
+            case["path"] = (paths[-1] or "/") if len(paths) > 1 else path
+            case["annotation_count"] = annotation_count
+            case_columns.append(case)
+            case = None
+        elif tag == "test_suite":
+            paths.pop()
+        element.clear()
+    return case_columns
+
+
+def details_to_case_columns(json_data, case_columns=None):
+    """Extracts the test cases of result details (e.g. as stored in the
+    trove) as columns.
+
+    :param json_data: the result details (or any structure holding
+                      ``cases`` lists)
+    :param case_columns: the :class:`CaseColumns` to fill (a new one if not set)
+    :return: the :class:`CaseColumns`
+    """
+    case_columns = CaseColumns() if case_columns is None else case_columns
+    stack = [json_data]
+    while stack:
+        json_object = stack.pop()
+        if isinstance(json_object, list):
+            stack.extend(reversed(json_object))
+            continue
+        if not isinstance(json_object, dict):
+            continue
+        for case in json_object.get("cases", ()):
+            if "name" not in case:  # A comment of the suite
+                continue
+            row = {
+                name: value
+                for name, value in case.items()
+                if not isinstance(value, (list, dict))
+            }
+            row["annotation_count"] = len(case.get("annotations", ()))
+            case_columns.append(row)
+        for children_type in ("details", "folders", "suites"):
+            children = json_object.get(children_type)
+            if children:
+                stack.append(children)
+    return case_columns
+
+
+_NO_MATCH, _PARTIAL_MATCH, _MATCH = range(3)
+
+
+def _match_path(segments, pattern):
+    """Matches path segments against pattern segments
+
+    :return: _MATCH if the path or one of its ancestors matches, _PARTIAL_MATCH
+             if some descendants of the path may match, _NO_MATCH otherwise
+    """
+    if not pattern:
+        return _MATCH
+    if pattern[0] == "**":
+        match = _match_path(segments, pattern[1:])
+        if match == _MATCH:
+            return match
+        if not segments:  # The descendants may match
+            return _PARTIAL_MATCH
+        return max(match, _match_path(segments[1:], pattern))
+    if not segments:
+        return _PARTIAL_MATCH
+    if fnmatch.fnmatchcase(segments[0], pattern[0]):
+        return _match_path(segments[1:], pattern[1:])
+    return _NO_MATCH
+
+
+class PathFilter:
+    """Selects the folders and suites of a result from their path.
+
+    The patterns are matched one path segment at a time with fnmatch (``*``
+    does not match ``/``) and ``**`` matches any number of segments. A folder
+    matching a pattern selects (or excludes) its whole content e.g.
+    ``/integration/network`` or ``/*/network``.
+
+    :param include: patterns of the paths to load (all if not set)
+    :param exclude: patterns of the paths not to load
+    :param max_depth: If set, the containers deeper than ``max_depth`` (1 for the
+                      top level containers) are not loaded
+    """
+
+    def __init__(self, include=None, exclude=None, max_depth=None):
+        # As given, to build the filter again (e.g. from result details)
+        self.options = dict(
+            include=list(include or ()),
+            exclude=list(exclude or ()),
+            max_depth=max_depth,
         )
-        children_type = "annotations"
-        if progress_callback:
-            progress_callback(object_type="cases", object_count=1)
-    elif xml_data.tag == "annotation":
-        path = (
-            f"{path}/{xml_data.attrib['name']}"
-            if path
-            else f"/{xml_data.attrib['name']}"
+        self.include = [self._split(pattern) for pattern in include or ()]
+        self.exclude = [self._split(pattern) for pattern in exclude or ()]
+        self.max_depth = max_depth
+
+    @staticmethod
+    def _split(path):
+        return tuple(segment for segment in path.split("/") if segment)
+
+    def select(self, path, folder=False):
+        """Tells whether a container shall be loaded
+
+        :param path: the path of the container
+        :param folder: If set, tells whether the folder shall be listed
+        :return: True if selected
+        """
+        segments = self._split(path)
+        if self.max_depth is not None:
+            # The content of a folder is one level deeper
+            if len(segments) + folder > self.max_depth:
+                return False
+        for pattern in self.exclude:
+            if _match_path(segments, pattern) == _MATCH:
+                return False
+        if not self.include:
+            return True
+        # A folder is listed if some of its content may be selected
+        minimum = _PARTIAL_MATCH if folder else _MATCH
+        return any(
+            _match_path(segments, pattern) >= minimum for pattern in self.include
         )
-        if isinstance(xml_data.text, str):
-            try:
-                json_data[element_type]["text"] = gzip.decompress(
-                    base64.b64decode(xml_data.text)
-                ).decode("utf-8")
-            except Exception as extract_error:
-                logger.error(
-                    f"Failed to decode annotation {path} error -> {extract_error}"
-                )
-        children_type = "comments"
-        if progress_callback:
-            progress_callback(object_type="annotations", object_count=1)
-    elif xml_data.tag == "comment":
-        # The text contains the actual comment
-        json_data[element_type]["text"] = xml_data.text
-        json_data[element_type]["path"] = path
-    else:
-        print("What is this")
-        if progress_callback:
-            progress_callback(object_type=xml_data.tag, object_count=1)
-
-    if children_type:
-        json_data[element_type][children_type] = []
-
-        for children in xml_data:
-            children_data = xml_to_json(
-                xml_data=children, path=path, progress_callback=progress_callback
-            )
-            for children_datum in children_data.values():
-                children_datum["path"] = path if path else "/"
-                json_data[element_type][children_type].append(children_datum)
-        if not json_data[element_type][children_type]:
-            json_data[element_type].pop(children_type)
-    else:
-        pass
-
-    return json_data
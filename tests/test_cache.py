@@ -0,0 +1,69 @@
+import os
+import time
+import testspace_colab.cache as cache_module
+
+
+def test_put_get(tmpdir):
+    cache = cache_module.DiskCache(tmpdir)
+    assert cache.get("org", "project", "space", 1, "/") is None
+    content = b"<test_suite>" + b"x" * 10000 + b"</test_suite>"
+    cache.put(content, "org", "project", "space", 1, "/")
+    assert cache.get("org", "project", "space", 1, "/") == content
+    assert cache.get("org", "project", "space", 2, "/") is None
+    # Stored compressed
+    assert 0 < cache.size < len(content)
+    assert cache_module.DiskCache(tmpdir).size == cache.size
+
+
+def test_lru_eviction(tmpdir):
+    cache = cache_module.DiskCache(tmpdir)
+    for index in range(3):
+        cache.put(os.urandom(1000), index)
+    entry_size = cache.size // 3
+    now = time.time()
+    for index in range(3):
+        entry = cache._entry_path(cache.make_key(index))
+        os.utime(entry, (now - 100 + index, now - 100 + index))
+    assert cache.get(0) is not None  # 0 is now the most recently used
+
+    cache.max_size = entry_size * 3
+    cache.put(os.urandom(1000), 3)  # evicts 1 (the least recently used)
+    assert cache.get(1) is None
+    assert cache.get(0) is not None
+    assert cache.get(2) is not None
+    assert cache.get(3) is not None
+    assert cache.size <= cache.max_size
+
+    cache.clear()
+    assert cache.size == 0
+    assert cache.get(0) is None
+
+
+def test_ttl_cache(mocker):
+    clock = mocker.patch("time.monotonic", return_value=1000.0)
+    cache = cache_module.TTLCache(ttl=10)
+    calls = []
+
+    def get_spaces(project=None):
+        calls.append(project)
+        return [dict(name="main")]
+
+    get_spaces = cache.memoize("get_spaces", get_spaces)
+    assert get_spaces(project="samples") == [dict(name="main")]
+    get_spaces(project="samples")[0]["name"] = "modified"
+    assert get_spaces(project="samples") == [dict(name="main")]
+    assert calls == ["samples"]
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    get_spaces(project="other")
+    assert calls == ["samples", "other"]
+
+    clock.return_value = 1011.0  # expired
+    get_spaces(project="samples")
+    assert calls == ["samples", "other", "samples"]
+
+    cache.invalidate("get_spaces")
+    get_spaces(project="samples")
+    assert len(calls) == 4
+    cache.invalidate()
+    assert cache.get(("get_spaces", (), (("project", "samples"),))) == (False, None)
@@ -3,14 +3,17 @@
 """Tests for `testspace_colab` package."""
 import os
 import json
+import datetime
 import urllib.parse
 import pathlib
 from unittest import mock
 import pkg_resources
 import logging
 import jsonpath_ng
+import click
 import pytest
 import testspace_colab.lib as lib_module
+import testspace_colab.trove as trove_module
 from click.testing import CliRunner
 from testspace_colab import cli
 
@@ -83,6 +86,20 @@ def test_click_client():
     assert result.exit_code == 0
 
 
+def test_parse_since():
+    utc = datetime.timezone.utc
+    assert cli.parse_since("2021-02-04T01:22:36.5Z") == datetime.datetime(
+        2021, 2, 4, 1, 22, 36, 500000, tzinfo=utc
+    )
+    assert cli.parse_since("2021-02-04T01:22:36.000+01:00") == datetime.datetime(
+        2021, 2, 4, 0, 22, 36, tzinfo=utc
+    )
+    assert cli.parse_since("2021-02-04").tzinfo is not None
+    assert cli.parse_since(None) is None
+    with pytest.raises(click.BadParameter):
+        cli.parse_since("2021-13-01")
+
+
 class TestGet:
     def test_get_tabular_format(self):
         runner = CliRunner()
@@ -184,6 +201,51 @@ class TestGet:
         # for name in testcase_names:
         #     assert name.startswith('test_')
 
+    def test_get_filter_options(self):
+        runner = CliRunner()
+        result = runner.invoke(cli.get, ["projects", "--max-depth", "2"])
+        assert result.exit_code == 2
+        assert "not supported by projects" in result.output
+
+    def test_get_ndjson(self, tmpdir):
+        runner = CliRunner()
+        tmpfile = tmpdir.join("output.jsonl")
+        result = runner.invoke(
+            cli.get, ["result_cases", "test_data", "-f", "ndjson", "-o", str(tmpfile)]
+        )
+        assert result.exit_code == 0
+        with open(str(tmpfile)) as file_handle:
+            cases = [json.loads(line) for line in file_handle]
+        assert len(cases) == 10
+        assert all("path" in case for case in cases)
+
+        # The ndjson extensions are kept for the result files
+        tmpfile = tmpdir.join("output.ndjson")
+        result = runner.invoke(
+            cli.get, ["result_cases", "test_data", "-f", "ndjson", "-o", str(tmpfile)]
+        )
+        assert result.exit_code == 2
+        assert "use e.g. the .jsonl extension" in result.output
+
+    def test_get_ndjson_result(self, tmpdir):
+        runner = CliRunner()
+        for args in (["-f", "ndjson"], []):
+            tmpfile = tmpdir.join("output.ndjson.gz")
+            result = runner.invoke(
+                cli.get, ["result_details", "test_data", "-o", str(tmpfile)] + args
+            )
+            assert result.exit_code == 0
+            assert "saving response as ndjson.gz" in result.output
+            assert len(trove_module.read_result(str(tmpfile))["details"]) == 8
+
+    def test_get_list_ndjson(self, tmpdir):
+        runner = CliRunner()
+        tmpfile = tmpdir.join("projects.ndjson")
+        result = runner.invoke(cli.get, ["projects", "-o", str(tmpfile)])
+        assert result.exit_code == 2
+        assert "use e.g. the .jsonl extension" in result.output
+        assert tmpfile.check() is False
+
 
 class TestCrawl:
     def test_crawl_all(self, tmpdir, netloc):
@@ -227,6 +289,76 @@ class TestCrawl:
         assert result.exit_code == 0
         assert "test_data.json already exists - skipping" in result.output
 
+    def test_crawl_existing_trove(self, tmpdir, netloc):
+        args = ["-p", "samples", "-s", "main", "-r", "test_data", "-o", str(tmpdir)]
+        runner = CliRunner()
+        result = runner.invoke(cli.crawl, args)
+        assert result.exit_code == 0
+        trove = trove_module.Trove(str(tmpdir))
+        result_file = f"{netloc}/samples/main/test_data.json"
+        assert [row["file"] for row in trove.catalog.query()] == [result_file]
+
+        # The results crawled before the catalog existed are indexed
+        trove.catalog.path.unlink()
+        result = runner.invoke(cli.crawl, args)
+        assert result.exit_code == 0
+        assert "already exists - skipping" in result.output
+        assert [row["file"] for row in trove.catalog.query()] == [result_file]
+
+        # As are the skipped results missing from the catalog
+        trove.catalog.remove([result_file])
+        result = runner.invoke(cli.crawl, args)
+        assert result.exit_code == 0
+        assert [r["name"] for r in trove.load()] == ["test_data"]
+
+    def test_crawl_jobs(self, tmpdir, netloc):
+        runner = CliRunner()
+        result = runner.invoke(
+            cli.crawl, ["-p", "samples", "-s", "main", "-o", str(tmpdir), "-j", "4"]
+        )
+        assert result.exit_code == 0
+        space_dir = pathlib.Path(str(tmpdir)) / netloc / "samples" / "main"
+        api = lib_module.API()
+        assert sorted(path.name for path in space_dir.iterdir()) == sorted(
+            f"{result_info['name']}.json"
+            for result_info in api.get_results(project="samples", space="main")
+        )
+
+    def test_crawl_incremental(self, tmpdir, netloc):
+        args = ["-p", "samples", "-s", "main", "-o", str(tmpdir), "--incremental"]
+        runner = CliRunner()
+        result = runner.invoke(cli.crawl, args)
+        assert result.exit_code == 0
+        org_dir = pathlib.Path(str(tmpdir)) / netloc
+        with open(org_dir / ".manifest.json") as file_handle:
+            manifest = json.load(file_handle)
+        assert "samples/main/test_data" in manifest["results"]
+
+        result = runner.invoke(cli.crawl, args)
+        assert result.exit_code == 0
+        assert "Parsed 0 resuls" in result.output
+
+    def test_crawl_stream(self, tmpdir, netloc):
+        args = ["-p", "samples", "-s", "main", "-r", "test_data", "-o", str(tmpdir)]
+        runner = CliRunner()
+        result = runner.invoke(cli.crawl, args + ["--stream"])
+        assert result.exit_code == 0
+        space_dir = pathlib.Path(str(tmpdir)) / netloc / "samples" / "main"
+        response = trove_module.read_result(space_dir / "test_data.ndjson.gz")
+        assert response["details"]
+
+        result = runner.invoke(cli.crawl, args + ["--stream", "-f", "json"])
+        assert result.exit_code != 0
+        assert "--stream requires an ndjson --format" in result.output
+
+    def test_crawl_plan(self):
+        runner = CliRunner()
+        result = runner.invoke(
+            cli.crawl, ["-p", "samples", "-s", "main", "-r", "test_data", "--plan"]
+        )
+        assert result.exit_code == 0
+        assert "plan: 1 results" in result.output
+
     def test_crawl_no_output(self):
         runner = CliRunner()
         result = runner.invoke(
@@ -235,6 +367,42 @@ class TestCrawl:
         assert result.exit_code == 0
 
 
+class TestTrove:
+    def test_reindex(self, tmpdir, netloc):
+        runner = CliRunner()
+        result = runner.invoke(
+            cli.crawl,
+            ["-p", "samples", "-s", "main", "-r", "test_data", "-o", str(tmpdir)],
+        )
+        assert result.exit_code == 0
+        trove = trove_module.Trove(tmpdir)
+        assert [row["org"] for row in trove.catalog.query(result="test_data")] == [
+            netloc
+        ]
+
+        trove.catalog.path.unlink()
+        result = runner.invoke(cli.trove, ["-t", str(tmpdir), "reindex"])
+        assert result.exit_code == 0
+        assert "1 results indexed" in result.output
+        assert len(list(trove.load(result="test_data"))) == 1
+
+    def test_export(self, tmpdir, netloc):
+        pytest.importorskip("pyarrow")
+        runner = CliRunner()
+        trove_dir = str(tmpdir / "trove")
+        result = runner.invoke(
+            cli.crawl,
+            ["-p", "samples", "-s", "main", "-r", "test_data", "-o", trove_dir],
+        )
+        assert result.exit_code == 0
+        dest = str(tmpdir / "dataset")
+        result = runner.invoke(cli.trove, ["-t", trove_dir, "export", dest])
+        assert result.exit_code == 0
+        assert "1 results exported" in result.output
+        table = trove_module.open_dataset(dest).to_table()
+        assert set(table.to_pydict()["result"]) == {"test_data"}
+
+
 @pytest.mark.skipif(
     "CODESPACES" in os.environ, reason="docker not supported in codespace yet"
 )
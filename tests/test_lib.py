@@ -0,0 +1,792 @@
+import io
+import gzip
+import json
+import time
+import asyncio
+import base64
+import random
+import threading
+import http.server
+import socketserver
+import urllib.parse
+import concurrent.futures
+import pytest
+import jsonpath_ng
+import testspace_colab.lib as lib_module
+
+
+def _snippet(suite_name, case_count):
+    """Builds a suite xml snippet as served by testspace"""
+    annotation = base64.b64encode(gzip.compress(b"some log")).decode("ascii")
+    cases = "".join(
+        f'<test_case name="case_{index}" status="passed" duration="0.{index}">'
+        f'<annotation name="log" level="info" mime_type="text/plain">{annotation}</annotation>'
+        f"</test_case>"
+        for index in range(case_count)
+    )
+    return f'<test_suite name="{suite_name}">{cases}</test_suite>'.encode("utf-8")
+
+
+class FakeResponse:
+    def __init__(self, content, status_code=200):
+        self.content = content
+        self.status_code = status_code
+        self.raw = io.BytesIO(content)
+
+    def close(self):
+        pass
+
+
+class FakeClient:
+    """Stands in for testspace.Testspace with a result made of nested folders.
+
+    Each request sleeps a random amount of time so that concurrent requests
+    complete out of order.
+    """
+
+    def __init__(self, depth=3, width=3, delay=0.005, url="https://fake.testspace.com"):
+        self.url = url
+        self.delay = delay
+        self.failures = 0  # number of requests the server rejects
+        self.retry_after = None  # If set, the requests are rejected as throttled
+        self.lock = threading.Lock()
+        self.requests = []
+        self.contents = dict()
+        self.snippets = dict()
+        self._build(None, depth, width)
+
+    def _build(self, path, depth, width):
+        listing = []
+        for index in range(width):
+            name = f"suite_{index}"
+            suite_path = f"{path or ''}/{name}"
+            url = f"{self.url}/snippets{suite_path}"
+            self.snippets[url] = _snippet(name, index + 1)
+            listing.append(
+                dict(
+                    id=len(self.snippets),
+                    name=name,
+                    type="suite",
+                    path=suite_path,
+                    case_counts=[index + 1, 0, 0, 0],
+                    download_url=url,
+                    updated_at="2021-02-04T01:22:36.000+01:00",
+                )
+            )
+            if depth > 1:
+                folder_path = f"{path or ''}/folder_{index}"
+                listing.append(
+                    dict(
+                        name=f"folder_{index}",
+                        type="folder",
+                        path=folder_path,
+                        updated_at="2021-02-04T01:22:36.000+01:00",
+                    )
+                )
+                self._build(folder_path, depth - 1, width)
+        self.contents[path] = listing
+
+    def _wait(self, request):
+        with self.lock:
+            self.requests.append(request)
+        time.sleep(random.uniform(0, self.delay))
+
+    def get_projects(self):
+        self._wait(("get_projects",))
+        return [dict(id=1, name="p")]
+
+    def get_results(self, project=None, space=None):
+        self._wait(("get_results",))
+        return [dict(id=1, name="a_result")]
+
+    def get_result(self, result, project=None, space=None):
+        self._wait(("get_result", result))
+        return dict(
+            id=1,
+            name=result,
+            session_suite_counts=[len(self.snippets)],
+            session_case_counts=[1],
+            annotation_counts=[1],
+        )
+
+    def get_result_contents(self, result, project=None, space=None, contents_path=None):
+        self._wait(("get_result_contents", contents_path))
+        return [dict(container) for container in self.contents[contents_path]]
+
+    def get_request(self, url, stream=False):
+        self._wait(("get_request", url))
+        return FakeResponse(self.snippets[url])
+
+
+@pytest.fixture()
+def api():
+    api = lib_module.API(url="https://fake.testspace.com", project="p", space="s")
+    api.client = FakeClient()
+    return api
+
+
+def _walk(details):
+    """Returns the paths of all the containers in order"""
+    paths = []
+    for container in details:
+        paths.append(container["path"])
+        paths.extend(_walk(container.get("folders", [])))
+    return paths
+
+
+def test_result_details_order(api):
+    def expected(path):
+        paths = []
+        for container in api.client.contents[path]:
+            paths.append(container["path"])
+            if container["type"] == "folder":
+                paths.extend(expected(container["path"]))
+        return paths
+
+    serial = api.get_result_details("a_result", max_workers=1)
+    concurrent = api.get_result_details("a_result", max_workers=16)
+    assert serial == concurrent
+    assert _walk(concurrent["details"]) == expected(None)
+
+
+def test_result_details_parse_workers(api):
+    def totals(progress):
+        counts = dict()
+        for kwargs in progress:
+            counts[kwargs["object_type"]] = (
+                counts.get(kwargs["object_type"], 0) + kwargs["object_count"]
+            )
+        return counts
+
+    expected = api.get_result_details("a_result")
+    progress = [[], []]
+    api._load_results(
+        result_id=1,
+        project=None,
+        space=None,
+        progress_callback=lambda **kwargs: progress[0].append(kwargs),
+    )
+    with api:
+        assert api.get_result_details("a_result", parse_workers=2) == expected
+        details = api._load_results(
+            result_id=1,
+            project=None,
+            space=None,
+            progress_callback=lambda **kwargs: progress[1].append(kwargs),
+            parse_executor=api._get_parse_executor(2),
+        )
+    assert details == expected["details"]
+    assert totals(progress[0]) == totals(progress[1])
+    assert api._parse_executor is None
+
+
+def test_parse_executor(api):
+    with api:
+        executor = api._get_parse_executor(2)
+        if hasattr(executor, "_mp_context"):
+            assert executor._mp_context.get_start_method() == "spawn"
+        else:  # Forked from the calling thread, not from a download thread
+            assert len(executor._processes) == 2
+        assert api._get_parse_executor(2) is executor
+
+
+def test_result_details_parse_backlog(api):
+    """The snippets being converted count as in flight"""
+    lock = threading.Lock()
+    in_flight = [0, 0]  # downloaded and not converted, maximum
+    get_request = api.client.get_request
+
+    def counted_get_request(url, stream=False):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+        return get_request(url, stream=stream)
+
+    class SlowParser(concurrent.futures.ThreadPoolExecutor):
+        def submit(self, function, *args):
+            def convert():
+                time.sleep(0.01)
+                try:
+                    return function(*args)
+                finally:
+                    with lock:
+                        in_flight[0] -= 1
+
+            return super().submit(convert)
+
+    api.client.get_request = counted_get_request
+    expected = api.get_result_details("a_result")["details"]
+    in_flight[:] = [0, 0]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        with SlowParser(max_workers=1) as parser:
+            details = api._load_results(
+                result_id=1,
+                project=None,
+                space=None,
+                executor=executor,
+                parse_executor=parser,
+            )
+    assert details == expected
+    assert in_flight == [0, 4]
+
+
+def test_result_details_content(api):
+    response = api.get_result_details("a_result")
+    container = response["details"][0]
+    assert container["path"] == "/suite_0"
+    assert len(container["suites"]) == 1
+    suite = container["suites"][0]
+    assert suite["name"] == "suite_0"
+    assert len(suite["cases"]) == 1
+    case = suite["cases"][0]
+    assert case["name"] == "case_0"
+    assert case["path"] == "/suite_0"
+    assert case["annotations"][0]["text"] == "some log"
+    folder = response["details"][1]
+    assert [c["path"] for c in folder["folders"]][:2] == [
+        "/folder_0/suite_0",
+        "/folder_0/folder_0",
+    ]
+    suite = folder["folders"][0]["suites"][0]
+    assert suite["cases"][0]["path"] == "/folder_0/suite_0"
+
+
+def test_result_details_cache(api, tmpdir):
+    api.cache = lib_module.cache_module.DiskCache(tmpdir)
+    response = api.get_result_details("a_result")
+    request_count = len(api.client.requests)
+    assert api.get_result_details("a_result") == response
+    # Only get_result went to the server
+    assert len(api.client.requests) == request_count + 1
+
+    api.refresh_cache = True
+    assert api.get_result_details("a_result") == response
+    assert len(api.client.requests) == request_count * 2 + 1
+
+
+def test_metadata_memoization(api):
+    assert api.get_projects() == [dict(id=1, name="p")]
+    assert api.get_projects() == [dict(id=1, name="p")]
+    assert api.client.requests == [("get_projects",)]
+    assert api.metadata_cache.hits == 1
+    api.invalidate()
+    api.get_projects()
+    assert len(api.client.requests) == 2
+
+
+def test_result_details_load_error(api):
+    def failing_contents(result, project=None, space=None, contents_path=None):
+        if contents_path == "/folder_1":
+            raise IOError("connection reset")
+        return [dict(container) for container in api.client.contents[contents_path]]
+
+    api.client.get_result_contents = failing_contents
+    response = api.get_result_details("a_result")
+    assert response["details"][3]["folders"] == [dict(load_error="connection reset")]
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """Same as http.server.ThreadingHTTPServer, which requires Python 3.7"""
+
+    daemon_threads = True
+
+
+@pytest.fixture()
+def testspace_server():
+    """Serves a FakeClient result over HTTP the way the testspace API does"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), None)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    fake = FakeClient(url=url)
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if fake.failures:
+                fake.failures -= 1
+                if fake.retry_after is None:
+                    self.send_error(503)
+                else:
+                    self.send_response(429)
+                    self.send_header("Retry-After", fake.retry_after)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                return
+            parts = urllib.parse.urlparse(self.path)
+            query = urllib.parse.parse_qs(parts.query)
+            segments = [urllib.parse.unquote(s) for s in parts.path.split("/")]
+            if parts.path.startswith("/snippets"):
+                content = fake.get_request(url + parts.path).content
+            elif segments[-1] == "contents":
+                contents_path = query["path"][0] if "path" in query else None
+                listing = fake.get_result_contents(
+                    segments[-2], contents_path=contents_path
+                )
+                content = json.dumps(listing).encode()
+            elif segments[-2] == "results":
+                content = json.dumps(fake.get_result(segments[-1])).encode()
+            elif segments[-1] == "results":
+                content = json.dumps(fake.get_results()).encode()
+            elif segments[-1] == "projects":
+                content = json.dumps(fake.get_projects()).encode()
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, *args):
+            pass
+
+    server.RequestHandlerClass = Handler
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield fake
+    server.shutdown()
+    server.server_close()
+
+
+def test_async_result_details(testspace_server):
+    pytest.importorskip("aiohttp")
+    fake = testspace_server
+
+    async def load():
+        async with lib_module.AsyncAPI(
+            url=fake.url, project="p", space="s", max_requests=4
+        ) as client:
+            return await client.get_result_details("a_result")
+
+    # asyncio.run requires Python 3.7
+    loop = asyncio.new_event_loop()
+    try:
+        response = loop.run_until_complete(load())
+    finally:
+        loop.close()
+
+    api = lib_module.API(url=fake.url, project="p", space="s")
+    api.client = fake
+    assert response == api.get_result_details("a_result")
+
+
+def test_get_request_retries(testspace_server):
+    """The first two requests are dropped by the server"""
+    fake = testspace_server
+    fake.failures = 2
+    client = lib_module.PooledTestspace(
+        token="token", url=fake.url, retries=2, backoff_factor=0.01
+    )
+    url = fake.url + "/snippets/suite_0"
+    response = client.get_request(url)
+    assert response.status_code == 200
+    assert response.content == fake.snippets[url]
+    assert fake.failures == 0
+
+    fake.failures = 3
+    assert client.get_request(url).status_code == 503
+
+
+def test_get_request_throttled(testspace_server):
+    """The server asks to wait before retrying"""
+    fake = testspace_server
+    fake.failures = 1
+    fake.retry_after = "0.2"
+    metrics = lib_module.metrics_module.Metrics()
+    limiter = lib_module.ratelimit_module.AdaptiveLimiter(max_concurrency=4)
+    client = lib_module.PooledTestspace(
+        token="token",
+        url=fake.url,
+        retries=2,
+        backoff_factor=0.01,
+        metrics=metrics,
+        limiter=limiter,
+    )
+    start = time.perf_counter()
+    assert client.get_request(fake.url + "/snippets/suite_0").status_code == 200
+    assert time.perf_counter() - start >= 0.2
+    assert limiter.throttled == 1
+    assert limiter.window < 4  # Halved then increased by the retry
+    assert limiter.in_flight == 0
+    assert metrics.stats()["get_request"]["throttled"] == 1
+
+
+def test_client_endpoints(testspace_server):
+    """The endpoints of testspace.Testspace go through the pooled session"""
+    fake = testspace_server
+    api = lib_module.API(
+        token="token",
+        url=fake.url,
+        project="p",
+        space="s",
+        retries=2,
+        backoff_factor=0.01,
+        metadata_ttl=0,
+    )
+    assert isinstance(api.client, lib_module.PooledTestspace)
+    fake.failures = 1
+    assert api.get_projects() == [dict(id=1, name="p")]
+    assert api.get_results() == [dict(id=1, name="a_result")]
+    assert api.get_result_contents("a_result") == fake.contents[None]
+    assert (
+        api.get_result_contents("a_result", contents_path="/folder_1")
+        == fake.contents["/folder_1"]
+    )
+    stats = api.stats()
+    assert stats["get_projects"]["requests"] == 1
+    assert stats["get_projects"]["retries"] == 1
+    assert stats["get_result_contents"]["requests"] == 2
+    assert api.limiter.in_flight == 0
+
+    expected = lib_module.API(url=fake.url, project="p", space="s")
+    expected.client = FakeClient(url=fake.url)
+    assert api.get_result_details("a_result") == expected.get_result_details("a_result")
+
+
+def test_normalize_url():
+    client = lib_module.PooledTestspace(token="token", url="org.testspace.com/")
+    assert client._api_url == "https://org.testspace.com/api/"
+    client = lib_module.PooledTestspace(token="token", url="http://127.0.0.1:8080")
+    assert client._api_url == "http://127.0.0.1:8080/api/"
+
+
+def test_connection_pool():
+    session = lib_module.ConnectionPool.session()
+    assert lib_module.ConnectionPool.session() is session
+    settings = dict(lib_module.ConnectionPool.settings)
+    try:
+        lib_module.ConnectionPool.configure(pool_maxsize=2)
+        assert lib_module.ConnectionPool.session() is not session
+        adapter = lib_module.ConnectionPool.session().get_adapter("https://foo")
+        assert adapter._pool_maxsize == 2
+        with pytest.raises(ValueError):
+            lib_module.ConnectionPool.configure(foo=2)
+    finally:
+        lib_module.ConnectionPool.configure(**settings)
+
+
+def test_result_cases_only(api):
+    expected = api.get_result_details("a_result")["details"]
+    details = api._load_results(result_id=1, project=None, space=None, cases_only=True)
+    container = details[1]["folders"][0]
+    assert "case_columns" not in details[1]
+    assert container["case_columns"].columns == (
+        lib_module.utils_module.details_to_case_columns(
+            expected[1]["folders"][0]["suites"]
+        ).columns
+    )
+
+
+def test_result_cases_frame(api):
+    pandas = pytest.importorskip("pandas")
+    expected = pandas.DataFrame(
+        [
+            match.value
+            for match in jsonpath_ng.parse("$..[cases][:]").find(
+                api.get_result_details("a_result")
+            )
+        ]
+    )
+    frame = api.get_result_cases_frame("a_result")
+    assert list(frame["name"]) == list(expected["name"])
+    assert list(frame["duration"]) == [float(d) for d in expected["duration"]]
+    assert list(frame["annotation_count"]) == [1] * len(expected)
+
+
+def test_iter_result_cases(api):
+    def key(case):
+        return case["path"], case["name"]
+
+    details = api.get_result_details("a_result")
+    expected = [
+        match.value for match in jsonpath_ng.parse("$..[cases][:]").find(details)
+    ]
+    cases = list(api.iter_result_cases("a_result", max_workers=4))
+    assert sorted(cases, key=key) == sorted(expected, key=key)
+    suites = list(api.iter_result_suites("a_result"))
+    assert len(suites) == len(api.client.snippets)
+    assert {suite["path"] for suite in suites} == {
+        container["path"].rsplit("/", 1)[0] or "/"
+        for listing in api.client.contents.values()
+        for container in listing
+        if container["type"] == "suite"
+    }
+
+
+def test_iter_result_cases_close(api):
+    """The suites are downloaded as they are consumed"""
+    cases = api.iter_result_cases("a_result", max_workers=1)
+    next(cases)
+    cases.close()
+    snippet_requests = [r for r in api.client.requests if r[0] == "get_request"]
+    assert len(snippet_requests) < len(api.client.snippets)
+
+
+def test_iter_result_cases_options(api):
+    def key(case):
+        return case["path"], case["name"]
+
+    for options in (
+        dict(include=["/folder_1/folder_2"]),
+        dict(exclude="/folder_0,**/suite_1", max_depth=2),
+    ):
+        details = api.get_result_details("a_result", **options)
+        expected = [
+            match.value for match in jsonpath_ng.parse("$..[cases][:]").find(details)
+        ]
+        cases = list(api.iter_result_cases("a_result", **options))
+        assert cases and sorted(cases, key=key) == sorted(expected, key=key)
+
+    with api:
+        cases = list(api.iter_result_cases("a_result", parse_workers=2))
+    assert len(cases) == len(list(api.iter_result_cases("a_result")))
+
+    for listing in api.client.contents.values():
+        for container in listing:
+            container.setdefault("case_counts", [3, 0, 0, 0])
+    api.client.contents[None][3]["case_counts"] = [8, 1, 0, 0]  # /folder_1
+    api.client.contents["/folder_1"][2]["case_counts"] = [1, 1, 0, 0]
+    suites = list(api.iter_result_suites("a_result", failures_only=True))
+    assert [suite["path"] for suite in suites] == ["/folder_1"]
+
+
+def test_refresh_result_details(api):
+    previous = api.get_result_details("a_result")
+    del api.client.requests[:]
+    unchanged = api.refresh_result_details(previous)
+    assert unchanged["details"] == previous["details"]
+    assert [r[0] for r in api.client.requests] == ["get_result", "get_result_contents"]
+
+    # A session updates a suite of /folder_1 and adds one to /folder_1/folder_0
+    updated_at = "2021-02-05T01:22:36.000+01:00"
+    url = f"{api.client.url}/snippets/folder_1/suite_0"
+    api.client.snippets[url] = _snippet("suite_0", 5)
+    folder_1 = api.client.contents[None][3]
+    folder_1["updated_at"] = updated_at
+    suite = api.client.contents["/folder_1"][0]
+    suite.update(case_counts=[5, 0, 0, 0], updated_at=updated_at)
+    api.client.contents["/folder_1"][1]["updated_at"] = updated_at
+    new_url = f"{api.client.url}/snippets/folder_1/folder_0/suite_9"
+    api.client.snippets[new_url] = _snippet("suite_9", 2)
+    api.client.contents["/folder_1/folder_0"].append(
+        dict(
+            id=100,
+            name="suite_9",
+            type="suite",
+            path="/folder_1/folder_0/suite_9",
+            case_counts=[2, 0, 0, 0],
+            download_url=new_url,
+            updated_at=updated_at,
+        )
+    )
+
+    del api.client.requests[:]
+    refreshed = api.refresh_result_details(previous)
+    assert sorted(r[1] for r in api.client.requests if r[0] == "get_request") == [
+        new_url,
+        url,
+    ]
+    assert sorted(
+        r[1] or "" for r in api.client.requests if r[0] == "get_result_contents"
+    ) == ["", "/folder_1", "/folder_1/folder_0"]
+    assert refreshed["details"] == api.get_result_details("a_result")["details"]
+    assert refreshed["details"] != previous["details"]
+
+
+def test_refresh_result_details_filters(api):
+    previous = api.get_result_details("a_result", include=["/folder_1/folder_2"])
+    assert previous["path_filter"]["include"] == ["/folder_1/folder_2"]
+    refreshed = api.refresh_result_details(previous)
+    assert _walk(refreshed["details"]) == _walk(previous["details"])
+    assert refreshed["path_filter"] == previous["path_filter"]
+    refreshed = api.refresh_result_details(previous, max_depth=1)
+    assert _walk(refreshed["details"]) == [
+        "/suite_0",
+        "/suite_1",
+        "/suite_2",
+    ]
+
+    for listing in api.client.contents.values():
+        for container in listing:
+            container.setdefault("case_counts", [3, 0, 0, 0])
+    api.client.contents[None][3]["case_counts"] = [8, 1, 0, 0]  # /folder_1
+    api.client.contents["/folder_1"][2]["case_counts"] = [1, 1, 0, 0]
+    previous = api.get_result_details("a_result", failures_only=True)
+    refreshed = api.refresh_result_details(previous)
+    assert refreshed["failures_only"] is True
+    assert _walk(refreshed["details"]) == ["/folder_1", "/folder_1/suite_1"]
+    refreshed = api.refresh_result_details(previous, failures_only=False)
+    assert len(_walk(refreshed["details"])) > 2
+
+
+def test_result_details_path_filter(api):
+    def requested():
+        paths = [r[1] for r in api.client.requests if r[0] != "get_result"]
+        del api.client.requests[:]
+        return sorted(
+            (path or "").replace(api.client.url + "/snippets", "") for path in paths
+        )
+
+    response = api.get_result_details("a_result", include=["/folder_1/folder_2"])
+    assert _walk(response["details"]) == [
+        "/folder_1",
+        "/folder_1/folder_2",
+        "/folder_1/folder_2/suite_0",
+        "/folder_1/folder_2/suite_1",
+        "/folder_1/folder_2/suite_2",
+    ]
+    assert requested() == [
+        "",
+        "/folder_1",
+        "/folder_1/folder_2",
+        "/folder_1/folder_2/suite_0",
+        "/folder_1/folder_2/suite_1",
+        "/folder_1/folder_2/suite_2",
+    ]
+
+    response = api.get_result_details(
+        "a_result", exclude="/folder_0,/folder_1,**/suite_1", max_depth=2
+    )
+    assert _walk(response["details"]) == [
+        "/suite_0",
+        "/suite_2",
+        "/folder_2",
+        "/folder_2/suite_0",
+        "/folder_2/suite_2",
+    ]
+    assert requested() == [
+        "",
+        "/folder_2",
+        "/folder_2/suite_0",
+        "/folder_2/suite_2",
+        "/suite_0",
+        "/suite_2",
+    ]
+
+
+def test_result_details_failures_only(api):
+    for listing in api.client.contents.values():
+        for container in listing:
+            container.setdefault("case_counts", [3, 0, 0, 0])
+    api.client.contents[None][3]["case_counts"] = [8, 1, 0, 0]  # /folder_1
+    api.client.contents["/folder_1"][2]["case_counts"] = [1, 1, 0, 0]
+    api.client.contents["/folder_1"][4]["case_counts"] = [2, 0, 1, 0]  # N/A
+
+    del api.client.requests[:]
+    response = api.get_result_details("a_result", failures_only=True)
+    assert response["failures_only"] is True
+    assert _walk(response["details"]) == ["/folder_1", "/folder_1/suite_1"]
+    assert [r[0] for r in api.client.requests] == [
+        "get_result",
+        "get_result_contents",
+        "get_result_contents",
+        "get_request",
+    ]
+
+    api.client.get_result = lambda result, **kwargs: dict(
+        id=1, name=result, case_counts=[10, 0, 2, 0]
+    )
+    response = api.get_result_details("a_result", failures_only=True)
+    assert response["details"] == []
+
+
+def test_request_metrics(testspace_server):
+    fake = testspace_server
+    fake.failures = 1
+    metrics = lib_module.metrics_module.Metrics()
+    client = lib_module.PooledTestspace(
+        token="token", url=fake.url, retries=2, backoff_factor=0.01, metrics=metrics
+    )
+    url = fake.url + "/snippets/suite_0"
+    with lib_module.metrics_module.endpoint("get_snippet"):
+        client.get_request(url)
+        with lib_module.ResponseStream(
+            client.get_request(url, stream=True), metrics, "get_snippet"
+        ) as stream:
+            stream.read()
+    stats = metrics.stats()["get_snippet"]
+    assert stats["requests"] == 2
+    assert stats["retries"] == 1
+    assert stats["bytes"] == 2 * len(fake.snippets[url])
+
+
+def test_result_details_stats(api):
+    api.get_result_details("a_result")
+    stats = api.stats(reset=True)
+    assert stats["parse"]["requests"] == len(api.client.snippets)
+    assert stats["get_snippet"]["bytes"] == sum(map(len, api.client.snippets.values()))
+    assert api.stats() == {}
+
+
+def test_results_details(api):
+    expected = api.get_result_details("a_result")["details"]
+    ids = dict(a_result=1, b_result=2, c_result=3)
+    api.client.get_result = lambda result, **kwargs: dict(
+        id=ids.get(result, result), name=result, case_counts=[1, 0, 0, 0]
+    )
+
+    del api.client.requests[:]
+    responses = api.get_results_details(
+        ["a_result", "b_result", dict(id=1), 3], max_workers=4
+    )
+    assert [response["id"] for response in responses] == [1, 2, 1, 3]
+    assert responses[0] is responses[2]
+    for response in responses:
+        assert response["details"] == expected
+    # Each result is listed once
+    roots = [r for r in api.client.requests if r == ("get_result_contents", None)]
+    assert len(roots) == 3
+
+    responses = api.get_results_details([1, 2, 2], as_completed=True)
+    assert sorted(response["id"] for response in responses) == [1, 2]
+
+    api.client.get_result = lambda result, **kwargs: dict(
+        id=result, name=str(result), case_counts=[1, result - 1, 0, 0]
+    )
+    responses = api.get_results_details([1, 2], failures_only=True)
+    assert [response["details"] for response in responses][0] == []
+    assert all(response["failures_only"] for response in responses)
+
+
+def test_estimate_result_cost():
+    cost = lib_module.estimate_result_cost(
+        dict(
+            session_suite_counts=[8, 8],
+            session_case_counts=[100, 0, 0, 0],
+            annotation_counts=[1, 1, None],
+        )
+    )
+    assert cost["suites"] == 16
+    assert cost["cases"] == 100
+    assert cost["annotations"] == 2
+    assert cost["requests"] == 2 + 16 + 2
+    assert cost["bytes"] == 16 * 600 + 100 * 300 + 2 * 1200
+    assert lib_module.estimate_result_cost(dict())["bytes"] == 0
+
+
+def test_result_details_sink(api, tmpdir):
+    import testspace_colab.trove as trove_module
+
+    expected = api.get_result_details("a_result", max_workers=4)
+    path = tmpdir / "result.ndjson"
+    with trove_module.ResultWriter(path) as writer:
+        response = api.get_result_details("a_result", max_workers=4, sink=writer)
+    assert response["details"] == []
+    assert trove_module.read_result(path) == json.loads(
+        trove_module.utils_module.JSONEncoder().encode(expected)
+    )
+
+    with pytest.raises(ValueError):
+        with trove_module.ResultWriter(tmpdir / "result.json") as writer:
+            api.get_result_details("a_result", sink=writer)
+    assert not tmpdir.join("result.json").exists()
+
+
+def test_parse_snippet_size(mocker):
+    content = _snippet("suite", 20)
+    expected = lib_module.parse_snippet(content, path="/folder")
+    stream_to_json = mocker.spy(lib_module.utils_module, "xml_stream_to_json")
+    assert lib_module.parse_snippet(io.BytesIO(content), path="/folder") == expected
+    assert stream_to_json.call_count == 0
+
+    mocker.patch.object(lib_module, "STREAM_SNIPPET_SIZE", 100)
+    assert lib_module.parse_snippet(io.BytesIO(content), path="/folder") == expected
+    assert stream_to_json.call_count == 1
@@ -0,0 +1,56 @@
+import threading
+import testspace_colab.metrics as metrics_module
+
+
+def test_histogram():
+    histogram = metrics_module.Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.05, 0.5, 2.0):
+        histogram.add(value)
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.percentile(0.5) == 0.1
+    assert histogram.percentile(0.75) == 1.0
+    assert histogram.percentile(1.0) == 2.0
+    assert histogram.to_dict()["mean"] == 2.6 / 4
+
+
+def test_endpoint_label():
+    labels = []
+    with metrics_module.endpoint("get_result"):
+        labels.append(metrics_module.current_endpoint())
+        thread = threading.Thread(
+            target=lambda: labels.append(metrics_module.current_endpoint())
+        )
+        thread.start()
+        thread.join()
+    labels.append(metrics_module.current_endpoint())
+    assert labels == ["get_result", "get_request", "get_request"]
+
+
+def test_thread_endpoint():
+    # The label of the threads without contextvars (Python 3.6)
+    label = metrics_module._ThreadEndpoint()
+    token = label.set("get_result")
+    labels = [label.get()]
+    thread = threading.Thread(target=lambda: labels.append(label.get()))
+    thread.start()
+    thread.join()
+    label.reset(token)
+    assert labels + [label.get()] == ["get_result", "get_request", "get_request"]
+
+
+def test_timer(mocker):
+    metrics = metrics_module.Metrics()
+    clock = mocker.patch("time.perf_counter", side_effect=[1.0, 5.0])
+    with metrics.timer():
+        metrics.add_io_time(3.0)  # e.g. reading the snippet
+    assert clock.call_count == 2
+    stats = metrics.stats()[metrics_module.PARSE]
+    assert stats["requests"] == 1
+    assert stats["latency"]["total"] == 1.0
+
+    metrics.record("get_result", 0.2, size=10, error=True)
+    metrics.retry("get_result")
+    assert metrics.summary()[0]["endpoint"] == "get_result"
+    assert metrics.summary()[0]["errors"] == 1
+    metrics.reset()
+    assert metrics.stats() == {}
@@ -0,0 +1,105 @@
+import time
+import threading
+import pytest
+import testspace_colab.ratelimit as ratelimit_module
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (None, None),
+        ("", None),
+        ("2", 2.0),
+        ("-1", 0.0),
+        ("100000", ratelimit_module.MAX_RETRY_AFTER),
+        ("Wed, 21 Oct 2015 07:28:00 GMT", 0.0),
+        ("not a date", None),
+    ],
+)
+def test_parse_retry_after(value, expected):
+    assert ratelimit_module.parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_date():
+    value = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 60))
+    assert 55 < ratelimit_module.parse_retry_after(value) <= 60
+
+
+def test_token_bucket():
+    bucket = ratelimit_module.TokenBucket(rate=50, burst=5)
+    start = time.monotonic()
+    for _ in range(10):
+        bucket.acquire()
+    # 5 tokens from the burst then 5 at 50 per second
+    assert time.monotonic() - start >= 0.09
+    bucket.configure(None)
+    start = time.monotonic()
+    for _ in range(100):
+        bucket.acquire()
+    assert time.monotonic() - start < 0.05
+
+
+def test_limiter_window():
+    limiter = ratelimit_module.AdaptiveLimiter(max_concurrency=8, latency_factor=None)
+    limiter.on_throttle()
+    assert limiter.window == 4
+    # The responses to the requests in flight do not decrease it further
+    limiter.on_throttle()
+    assert limiter.window == 4
+    assert limiter.throttled == 2
+    for _ in range(4):
+        limiter.on_success(0.01)
+    assert 4.9 < limiter.window < 5
+    for _ in range(100):
+        limiter.on_success(0.01)
+    assert limiter.window == 8
+
+
+def test_limiter_latency():
+    # Slow responses do not decrease the window by default
+    limiter = ratelimit_module.AdaptiveLimiter(max_concurrency=8)
+    for latency in (0.05, 0.4) * 20:
+        limiter.on_success(latency)
+    assert limiter.window == 8
+
+    limiter = ratelimit_module.AdaptiveLimiter(
+        max_concurrency=8, latency_factor=ratelimit_module.DEFAULT_LATENCY_FACTOR
+    )
+    limiter.on_success(0.05)
+    limiter.on_success(0.1)
+    assert limiter.window == 8
+    limiter.on_success(1.0)
+    assert limiter.window == 4
+
+
+def test_limiter_slots():
+    limiter = ratelimit_module.AdaptiveLimiter(max_concurrency=2)
+    in_flight = []
+
+    def request():
+        with limiter.slot():
+            in_flight.append(limiter.in_flight)
+            time.sleep(0.02)
+
+    threads = [threading.Thread(target=request) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(in_flight) == 2
+    assert limiter.in_flight == 0
+
+
+def test_limiter_pause():
+    limiter = ratelimit_module.AdaptiveLimiter()
+    limiter.on_throttle(retry_after=0.1)
+    start = time.monotonic()
+    with limiter.slot():
+        pass
+    assert time.monotonic() - start >= 0.09
+
+
+def test_for_host():
+    limiter = ratelimit_module.AdaptiveLimiter.for_host("a.testspace.com")
+    assert ratelimit_module.AdaptiveLimiter.for_host("a.testspace.com") is limiter
+    assert ratelimit_module.AdaptiveLimiter.for_host("b.testspace.com") is not limiter
@@ -58,3 +58,234 @@ def test_load(fake_trove, tmpdir):
         assert isinstance(result, dict)
         fake_trove -= 1
     assert fake_trove == 0
+
+
+def test_manifest(tmpdir):
+    org_dir = pathlib.Path(str(tmpdir)) / "org"
+    result_file = org_dir / "project" / "space" / "result.json"
+    result_file.parent.mkdir(parents=True)
+    result_file.write_text(json.dumps(dict(id=1, details=[])))
+    result_info = dict(id=1, name="result", updated_at="2021-02-04T01:22:36.000+01:00")
+
+    manifest = trove_module.Manifest(org_dir)
+    assert not manifest.is_current("project", "space", "result", result_info)
+    manifest.record("project", "space", "result", result_info, result_file)
+    manifest.save()
+
+    manifest = trove_module.Manifest(org_dir)
+    entry = manifest.get("project", "space", "result")
+    assert entry["file"] == "project/space/result.json"
+    assert entry["sha256"] == trove_module.file_checksum(result_file)
+    assert manifest.is_current("project", "space", "result", result_info)
+    assert not manifest.is_current(
+        "project", "space", "result", result_info, failures_only=True
+    )
+    assert not manifest.is_current(
+        "project", "space", "result", dict(result_info, updated_at="2022")
+    )
+    result_file.write_text("{}")
+    assert not manifest.is_current("project", "space", "result", result_info)
+
+    # The manifest is not taken for a project
+    assert list(trove_module.Trove(tmpdir).load()) == [{}]
+
+
+@pytest.mark.parametrize("format", trove_module.RESULT_FORMATS)
+def test_result_formats(tmpdir, format):
+    response = dict(
+        id=1,
+        name="result",
+        details=[
+            dict(name="suite", type="suite", path="/suite", suites=[], cases=[]),
+            dict(
+                name="folder",
+                type="folder",
+                path="/folder",
+                folders=[
+                    dict(name="empty", type="folder", path="/folder/empty", folders=[]),
+                    dict(type="folder", name="failed", path="/folder/failed"),
+                    dict(load_error="failed to load /folder/failed"),
+                ],
+            ),
+        ],
+    )
+    space_path = tmpdir.mkdir("org").mkdir("project").mkdir("space")
+    result_file = pathlib.Path(str(space_path)) / f"result.{format}"
+    trove_module.write_result(response, result_file)
+    assert trove_module.result_format(result_file) == format
+    assert trove_module.read_result(result_file) == response
+    assert list(trove_module.Trove(tmpdir).load()) == [response]
+    # No temporary file left
+    assert [path.name for path in result_file.parent.iterdir()] == [result_file.name]
+
+    trove_module.write_result(dict(id=2), result_file)
+    assert trove_module.read_result(result_file) == dict(id=2)
+
+
+def test_result_writer(tmpdir):
+    folder = dict(
+        name="folder",
+        type="folder",
+        path="/folder",
+        folders=[dict(name="empty", type="folder", path="/folder/empty", folders=[])],
+    )
+    suite = dict(name="suite", type="suite", path="/suite", suites=[], cases=[])
+    result_file = pathlib.Path(str(tmpdir)) / "result.ndjson.gz"
+    with trove_module.ResultWriter(result_file) as writer:
+        writer.write_result(dict(id=1, details=[]))
+        # In completion order
+        writer.write_container((1, 0), folder["folders"][0])
+        writer.write_container((0,), suite)
+        writer.write_container((1,), dict(folder, folders=[]))
+    expected = dict(id=1, details=[suite, folder])
+    assert trove_module.read_result(result_file) == expected
+    records = list(trove_module.iter_result(result_file))
+    assert records[0] == dict(id=1, details=[])
+    assert [at for at, _ in records[1:]] == [(1, 0), (0,), (1,)]
+
+    with pytest.raises(RuntimeError):
+        with trove_module.ResultWriter(result_file) as writer:
+            writer.write_result(dict(id=2, details=[]))
+            raise RuntimeError()
+    assert trove_module.read_result(result_file) == expected
+    assert [path.name for path in result_file.parent.iterdir()] == [result_file.name]
+
+
+def test_catalog(tmpdir):
+    trove = trove_module.Trove(tmpdir)
+    trove_path = pathlib.Path(str(tmpdir))
+    for index, (project, format) in enumerate(
+        [("project_1", "json"), ("project_1", "ndjson.gz"), ("project_2", "json.xz")]
+    ):
+        result_file = trove_path / "org" / project / "space" / f"build.{index}.{format}"
+        result_file.parent.mkdir(parents=True, exist_ok=True)
+        trove_module.write_result(
+            dict(id=index + 10, name=f"build.{index}", session_suite_counts=[2, 1]),
+            result_file,
+        )
+    assert not trove.catalog.exists()
+    assert len(list(trove.load(result="build.1"))) == 1
+
+    assert trove.reindex() == 3
+    assert trove.catalog.exists()
+    assert trove.reindex() == 0
+    rows = trove.catalog.query(project="project_1")
+    assert [row["name"] for row in rows] == ["build.0", "build.1"]
+    assert rows[1]["id"] == 11
+    assert rows[1]["format"] == "ndjson.gz"
+    assert rows[1]["suite_count"] == 3
+    assert rows[1]["header"]["session_suite_counts"] == [2, 1]
+    assert [row["file"] for row in trove.catalog.query(result=12)] == [
+        "org/project_2/space/build.2.json.xz"
+    ]
+    assert [result["id"] for result in trove.load(org="org", result="11")] == [11]
+    assert [result["id"] for result in trove.load(project="project_2")] == [12]
+
+    # Only the results in the catalog are loaded
+    trove_module.write_result(dict(id=13), trove_path / "org/project_2/space/new.json")
+    assert len(list(trove.load())) == 3
+    (trove_path / "org/project_1/space/build.0.json").unlink()
+    assert trove.reindex() == 1
+    assert sorted(result["id"] for result in trove.load()) == [11, 12, 13]
+
+    # Only the given files are indexed
+    trove_module.write_result(dict(id=14), trove_path / "org/project_2/space/b.json")
+    assert trove.reindex([]) == 0
+    result_file = trove_path / "org/project_1/space/build.1.ndjson.gz"
+    result_file.unlink()
+    trove_module.write_result(dict(id=15), trove_path / "org/project_1/space/c.json")
+    assert (
+        trove.reindex(
+            [("org", "project_1", "space", trove_path / "org/project_1/space/c.json")]
+        )
+        == 1
+    )
+    assert sorted(row["id"] for row in trove.catalog.query()) == [11, 12, 13, 15]
+
+    # A result saved in another format replaces the previous one
+    result_file = trove_path / "org/project_2/space/new.ndjson"
+    trove_module.write_result(dict(id=13), result_file)
+    trove.catalog.update(
+        [trove.catalog.entry("org", "project_2", "space", result_file)]
+    )
+    assert [row["format"] for row in trove.catalog.query(result="new")] == ["ndjson"]
+
+
+def test_export_dataset(tmpdir):
+    pyarrow = pytest.importorskip("pyarrow")
+    trove_path = pathlib.Path(str(tmpdir)) / "trove"
+    dest = pathlib.Path(str(tmpdir)) / "dataset"
+    suite = dict(
+        name="suite",
+        type="suite",
+        path="/folder/suite",
+        case_counts=[1, 1, 0, 0],
+        suites=[],
+        cases=[
+            dict(name="passes", status="passed", duration="0.5", path="/folder/suite"),
+            dict(name="fails", status="failed", annotations=[dict(name="log")]),
+        ],
+    )
+    details = [dict(name="folder", type="folder", path="/folder", folders=[suite])]
+    for index, space in enumerate(["main", "PR:1"]):
+        result_file = trove_path / "org" / "project" / space / f"build.{index}.json"
+        result_file.parent.mkdir(parents=True)
+        trove_module.write_result(dict(id=index, details=details), result_file)
+    trove = trove_module.Trove(trove_path)
+
+    assert trove.export_dataset(dest) == 2
+    cases = trove_module.open_dataset(dest).to_table().to_pydict()
+    assert sorted(cases["space"]) == ["PR:1", "PR:1", "main", "main"]
+    assert sorted(cases["status"]) == ["failed", "failed", "passed", "passed"]
+    assert sorted(cases["annotation_count"]) == [0, 0, 1, 1]
+    assert 0.5 in cases["duration"]
+    suites = trove_module.open_dataset(dest, "suites").to_table(
+        filter=pyarrow.dataset.field("space") == "main"
+    )
+    assert suites.to_pydict()["failed"] == [1]
+    assert suites.to_pydict()["result"] == ["build.0"]
+
+    # Only the new or changed results are exported
+    assert trove.export_dataset(dest) == 0
+    trove_module.write_result(
+        dict(id=2, details=[suite]), trove_path / "org/project/main/build.2.json"
+    )
+    (trove_path / "org/project/PR:1/build.1.json").unlink()
+    assert trove.export_dataset(dest) == 1
+    table = trove_module.open_dataset(dest).to_table()
+    assert sorted(set(table.to_pydict()["result_id"])) == [0, 2]
+    assert trove.export_dataset(dest, full=True) == 2
+
+
+@pytest.mark.parametrize("format", ["json", "ndjson.gz"])
+def test_load_lazy(tmpdir, format, mocker):
+    trove = trove_module.Trove(tmpdir)
+    result_file = pathlib.Path(str(tmpdir)) / "org" / "project" / "space"
+    result_file.mkdir(parents=True)
+    result_file = result_file / f"build.1.{format}"
+    details = [dict(name="suite", type="suite", path="/suite", suites=[], cases=[])]
+    trove_module.write_result(dict(id=1, name="build.1", details=details), result_file)
+    read_result = mocker.spy(trove_module, "read_result")
+
+    handle = next(trove.load(lazy=True))
+    assert (handle.org, handle.project, handle.space) == ("org", "project", "space")
+    assert handle["name"] == "build.1"
+    assert handle.name == "build.1"
+    assert read_result.call_count == 0
+    assert not handle.loaded
+    with handle:
+        assert handle["details"] == details
+        assert handle.loaded
+    assert not handle.loaded
+    assert dict(handle) == dict(id=1, name="build.1", details=details)
+    assert handle.load() == dict(handle)
+
+    # The header comes from the catalog
+    trove.reindex()
+    read_result.reset_mock()
+    mocker.spy(trove_module, "read_result_header")
+    handles = list(trove.load(result="1", lazy=True))
+    assert [handle["id"] for handle in handles] == [1]
+    assert trove_module.read_result_header.call_count == 0
+    assert read_result.call_count == 0
+    assert list(trove.load(result="build.1")) == [dict(handle)]
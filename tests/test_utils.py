@@ -0,0 +1,248 @@
+import io
+import gzip
+import json
+import base64
+import xml.etree.ElementTree as ElementTree
+import pytest
+import testspace_colab.utils as utils_module
+
+
+def _annotation(text):
+    return base64.b64encode(gzip.compress(text.encode("utf-8"))).decode("ascii")
+
+
+@pytest.fixture()
+def xml_suite():
+    """A suite with cases, annotations, comments and a few oddities"""
+    cases = []
+    for index in range(50):
+        annotations = ""
+        if index % 3 == 0:
+            annotations += (
+                f'<annotation name="log_{index}" level="info">{_annotation(f"log {index}")}'
+                f'<comment label="note">comment {index}</comment></annotation>'
+            )
+        if index % 5 == 0:
+            annotations += (
+                f'<annotation name="corrupted_{index}">not base64</annotation>'
+            )
+        cases.append(
+            f'<test_case name="case_{index}" status="passed" duration="0.1">'
+            f"{annotations}</test_case>"
+        )
+    return (
+        f'<test_suite name="suite" passed="50">{"".join(cases)}'
+        f"<comment>suite comment</comment></test_suite>"
+    ).encode("utf-8")
+
+
+@pytest.mark.parametrize("path", [None, "/folder"])
+def test_xml_stream_to_json(xml_suite, path):
+    progress = [[], []]
+    expected = utils_module.xml_to_json(
+        ElementTree.fromstring(xml_suite),
+        path=path,
+        progress_callback=lambda **kwargs: progress[0].append(kwargs),
+    )
+    json_data = utils_module.xml_stream_to_json(
+        io.BytesIO(xml_suite),
+        path=path,
+        progress_callback=lambda **kwargs: progress[1].append(kwargs),
+    )
+    # Same content and same key order
+    assert json.dumps(json_data) == json.dumps(expected)
+    assert progress[0] == progress[1]
+    case = json_data["suite"]["cases"][0]
+    assert case["path"] == f"{path or ''}/suite"
+    assert case["annotations"][0]["text"] == "log 0"
+
+
+def test_xml_to_json_nested():
+    """Both converters give the same output for nested suites (which are listed
+    with the cases)"""
+    content = (
+        '<test_suite name="top" passed="2">'
+        '<test_suite name="inner">'
+        f'<test_case name="a" status="passed"><annotation name="log">{_annotation("x")}'
+        '<comment label="note">remark</comment></annotation></test_case>'
+        '<test_case name="b" status="failed"/>'
+        "</test_suite>"
+        '<test_case name="c" status="passed"/>'
+        "<comment>top comment</comment>"
+        '<unknown name="u"><test_case name="ignored"/></unknown>'
+        "</test_suite>"
+    ).encode("utf-8")
+    expected = dict(
+        suite=dict(
+            name="top",
+            passed="2",
+            cases=[
+                dict(
+                    name="inner",
+                    cases=[
+                        dict(
+                            name="a",
+                            status="passed",
+                            annotations=[
+                                dict(
+                                    name="log",
+                                    text="x",
+                                    comments=[
+                                        dict(
+                                            label="note",
+                                            text="remark",
+                                            path="/folder/top/inner/a/log",
+                                        )
+                                    ],
+                                    path="/folder/top/inner/a",
+                                )
+                            ],
+                            path="/folder/top/inner",
+                        ),
+                        dict(name="b", status="failed", path="/folder/top/inner"),
+                    ],
+                    path="/folder/top",
+                ),
+                dict(name="c", status="passed", path="/folder/top"),
+                dict(text="top comment", path="/folder/top"),
+                dict(name="u", path="/folder/top"),
+            ],
+        )
+    )
+    progress = [[], []]
+    json_data = utils_module.xml_to_json(
+        ElementTree.fromstring(content),
+        path="/folder",
+        progress_callback=lambda **kwargs: progress[0].append(kwargs),
+    )
+    assert json_data == expected
+    json_data = utils_module.xml_stream_to_json(
+        io.BytesIO(content),
+        path="/folder",
+        progress_callback=lambda **kwargs: progress[1].append(kwargs),
+    )
+    assert json.dumps(json_data) == json.dumps(
+        utils_module.xml_to_json(ElementTree.fromstring(content), path="/folder")
+    )
+    assert progress[0] == progress[1]
+
+
+def test_xml_stream_to_json_release(xml_suite, mocker):
+    """The converted elements are removed from the tree"""
+    iterparse = utils_module.ElementTree.iterparse
+    attached = []  # Converted cases still in the suite
+
+    def checked_iterparse(*args, **kwargs):
+        root = None
+        for event, element in iterparse(*args, **kwargs):
+            root = element if root is None else root
+            yield event, element
+            if event == "end" and element.tag == "test_case":
+                attached.extend(child for child in root if child is element)
+
+    mocker.patch.object(utils_module.ElementTree, "iterparse", checked_iterparse)
+    json_data = utils_module.xml_stream_to_json(io.BytesIO(xml_suite), path=None)
+    assert json_data == utils_module.xml_to_json(
+        ElementTree.fromstring(xml_suite), path=None
+    )
+    assert attached == []
+
+
+def test_xml_to_json_depth():
+    """The conversion is not limited by the recursion limit"""
+    depth = 5000
+    content = '<annotation name="a">' * depth + "</annotation>" * depth
+    json_data = utils_module.xml_to_json(ElementTree.fromstring(content), path=None)
+    annotation = json_data["annotation"]
+    for _ in range(depth - 1):
+        annotation = annotation["comments"][0]
+    assert annotation["path"] == "/a" * (depth - 1)
+
+
+def test_lazy_annotations(xml_suite):
+    expected = utils_module.xml_to_json(ElementTree.fromstring(xml_suite), path=None)
+    for json_data in (
+        utils_module.xml_to_json(
+            ElementTree.fromstring(xml_suite), path=None, lazy_annotations=True
+        ),
+        utils_module.xml_stream_to_json(
+            io.BytesIO(xml_suite), path=None, lazy_annotations=True
+        ),
+    ):
+        text = json_data["suite"]["cases"][0]["annotations"][0]["text"]
+        assert isinstance(text, utils_module.LazyText)
+        assert text.payload == _annotation("log 0")
+        assert str(text) == "log 0"
+        decoded = json.loads(json.dumps(json_data, cls=utils_module.JSONEncoder))
+        assert decoded["suite"]["cases"][3] == expected["suite"]["cases"][3]
+        raw = json.loads(
+            json.dumps(
+                json_data, cls=utils_module.JSONEncoder, decode_annotations=False
+            )
+        )
+        annotation = raw["suite"]["cases"][0]["annotations"][0]
+        assert annotation["text"] == _annotation("log 0")
+        # Corrupted annotations can't be decoded
+        annotation = json_data["suite"]["cases"][0]["annotations"][1]
+        assert annotation["text"].decode() is None
+
+
+@pytest.mark.parametrize("path", [None, "/folder"])
+def test_xml_stream_to_case_columns(xml_suite, path):
+    expected = utils_module.details_to_case_columns(
+        utils_module.xml_to_json(ElementTree.fromstring(xml_suite), path=path)["suite"]
+    )
+    case_columns = utils_module.xml_stream_to_case_columns(
+        io.BytesIO(xml_suite), path=path
+    )
+    assert len(case_columns) == 50
+    assert case_columns.columns == expected.columns
+    assert case_columns.columns["path"][0] == f"{path or ''}/suite"
+    assert case_columns.columns["annotation_count"][:6] == [2, 0, 0, 1, 0, 1]
+
+
+def test_case_columns():
+    case_columns = utils_module.CaseColumns()
+    case_columns.append(dict(name="a", status="passed"))
+    case_columns.append(dict(name="b", duration="1.5"))
+    other = utils_module.CaseColumns()
+    other.append(dict(name="c", start_time="now"))
+    case_columns.extend(other)
+    assert case_columns.columns == dict(
+        name=["a", "b", "c"],
+        status=["passed", None, None],
+        duration=[None, "1.5", None],
+        start_time=[None, None, "now"],
+    )
+    pandas = pytest.importorskip("pandas")
+    frame = case_columns.to_frame()
+    assert frame["duration"].dtype == "float64"
+    assert pandas.isna(frame["duration"][0])
+    assert frame["duration"][1] == 1.5
+    assert frame["status"].dtype == "category"
+
+
+@pytest.mark.parametrize(
+    "kwargs, path, folder, selected",
+    [
+        (dict(include=["/a/b"]), "/a", True, True),
+        (dict(include=["/a/b"]), "/a/suite", False, False),
+        (dict(include=["/a/b"]), "/a/b/c/suite", False, True),
+        (dict(include=["/a/b"]), "/c", True, False),
+        (dict(include=["/*/b"]), "/a/b", True, True),
+        (dict(include=["/*/b"]), "/a/c/b", True, False),
+        (dict(include=["**/net*"]), "/a/c", True, True),
+        (dict(include=["**/net*"]), "/a/c/network/suite", False, True),
+        (dict(include=["**/net*"]), "/a/c/suite", False, False),
+        (dict(exclude=["/a/slow*"]), "/a/slow_tests", True, False),
+        (dict(exclude=["/a/slow*"]), "/a/slow_tests/suite", False, False),
+        (dict(exclude=["/a/slow*"]), "/a/suite", False, True),
+        (dict(include=["/a"], exclude=["/a/b"]), "/a/b/suite", False, False),
+        (dict(max_depth=1), "/suite", False, True),
+        (dict(max_depth=1), "/folder", True, False),
+        (dict(max_depth=2), "/folder", True, True),
+        (dict(max_depth=2), "/folder/folder/suite", False, False),
+    ],
+)
+def test_path_filter(kwargs, path, folder, selected):
+    assert utils_module.PathFilter(**kwargs).select(path, folder=folder) is selected